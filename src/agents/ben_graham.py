@@ -6,11 +6,36 @@ from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 import json
 from typing_extensions import Literal
+from utils.concurrency import get_max_workers, map_tickers
 from utils.progress import progress
-from utils.llm import call_llm
+from utils.llm import call_llm_batch, compact_prompt_payload, decisive_signals, get_fast_mode_margin, get_llm_batch_size
 import math
 
 
+# Line items this agent reads, declared here so runs can prefetch them in batches
+LINE_ITEM_QUERY = {
+    "line_items": [
+        "earnings_per_share",
+        "revenue",
+        "net_income",
+        "book_value_per_share",
+        "total_assets",
+        "total_liabilities",
+        "current_assets",
+        "current_liabilities",
+        "dividends_and_other_cash_distributions",
+        "outstanding_shares",
+    ],
+    "period": "annual",
+    "limit": 10,
+}
+
+
+def get_agent_inputs(ticker: str, end_date: str):
+    """The data ben_graham_agent analyzes for a ticker, so backtests can reuse its signal while this is unchanged"""
+    return [get_financial_metrics(ticker, end_date, period="annual", limit=10), search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY), get_market_cap(ticker, end_date)]
+
+
 class BenGrahamSignal(BaseModel):
     signal: Literal["bullish", "bearish", "neutral"]
     confidence: float
@@ -29,15 +54,12 @@ def ben_graham_agent(state: AgentState):
     end_date = data["end_date"]
     tickers = data["tickers"]
 
-    analysis_data = {}
-    graham_analysis = {}
-
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict[str, any]:
         progress.update_status("ben_graham_agent", ticker, "Fetching financial metrics")
         metrics = get_financial_metrics(ticker, end_date, period="annual", limit=10)
 
         progress.update_status("ben_graham_agent", ticker, "Gathering financial line items")
-        financial_line_items = search_line_items(ticker, ["earnings_per_share", "revenue", "net_income", "book_value_per_share", "total_assets", "total_liabilities", "current_assets", "current_liabilities", "dividends_and_other_cash_distributions", "outstanding_shares"], end_date, period="annual", limit=10)
+        financial_line_items = search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY)
 
         progress.update_status("ben_graham_agent", ticker, "Getting market cap")
         market_cap = get_market_cap(ticker, end_date)
@@ -64,19 +86,23 @@ def ben_graham_agent(state: AgentState):
         else:
             signal = "neutral"
 
-        analysis_data[ticker] = {"signal": signal, "score": total_score, "max_score": max_possible_score, "earnings_analysis": earnings_analysis, "strength_analysis": strength_analysis, "valuation_analysis": valuation_analysis}
+        return {"signal": signal, "score": total_score, "max_score": max_possible_score, "earnings_analysis": earnings_analysis, "strength_analysis": strength_analysis, "valuation_analysis": valuation_analysis}
 
-        progress.update_status("ben_graham_agent", ticker, "Generating Graham-style analysis")
-        graham_output = generate_graham_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            model_name=state["metadata"]["model_name"],
-            model_provider=state["metadata"]["model_provider"],
-        )
+    analysis_data = map_tickers(analyze_ticker, tickers, get_max_workers(state))
+
+    progress.update_status("ben_graham_agent", None, "Generating Graham-style analysis")
+    graham_outputs = generate_graham_outputs(
+        analysis_data=analysis_data,
+        model_name=state["metadata"]["model_name"],
+        model_provider=state["metadata"]["model_provider"],
+        batch_size=get_llm_batch_size(state),
+        max_workers=get_max_workers(state),
+        fast_margin=get_fast_mode_margin(state),
+    )
 
-        graham_analysis[ticker] = {"signal": graham_output.signal, "confidence": graham_output.confidence, "reasoning": graham_output.reasoning}
+    graham_analysis = {ticker: {"signal": graham_output.signal, "confidence": graham_output.confidence, "reasoning": graham_output.reasoning} for ticker, graham_output in graham_outputs.items()}
 
-        progress.update_status("ben_graham_agent", ticker, "Done")
+    progress.update_status("ben_graham_agent", None, "Done")
 
     # Wrap results in a single message for the chain
     message = HumanMessage(content=json.dumps(graham_analysis), name="ben_graham_agent")
@@ -276,18 +302,40 @@ def analyze_valuation_graham(metrics: list, financial_line_items: list, market_c
     return {"score": score, "details": "; ".join(details)}
 
 
-def generate_graham_output(
-    ticker: str,
+def generate_graham_outputs(
     analysis_data: dict[str, any],
     model_name: str,
     model_provider: str,
-) -> BenGrahamSignal:
+    batch_size: int = 1,
+    max_workers: int = 1,
+    fast_margin: float | None = None,
+) -> dict[str, BenGrahamSignal]:
     """
-    Generates an investment decision in the style of Benjamin Graham:
+    Generates investment decisions in the style of Benjamin Graham, batch_size tickers per LLM call:
     - Value emphasis, margin of safety, net-nets, conservative balance sheet, stable earnings.
-    - Return the result in a JSON structure: { signal, confidence, reasoning }.
+    - Returns a dict of ticker to { signal, confidence, reasoning }.
     """
+    def create_default_ben_graham_signal():
+        return BenGrahamSignal(signal="neutral", confidence=0.0, reasoning="Error in generating analysis; defaulting to neutral.")
+
+    return call_llm_batch(
+        build_prompt=lambda tickers: build_graham_prompt(tickers, analysis_data),
+        tickers=list(analysis_data),
+        model_name=model_name,
+        model_provider=model_provider,
+        pydantic_model=BenGrahamSignal,
+        agent_name="ben_graham_agent",
+        default_factory=create_default_ben_graham_signal,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        decisive=decisive_signals(analysis_data, fast_margin),
+    )
 
+
+def build_graham_prompt(tickers: list[str], analysis_data: dict[str, any]):
+    """
+    Builds the Graham prompt for the analysis data of one or more tickers.
+    """
     template = ChatPromptTemplate.from_messages([
         (
             "system",
@@ -318,19 +366,7 @@ def generate_graham_output(
         )
     ])
 
-    prompt = template.invoke({
-        "analysis_data": json.dumps(analysis_data, indent=2),
-        "ticker": ticker
+    return template.invoke({
+        "analysis_data": compact_prompt_payload({ticker: analysis_data[ticker] for ticker in tickers}),
+        "ticker": ", ".join(tickers)
     })
-
-    def create_default_ben_graham_signal():
-        return BenGrahamSignal(signal="neutral", confidence=0.0, reasoning="Error in generating analysis; defaulting to neutral.")
-
-    return call_llm(
-        prompt=prompt,
-        model_name=model_name,
-        model_provider=model_provider,
-        pydantic_model=BenGrahamSignal,
-        agent_name="ben_graham_agent",
-        default_factory=create_default_ben_graham_signal,
-    )
@@ -6,8 +6,31 @@ from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 import json
 from typing_extensions import Literal
+from utils.concurrency import get_max_workers, map_tickers
 from utils.progress import progress
-from utils.llm import call_llm
+from utils.llm import call_llm_batch, compact_prompt_payload, decisive_signals, get_fast_mode_margin, get_llm_batch_size
+
+# Line items this agent reads, declared here so runs can prefetch them in batches
+LINE_ITEM_QUERY = {
+    "line_items": [
+        "revenue",
+        "operating_margin",
+        "debt_to_equity",
+        "free_cash_flow",
+        "total_assets",
+        "total_liabilities",
+        "dividends_and_other_cash_distributions",
+        "outstanding_shares",
+    ],
+    "period": "annual",
+    "limit": 5,
+}
+
+
+def get_agent_inputs(ticker: str, end_date: str):
+    """The data bill_ackman_agent analyzes for a ticker, so backtests can reuse its signal while this is unchanged"""
+    return [get_financial_metrics(ticker, end_date, period="annual", limit=5), search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY), get_market_cap(ticker, end_date)]
+
 
 class BillAckmanSignal(BaseModel):
     signal: Literal["bullish", "bearish", "neutral"]
@@ -24,32 +47,14 @@ def bill_ackman_agent(state: AgentState):
     end_date = data["end_date"]
     tickers = data["tickers"]
     
-    analysis_data = {}
-    ackman_analysis = {}
-    
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict[str, any]:
         progress.update_status("bill_ackman_agent", ticker, "Fetching financial metrics")
         # You can adjust these parameters (period="annual"/"ttm", limit=5/10, etc.)
         metrics = get_financial_metrics(ticker, end_date, period="annual", limit=5)
         
         progress.update_status("bill_ackman_agent", ticker, "Gathering financial line items")
         # Request multiple periods of data (annual or TTM) for a more robust long-term view.
-        financial_line_items = search_line_items(
-            ticker,
-            [
-                "revenue",
-                "operating_margin",
-                "debt_to_equity",
-                "free_cash_flow",
-                "total_assets",
-                "total_liabilities",
-                "dividends_and_other_cash_distributions",
-                "outstanding_shares"
-            ],
-            end_date,
-            period="annual",  # or "ttm" if you prefer trailing 12 months
-            limit=5           # fetch up to 5 annual periods (or more if needed)
-        )
+        financial_line_items = search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY)
         
         progress.update_status("bill_ackman_agent", ticker, "Getting market cap")
         market_cap = get_market_cap(ticker, end_date)
@@ -75,7 +80,7 @@ def bill_ackman_agent(state: AgentState):
         else:
             signal = "neutral"
         
-        analysis_data[ticker] = {
+        return {
             "signal": signal,
             "score": total_score,
             "max_score": max_possible_score,
@@ -83,22 +88,29 @@ def bill_ackman_agent(state: AgentState):
             "balance_sheet_analysis": balance_sheet_analysis,
             "valuation_analysis": valuation_analysis
         }
-        
-        progress.update_status("bill_ackman_agent", ticker, "Generating Ackman analysis")
-        ackman_output = generate_ackman_output(
-            ticker=ticker, 
-            analysis_data=analysis_data,
-            model_name=state["metadata"]["model_name"],
-            model_provider=state["metadata"]["model_provider"],
-        )
-        
-        ackman_analysis[ticker] = {
+
+    analysis_data = map_tickers(analyze_ticker, tickers, get_max_workers(state))
+
+    progress.update_status("bill_ackman_agent", None, "Generating Ackman analysis")
+    ackman_outputs = generate_ackman_outputs(
+        analysis_data=analysis_data,
+        model_name=state["metadata"]["model_name"],
+        model_provider=state["metadata"]["model_provider"],
+        batch_size=get_llm_batch_size(state),
+        max_workers=get_max_workers(state),
+        fast_margin=get_fast_mode_margin(state),
+    )
+
+    ackman_analysis = {
+        ticker: {
             "signal": ackman_output.signal,
             "confidence": ackman_output.confidence,
             "reasoning": ackman_output.reasoning
         }
-        
-        progress.update_status("bill_ackman_agent", ticker, "Done")
+        for ticker, ackman_output in ackman_outputs.items()
+    }
+
+    progress.update_status("bill_ackman_agent", None, "Done")
     
     # Wrap results in a single message for the chain
     message = HumanMessage(
@@ -336,14 +348,41 @@ def analyze_valuation(financial_line_items: list, market_cap: float) -> dict:
     }
 
 
-def generate_ackman_output(
-    ticker: str,
+def generate_ackman_outputs(
     analysis_data: dict[str, any],
     model_name: str,
     model_provider: str,
-) -> BillAckmanSignal:
+    batch_size: int = 1,
+    max_workers: int = 1,
+    fast_margin: float | None = None,
+) -> dict[str, BillAckmanSignal]:
+    """
+    Generates investment decisions in the style of Bill Ackman, batch_size tickers per LLM call.
+    """
+    def create_default_bill_ackman_signal():
+        return BillAckmanSignal(
+            signal="neutral",
+            confidence=0.0,
+            reasoning="Error in analysis, defaulting to neutral"
+        )
+
+    return call_llm_batch(
+        build_prompt=lambda tickers: build_ackman_prompt(tickers, analysis_data),
+        tickers=list(analysis_data),
+        model_name=model_name,
+        model_provider=model_provider,
+        pydantic_model=BillAckmanSignal,
+        agent_name="bill_ackman_agent",
+        default_factory=create_default_bill_ackman_signal,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        decisive=decisive_signals(analysis_data, fast_margin),
+    )
+
+
+def build_ackman_prompt(tickers: list[str], analysis_data: dict[str, any]):
     """
-    Generates investment decisions in the style of Bill Ackman.
+    Builds the Ackman prompt for the analysis data of one or more tickers.
     """
     template = ChatPromptTemplate.from_messages([
         (
@@ -382,23 +421,7 @@ def generate_ackman_output(
         )
     ])
 
-    prompt = template.invoke({
-        "analysis_data": json.dumps(analysis_data, indent=2),
-        "ticker": ticker
+    return template.invoke({
+        "analysis_data": compact_prompt_payload({ticker: analysis_data[ticker] for ticker in tickers}),
+        "ticker": ", ".join(tickers)
     })
-
-    def create_default_bill_ackman_signal():
-        return BillAckmanSignal(
-            signal="neutral",
-            confidence=0.0,
-            reasoning="Error in analysis, defaulting to neutral"
-        )
-
-    return call_llm(
-        prompt=prompt, 
-        model_name=model_name, 
-        model_provider=model_provider, 
-        pydantic_model=BillAckmanSignal, 
-        agent_name="bill_ackman_agent", 
-        default_factory=create_default_bill_ackman_signal,
-    )
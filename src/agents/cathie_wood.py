@@ -6,11 +6,33 @@ from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 import json
 from typing_extensions import Literal
+from utils.concurrency import get_max_workers, map_tickers
 from utils.progress import progress
-from utils.llm import call_llm
+from utils.llm import call_llm_batch, compact_prompt_payload, decisive_signals, get_fast_mode_margin, get_llm_batch_size
 from utils.callbacks import CustomCallbackHandler
 
 
+# Line items this agent reads, declared here so runs can prefetch them in batches
+LINE_ITEM_QUERY = {
+    "line_items": [
+        "revenue",
+        "gross_margin",
+        "operating_margin",
+        "debt_to_equity",
+        "free_cash_flow",
+        "total_assets",
+        "total_liabilities",
+        "dividends_and_other_cash_distributions",
+        "outstanding_shares",
+        "research_and_development",
+        "capital_expenditure",
+        "operating_expense",
+    ],
+    "period": "annual",
+    "limit": 5,
+}
+
+
 class CathieWoodSignal(BaseModel):
     signal: Literal["bullish", "bearish", "neutral"]
     confidence: float
@@ -30,12 +52,7 @@ def cathie_wood_agent(state: AgentState):
     end_date = data["end_date"]
     tickers = data["tickers"]
 
-    analysis_data = {}
-    cw_analysis = {}
-
-
-
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict[str, any]:
         progress.update_status("cathie_wood_agent", ticker, "Fetching financial metrics")
         # Calculate start_date as 1 day before end_date
         from datetime import datetime, timedelta
@@ -45,46 +62,22 @@ def cathie_wood_agent(state: AgentState):
         # You can adjust these parameters (period="annual"/"ttm", limit=5/10, etc.)
         metrics = get_financial_metrics(ticker, end_date, period="annual", limit=5)
         prices = get_prices(ticker, start_date, end_date)
-        print(f"prices: {prices}")
 
         progress.update_status("cathie_wood_agent", ticker, "Gathering financial line items")
         # Request multiple periods of data (annual or TTM) for a more robust view.
-        financial_line_items = search_line_items(
-            ticker,
-            [
-                "revenue",
-                "gross_margin",
-                "operating_margin",
-                "debt_to_equity",
-                "free_cash_flow",
-                "total_assets",
-                "total_liabilities",
-                "dividends_and_other_cash_distributions",
-                "outstanding_shares",
-                "research_and_development",
-                "capital_expenditure",
-                "operating_expense",
-
-            ],
-            end_date,
-            period="annual",
-            limit=5
-        )
+        financial_line_items = search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY)
 
         progress.update_status("cathie_wood_agent", ticker, "Getting market cap")
         market_cap = get_market_cap(ticker, end_date)
 
         progress.update_status("cathie_wood_agent", ticker, "Analyzing disruptive potential")
         disruptive_analysis = analyze_disruptive_potential(metrics, financial_line_items)
-        print(f"disruptive_analysis: {disruptive_analysis}")
 
         progress.update_status("cathie_wood_agent", ticker, "Analyzing innovation-driven growth")
         innovation_analysis = analyze_innovation_growth(metrics, financial_line_items)
-        print(f"innovation_analysis: {innovation_analysis}")
         
         progress.update_status("cathie_wood_agent", ticker, "Calculating valuation & high-growth scenario")
         valuation_analysis = analyze_cathie_wood_valuation(financial_line_items, market_cap, prices)
-        print(f"valuation_analysis: {valuation_analysis}")
         # Combine partial scores or signals
         total_score = disruptive_analysis["score"] + innovation_analysis["score"] + valuation_analysis["score"]
         max_possible_score = 15  # Adjust weighting as desired
@@ -96,7 +89,7 @@ def cathie_wood_agent(state: AgentState):
         else:
             signal = "neutral"
 
-        analysis_data[ticker] = {
+        return {
             "signal": signal,
             "score": total_score,
             "max_score": max_possible_score,
@@ -105,23 +98,29 @@ def cathie_wood_agent(state: AgentState):
             "valuation_analysis": valuation_analysis
         }
 
-        progress.update_status("cathie_wood_agent", ticker, "Generating Cathie Wood style analysis")
-        cw_output = generate_cathie_wood_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            model_name=state["metadata"]["model_name"],
-            model_provider=state["metadata"]["model_provider"],
-        )
-        print(f"cw_output: {cw_output}")
+    analysis_data = map_tickers(analyze_ticker, tickers, get_max_workers(state))
 
-        cw_analysis[ticker] = {
+    progress.update_status("cathie_wood_agent", None, "Generating Cathie Wood style analysis")
+    cw_outputs = generate_cathie_wood_outputs(
+        analysis_data=analysis_data,
+        model_name=state["metadata"]["model_name"],
+        model_provider=state["metadata"]["model_provider"],
+        batch_size=get_llm_batch_size(state),
+        max_workers=get_max_workers(state),
+        fast_margin=get_fast_mode_margin(state),
+    )
+
+    cw_analysis = {
+        ticker: {
             "signal": cw_output.signal,
             "confidence": cw_output.confidence,
             "reasoning": cw_output.reasoning,
             "target_price_range": cw_output.target_price_range
         }
+        for ticker, cw_output in cw_outputs.items()
+    }
 
-        progress.update_status("cathie_wood_agent", ticker, "Done")
+    progress.update_status("cathie_wood_agent", None, "Done")
 
     message = HumanMessage(
         content=json.dumps(cw_analysis),
@@ -429,14 +428,42 @@ def analyze_cathie_wood_valuation(financial_line_items: list, market_cap: float,
     }
 
 
-def generate_cathie_wood_output(
-    ticker: str,
+def generate_cathie_wood_outputs(
     analysis_data: dict[str, any],
     model_name: str,
     model_provider: str,
-) -> CathieWoodSignal:
+    batch_size: int = 1,
+    max_workers: int = 1,
+    fast_margin: float | None = None,
+) -> dict[str, CathieWoodSignal]:
+    """
+    Generates investment decisions in the style of Cathie Wood, batch_size tickers per LLM call.
+    """
+    def create_default_cathie_wood_signal():
+        return CathieWoodSignal(
+            signal="neutral",
+            confidence=0.0,
+            reasoning="Error in analysis, defaulting to neutral",
+            target_price_range="0-0"
+        )
+
+    return call_llm_batch(
+        build_prompt=lambda tickers: build_cathie_wood_prompt(tickers, analysis_data),
+        tickers=list(analysis_data),
+        model_name=model_name,
+        model_provider=model_provider,
+        pydantic_model=CathieWoodSignal,
+        agent_name="cathie_wood_agent",
+        default_factory=create_default_cathie_wood_signal,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        decisive=decisive_signals(analysis_data, fast_margin, target_price_range="N/A"),
+    )
+
+
+def build_cathie_wood_prompt(tickers: list[str], analysis_data: dict[str, any]):
     """
-    Generates investment decisions in the style of Cathie Wood.
+    Builds the Cathie Wood prompt for the analysis data of one or more tickers.
     """
     template = ChatPromptTemplate.from_messages([
         (
@@ -466,26 +493,9 @@ def generate_cathie_wood_output(
         )
     ])
 
-    prompt = template.invoke({
-        "analysis_data": json.dumps(analysis_data, indent=2),
-        "ticker": ticker
+    return template.invoke({
+        "analysis_data": compact_prompt_payload({ticker: analysis_data[ticker] for ticker in tickers}),
+        "ticker": ", ".join(tickers)
     })
 
-    def create_default_cathie_wood_signal():
-        return CathieWoodSignal(
-            signal="neutral",
-            confidence=0.0,
-            reasoning="Error in analysis, defaulting to neutral",
-            target_price_range="0-0"
-        )
-
-    return call_llm(
-        prompt=prompt,
-        model_name=model_name,
-        model_provider=model_provider,
-        pydantic_model=CathieWoodSignal,
-        agent_name="cathie_wood_agent",
-        default_factory=create_default_cathie_wood_signal,
-    )
-
 # source: https://ark-invest.com
\ No newline at end of file
@@ -6,8 +6,43 @@ from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 import json
 from typing_extensions import Literal
+from utils.concurrency import get_max_workers, map_tickers
 from utils.progress import progress
-from utils.llm import call_llm
+from utils.llm import call_llm_batch, compact_prompt_payload, decisive_signals, get_fast_mode_margin, get_llm_batch_size
+
+# Line items this agent reads, declared here so runs can prefetch them in batches
+LINE_ITEM_QUERY = {
+    "line_items": [
+        "revenue",
+        "net_income",
+        "operating_income",
+        "return_on_invested_capital",
+        "gross_margin",
+        "operating_margin",
+        "free_cash_flow",
+        "capital_expenditure",
+        "cash_and_equivalents",
+        "total_debt",
+        "shareholders_equity",
+        "outstanding_shares",
+        "research_and_development",
+        "goodwill_and_intangible_assets",
+    ],
+    "period": "annual",
+    "limit": 10,
+}
+
+
+def get_agent_inputs(ticker: str, end_date: str):
+    """The data charlie_munger_agent analyzes for a ticker, so backtests can reuse its signal while this is unchanged"""
+    return [
+        get_financial_metrics(ticker, end_date, period="annual", limit=10),
+        search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY),
+        get_market_cap(ticker, end_date),
+        get_insider_trades(ticker, end_date, start_date=None, limit=100),
+        get_company_news(ticker, end_date, start_date=None, limit=100),
+    ]
+
 
 class CharlieMungerSignal(BaseModel):
     signal: Literal["bullish", "bearish", "neutral"]
@@ -24,36 +59,12 @@ def charlie_munger_agent(state: AgentState):
     end_date = data["end_date"]
     tickers = data["tickers"]
     
-    analysis_data = {}
-    munger_analysis = {}
-    
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict[str, any]:
         progress.update_status("charlie_munger_agent", ticker, "Fetching financial metrics")
         metrics = get_financial_metrics(ticker, end_date, period="annual", limit=10)  # Munger looks at longer periods
         
         progress.update_status("charlie_munger_agent", ticker, "Gathering financial line items")
-        financial_line_items = search_line_items(
-            ticker,
-            [
-                "revenue",
-                "net_income",
-                "operating_income",
-                "return_on_invested_capital",
-                "gross_margin",
-                "operating_margin",
-                "free_cash_flow",
-                "capital_expenditure",
-                "cash_and_equivalents",
-                "total_debt",
-                "shareholders_equity",
-                "outstanding_shares",
-                "research_and_development",
-                "goodwill_and_intangible_assets",
-            ],
-            end_date,
-            period="annual",
-            limit=10  # Munger examines long-term trends
-        )
+        financial_line_items = search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY)
         
         progress.update_status("charlie_munger_agent", ticker, "Getting market cap")
         market_cap = get_market_cap(ticker, end_date)
@@ -109,7 +120,7 @@ def charlie_munger_agent(state: AgentState):
         else:
             signal = "neutral"
         
-        analysis_data[ticker] = {
+        return {
             "signal": signal,
             "score": total_score,
             "max_score": max_possible_score,
@@ -120,22 +131,29 @@ def charlie_munger_agent(state: AgentState):
             # Include some qualitative assessment from news
             "news_sentiment": analyze_news_sentiment(company_news) if company_news else "No news data available"
         }
-        
-        progress.update_status("charlie_munger_agent", ticker, "Generating Munger analysis")
-        munger_output = generate_munger_output(
-            ticker=ticker, 
-            analysis_data=analysis_data,
-            model_name=state["metadata"]["model_name"],
-            model_provider=state["metadata"]["model_provider"],
-        )
-        
-        munger_analysis[ticker] = {
+
+    analysis_data = map_tickers(analyze_ticker, tickers, get_max_workers(state))
+
+    progress.update_status("charlie_munger_agent", None, "Generating Munger analysis")
+    munger_outputs = generate_munger_outputs(
+        analysis_data=analysis_data,
+        model_name=state["metadata"]["model_name"],
+        model_provider=state["metadata"]["model_provider"],
+        batch_size=get_llm_batch_size(state),
+        max_workers=get_max_workers(state),
+        fast_margin=get_fast_mode_margin(state),
+    )
+
+    munger_analysis = {
+        ticker: {
             "signal": munger_output.signal,
             "confidence": munger_output.confidence,
             "reasoning": munger_output.reasoning
         }
-        
-        progress.update_status("charlie_munger_agent", ticker, "Done")
+        for ticker, munger_output in munger_outputs.items()
+    }
+
+    progress.update_status("charlie_munger_agent", None, "Done")
     
     # Wrap results in a single message for the chain
     message = HumanMessage(
@@ -660,14 +678,41 @@ def analyze_news_sentiment(news_items: list) -> str:
     return f"Qualitative review of {len(news_items)} recent news items would be needed"
 
 
-def generate_munger_output(
-    ticker: str,
+def generate_munger_outputs(
     analysis_data: dict[str, any],
     model_name: str,
     model_provider: str,
-) -> CharlieMungerSignal:
+    batch_size: int = 1,
+    max_workers: int = 1,
+    fast_margin: float | None = None,
+) -> dict[str, CharlieMungerSignal]:
     """
-    Generates investment decisions in the style of Charlie Munger.
+    Generates investment decisions in the style of Charlie Munger, batch_size tickers per LLM call.
+    """
+    def create_default_charlie_munger_signal():
+        return CharlieMungerSignal(
+            signal="neutral",
+            confidence=0.0,
+            reasoning="Error in analysis, defaulting to neutral"
+        )
+
+    return call_llm_batch(
+        build_prompt=lambda tickers: build_munger_prompt(tickers, analysis_data),
+        tickers=list(analysis_data),
+        model_name=model_name,
+        model_provider=model_provider,
+        pydantic_model=CharlieMungerSignal,
+        agent_name="charlie_munger_agent",
+        default_factory=create_default_charlie_munger_signal,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        decisive=decisive_signals(analysis_data, fast_margin, bullish_at=0.75, bearish_at=0.45),
+    )
+
+
+def build_munger_prompt(tickers: list[str], analysis_data: dict[str, any]):
+    """
+    Builds the Munger prompt for the analysis data of one or more tickers.
     """
     template = ChatPromptTemplate.from_messages([
         (
@@ -712,23 +757,7 @@ def generate_munger_output(
         )
     ])
 
-    prompt = template.invoke({
-        "analysis_data": json.dumps(analysis_data, indent=2),
-        "ticker": ticker
+    return template.invoke({
+        "analysis_data": compact_prompt_payload({ticker: analysis_data[ticker] for ticker in tickers}),
+        "ticker": ", ".join(tickers)
     })
-
-    def create_default_charlie_munger_signal():
-        return CharlieMungerSignal(
-            signal="neutral",
-            confidence=0.0,
-            reasoning="Error in analysis, defaulting to neutral"
-        )
-
-    return call_llm(
-        prompt=prompt, 
-        model_name=model_name, 
-        model_provider=model_provider, 
-        pydantic_model=CharlieMungerSignal, 
-        agent_name="charlie_munger_agent", 
-        default_factory=create_default_charlie_munger_signal,
-    )
\ No newline at end of file
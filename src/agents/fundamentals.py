@@ -1,11 +1,17 @@
 from langchain_core.messages import HumanMessage
 from graph.state import AgentState, show_agent_reasoning
+from utils.concurrency import get_max_workers, map_tickers
 from utils.progress import progress
 import json
 
 from tools.api import get_financial_metrics
 
 
+def get_agent_inputs(ticker: str, end_date: str):
+    """The data fundamentals_agent analyzes for a ticker, so backtests can reuse its signal while this is unchanged"""
+    return get_financial_metrics(ticker=ticker, end_date=end_date, period="ttm", limit=10)
+
+
 ##### Fundamental Agent #####
 def fundamentals_agent(state: AgentState):
     """Analyzes fundamental data and generates trading signals for multiple tickers."""
@@ -13,10 +19,7 @@ def fundamentals_agent(state: AgentState):
     end_date = data["end_date"]
     tickers = data["tickers"]
 
-    # Initialize fundamental analysis for each ticker
-    fundamental_analysis = {}
-
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict[str, any] | None:
         progress.update_status("fundamentals_agent", ticker, "Fetching financial metrics")
 
         # Get the financial metrics
@@ -29,7 +32,7 @@ def fundamentals_agent(state: AgentState):
 
         if not financial_metrics:
             progress.update_status("fundamentals_agent", ticker, "Failed: No financial metrics found")
-            continue
+            return None
 
         # Pull the most recent financial metrics
         metrics = financial_metrics[0]
@@ -132,13 +135,16 @@ def fundamentals_agent(state: AgentState):
         total_signals = len(signals)
         confidence = round(max(bullish_signals, bearish_signals) / total_signals, 2) * 100
 
-        fundamental_analysis[ticker] = {
+        ticker_analysis = {
             "signal": overall_signal,
             "confidence": confidence,
             "reasoning": reasoning,
         }
 
         progress.update_status("fundamentals_agent", ticker, "Done")
+        return ticker_analysis
+
+    fundamental_analysis = map_tickers(analyze_ticker, tickers, get_max_workers(state))
 
     # Create the fundamental analysis message
     message = HumanMessage(
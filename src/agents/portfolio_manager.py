@@ -6,7 +6,7 @@ from graph.state import AgentState, show_agent_reasoning
 from pydantic import BaseModel, Field
 from typing_extensions import Literal
 from utils.progress import progress
-from utils.llm import call_llm
+from utils.llm import call_llm, compact_prompt_payload
 
 
 class PortfolioDecision(BaseModel):
@@ -178,7 +178,8 @@ def generate_trading_decision(
     # Generate the prompt
     prompt = template.invoke(
         {
-            "signals_by_ticker": json.dumps(signals_by_ticker, indent=2),
+            # Prices, share limits and positions stay exact; only the signals are compacted
+            "signals_by_ticker": compact_prompt_payload(signals_by_ticker),
             "current_prices": json.dumps(current_prices, indent=2),
             "max_shares": json.dumps(max_shares, indent=2),
             "portfolio_cash": f"{portfolio.get('cash', 0):.2f}",
@@ -1,5 +1,6 @@
 from langchain_core.messages import HumanMessage
 from graph.state import AgentState, show_agent_reasoning
+from utils.concurrency import get_max_workers, map_tickers
 from utils.progress import progress
 import pandas as pd
 import numpy as np
@@ -8,6 +9,11 @@ import json
 from tools.api import get_insider_trades, get_company_news
 
 
+def get_agent_inputs(ticker: str, end_date: str):
+    """The data sentiment_agent analyzes for a ticker, so backtests can reuse its signal while this is unchanged"""
+    return [get_insider_trades(ticker=ticker, end_date=end_date, limit=1000), get_company_news(ticker, end_date, limit=100)]
+
+
 ##### Sentiment Agent #####
 def sentiment_agent(state: AgentState):
     """Analyzes market sentiment and generates trading signals for multiple tickers."""
@@ -15,10 +21,7 @@ def sentiment_agent(state: AgentState):
     end_date = data.get("end_date")
     tickers = data.get("tickers")
 
-    # Initialize sentiment analysis for each ticker
-    sentiment_analysis = {}
-
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict[str, any] | None:
         progress.update_status("sentiment_agent", ticker, "Fetching insider trades")
 
         # Get the insider trades
@@ -73,13 +76,16 @@ def sentiment_agent(state: AgentState):
             confidence = round(max(bullish_signals, bearish_signals) / total_weighted_signals, 2) * 100
         reasoning = f"Weighted Bullish signals: {bullish_signals:.1f}, Weighted Bearish signals: {bearish_signals:.1f}"
 
-        sentiment_analysis[ticker] = {
+        ticker_analysis = {
             "signal": overall_signal,
             "confidence": confidence,
             "reasoning": reasoning,
         }
 
         progress.update_status("sentiment_agent", ticker, "Done")
+        return ticker_analysis
+
+    sentiment_analysis = map_tickers(analyze_ticker, tickers, get_max_workers(state))
 
     # Create the sentiment message
     message = HumanMessage(
@@ -1,17 +1,32 @@
-import math
-
 from langchain_core.messages import HumanMessage
 
 from graph.state import AgentState, show_agent_reasoning
 
 import json
+import os
 import pandas as pd
-import numpy as np
 
-from tools.api import get_prices, prices_to_df
+from tools.api import get_price_frame
+from utils.indicators import HURST_WINDOW, adx, atr, bollinger_bands, build_price_panel, calculate_hurst_exponent, ema, latest_indicators, rsi
+from utils.concurrency import get_max_workers, map_tickers
 from utils.progress import progress
 
 
+# Bars of history needed before the first analysed day: 6-month momentum sums 126 daily
+# returns, the volatility regime averages 63 days of 21-day volatility, and the Hurst
+# exponent is fitted over the last HURST_WINDOW closes
+MIN_WARMUP_BARS = max(126, 21 + 63, HURST_WINDOW) + 1
+
+
+def get_warmup_bars() -> int:
+    """Get how many bars of history to fetch before the start date.
+
+    Taken from the TECHNICALS_WARMUP_BARS environment variable, but never fewer
+    than MIN_WARMUP_BARS so every indicator has a value.
+    """
+    return max(MIN_WARMUP_BARS, int(os.environ.get("TECHNICALS_WARMUP_BARS", MIN_WARMUP_BARS)))
+
+
 ##### Technical Analyst #####
 def technical_analyst_agent(state: AgentState):
     """
@@ -26,41 +41,52 @@ def technical_analyst_agent(state: AgentState):
     start_date = data["start_date"]
     end_date = data["end_date"]
     tickers = data["tickers"]
+    warmup_bars = get_warmup_bars()
 
-    # Initialize analysis for each ticker
-    technical_analysis = {}
-
-    for ticker in tickers:
+    def fetch_prices(ticker: str) -> pd.DataFrame | None:
         progress.update_status("technical_analyst_agent", ticker, "Analyzing price data")
 
-        # Get the historical price data
-        prices = get_prices(
+        # Get the historical price data, with enough earlier bars for the longest indicator
+        prices_df = get_price_frame(
             ticker=ticker,
             start_date=start_date,
             end_date=end_date,
+            warmup_bars=warmup_bars,
         )
 
-        if not prices:
+        if prices_df.empty:
             progress.update_status("technical_analyst_agent", ticker, "Failed: No price data found")
-            continue
+            return None
+        return prices_df
+
+    price_frames = map_tickers(fetch_prices, tickers, get_max_workers(state))
+
+    progress.update_status("technical_analyst_agent", None, "Calculating indicators")
+    streams = state["metadata"].get("indicator_streams")
+    if streams is not None:
+        # Advance the indicators kept across backtest days with just the bars that arrived since
+        latest = pd.DataFrame.from_dict({ticker: streams.update(ticker, prices_df) for ticker, prices_df in price_frames.items()}, orient="index")
+    else:
+        # Compute every indicator for all tickers in one vectorized pass, keeping each ticker's last bar
+        latest = latest_indicators(build_price_panel(price_frames)) if price_frames else pd.DataFrame()
 
-        # Convert prices to a DataFrame
-        prices_df = prices_to_df(prices)
+    def analyze_ticker(ticker: str) -> dict[str, any]:
+        indicators = latest.loc[ticker]
 
         progress.update_status("technical_analyst_agent", ticker, "Calculating trend signals")
-        trend_signals = calculate_trend_signals(prices_df)
+        trend_signals = calculate_trend_signals(indicators)
 
         progress.update_status("technical_analyst_agent", ticker, "Calculating mean reversion")
-        mean_reversion_signals = calculate_mean_reversion_signals(prices_df)
+        mean_reversion_signals = calculate_mean_reversion_signals(indicators)
 
         progress.update_status("technical_analyst_agent", ticker, "Calculating momentum")
-        momentum_signals = calculate_momentum_signals(prices_df)
+        momentum_signals = calculate_momentum_signals(indicators)
 
         progress.update_status("technical_analyst_agent", ticker, "Analyzing volatility")
-        volatility_signals = calculate_volatility_signals(prices_df)
+        volatility_signals = calculate_volatility_signals(indicators)
 
         progress.update_status("technical_analyst_agent", ticker, "Statistical analysis")
-        stat_arb_signals = calculate_stat_arb_signals(prices_df)
+        stat_arb_signals = calculate_stat_arb_signals(indicators)
 
         # Combine all signals using a weighted ensemble approach
         strategy_weights = {
@@ -84,7 +110,7 @@ def technical_analyst_agent(state: AgentState):
         )
 
         # Generate detailed analysis report for this ticker
-        technical_analysis[ticker] = {
+        ticker_analysis = {
             "signal": combined_signal["signal"],
             "confidence": round(combined_signal["confidence"] * 100),
             "strategy_signals": {
@@ -116,6 +142,9 @@ def technical_analyst_agent(state: AgentState):
             },
         }
         progress.update_status("technical_analyst_agent", ticker, "Done")
+        return ticker_analysis
+
+    technical_analysis = {ticker: analyze_ticker(ticker) for ticker in tickers if ticker in latest.index}
 
     # Create the technical analyst message
     message = HumanMessage(
@@ -135,29 +164,21 @@ def technical_analyst_agent(state: AgentState):
     }
 
 
-def calculate_trend_signals(prices_df):
+def calculate_trend_signals(indicators: pd.Series):
     """
     Advanced trend following strategy using multiple timeframes and indicators
     """
-    # Calculate EMAs for multiple timeframes
-    ema_8 = calculate_ema(prices_df, 8)
-    ema_21 = calculate_ema(prices_df, 21)
-    ema_55 = calculate_ema(prices_df, 55)
-
-    # Calculate ADX for trend strength
-    adx = calculate_adx(prices_df, 14)
-
-    # Determine trend direction and strength
-    short_trend = ema_8 > ema_21
-    medium_trend = ema_21 > ema_55
+    # Determine trend direction and strength from the 8/21/55 EMAs
+    short_trend = indicators["ema_8"] > indicators["ema_21"]
+    medium_trend = indicators["ema_21"] > indicators["ema_55"]
 
-    # Combine signals with confidence weighting
-    trend_strength = adx["adx"].iloc[-1] / 100.0
+    # Combine signals with confidence weighting, using ADX for trend strength
+    trend_strength = indicators["adx"] / 100.0
 
-    if short_trend.iloc[-1] and medium_trend.iloc[-1]:
+    if short_trend and medium_trend:
         signal = "bullish"
         confidence = trend_strength
-    elif not short_trend.iloc[-1] and not medium_trend.iloc[-1]:
+    elif not short_trend and not medium_trend:
         signal = "bearish"
         confidence = trend_strength
     else:
@@ -168,38 +189,27 @@ def calculate_trend_signals(prices_df):
         "signal": signal,
         "confidence": confidence,
         "metrics": {
-            "adx": float(adx["adx"].iloc[-1]),
+            "adx": float(indicators["adx"]),
             "trend_strength": float(trend_strength),
         },
     }
 
 
-def calculate_mean_reversion_signals(prices_df):
+def calculate_mean_reversion_signals(indicators: pd.Series):
     """
     Mean reversion strategy using statistical measures and Bollinger Bands
     """
-    # Calculate z-score of price relative to moving average
-    ma_50 = prices_df["close"].rolling(window=50).mean()
-    std_50 = prices_df["close"].rolling(window=50).std()
-    z_score = (prices_df["close"] - ma_50) / std_50
-
-    # Calculate Bollinger Bands
-    bb_upper, bb_lower = calculate_bollinger_bands(prices_df)
-
-    # Calculate RSI with multiple timeframes
-    rsi_14 = calculate_rsi(prices_df, 14)
-    rsi_28 = calculate_rsi(prices_df, 28)
-
-    # Mean reversion signals
-    price_vs_bb = (prices_df["close"].iloc[-1] - bb_lower.iloc[-1]) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])
+    # z-score of price relative to its 50-day moving average, and position within the Bollinger Bands
+    z_score = indicators["z_score"]
+    price_vs_bb = indicators["price_vs_bb"]
 
     # Combine signals
-    if z_score.iloc[-1] < -2 and price_vs_bb < 0.2:
+    if z_score < -2 and price_vs_bb < 0.2:
         signal = "bullish"
-        confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
-    elif z_score.iloc[-1] > 2 and price_vs_bb > 0.8:
+        confidence = min(abs(z_score) / 4, 1.0)
+    elif z_score > 2 and price_vs_bb > 0.8:
         signal = "bearish"
-        confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
+        confidence = min(abs(z_score) / 4, 1.0)
     else:
         signal = "neutral"
         confidence = 0.5
@@ -208,36 +218,26 @@ def calculate_mean_reversion_signals(prices_df):
         "signal": signal,
         "confidence": confidence,
         "metrics": {
-            "z_score": float(z_score.iloc[-1]),
+            "z_score": float(z_score),
             "price_vs_bb": float(price_vs_bb),
-            "rsi_14": float(rsi_14.iloc[-1]),
-            "rsi_28": float(rsi_28.iloc[-1]),
+            "rsi_14": float(indicators["rsi_14"]),
+            "rsi_28": float(indicators["rsi_28"]),
         },
     }
 
 
-def calculate_momentum_signals(prices_df):
+def calculate_momentum_signals(indicators: pd.Series):
     """
     Multi-factor momentum strategy
     """
-    # Price momentum
-    returns = prices_df["close"].pct_change()
-    mom_1m = returns.rolling(21).sum()
-    mom_3m = returns.rolling(63).sum()
-    mom_6m = returns.rolling(126).sum()
-
-    # Volume momentum
-    volume_ma = prices_df["volume"].rolling(21).mean()
-    volume_momentum = prices_df["volume"] / volume_ma
-
     # Relative strength
     # (would compare to market/sector in real implementation)
 
     # Calculate momentum score
-    momentum_score = (0.4 * mom_1m + 0.3 * mom_3m + 0.3 * mom_6m).iloc[-1]
+    momentum_score = 0.4 * indicators["momentum_1m"] + 0.3 * indicators["momentum_3m"] + 0.3 * indicators["momentum_6m"]
 
     # Volume confirmation
-    volume_confirmation = volume_momentum.iloc[-1] > 1.0
+    volume_confirmation = indicators["volume_momentum"] > 1.0
 
     if momentum_score > 0.05 and volume_confirmation:
         signal = "bullish"
@@ -253,38 +253,21 @@ def calculate_momentum_signals(prices_df):
         "signal": signal,
         "confidence": confidence,
         "metrics": {
-            "momentum_1m": float(mom_1m.iloc[-1]),
-            "momentum_3m": float(mom_3m.iloc[-1]),
-            "momentum_6m": float(mom_6m.iloc[-1]),
-            "volume_momentum": float(volume_momentum.iloc[-1]),
+            "momentum_1m": float(indicators["momentum_1m"]),
+            "momentum_3m": float(indicators["momentum_3m"]),
+            "momentum_6m": float(indicators["momentum_6m"]),
+            "volume_momentum": float(indicators["volume_momentum"]),
         },
     }
 
 
-def calculate_volatility_signals(prices_df):
+def calculate_volatility_signals(indicators: pd.Series):
     """
     Volatility-based trading strategy
     """
-    # Calculate various volatility metrics
-    returns = prices_df["close"].pct_change()
-
-    # Historical volatility
-    hist_vol = returns.rolling(21).std() * math.sqrt(252)
-
-    # Volatility regime detection
-    vol_ma = hist_vol.rolling(63).mean()
-    vol_regime = hist_vol / vol_ma
-
-    # Volatility mean reversion
-    vol_z_score = (hist_vol - vol_ma) / hist_vol.rolling(63).std()
-
-    # ATR ratio
-    atr = calculate_atr(prices_df)
-    atr_ratio = atr / prices_df["close"]
-
     # Generate signal based on volatility regime
-    current_vol_regime = vol_regime.iloc[-1]
-    vol_z = vol_z_score.iloc[-1]
+    current_vol_regime = indicators["volatility_regime"]
+    vol_z = indicators["volatility_z_score"]
 
     if current_vol_regime < 0.8 and vol_z < -1:
         signal = "bullish"  # Low vol regime, potential for expansion
@@ -300,36 +283,30 @@ def calculate_volatility_signals(prices_df):
         "signal": signal,
         "confidence": confidence,
         "metrics": {
-            "historical_volatility": float(hist_vol.iloc[-1]),
+            "historical_volatility": float(indicators["historical_volatility"]),
             "volatility_regime": float(current_vol_regime),
             "volatility_z_score": float(vol_z),
-            "atr_ratio": float(atr_ratio.iloc[-1]),
+            "atr_ratio": float(indicators["atr_ratio"]),
         },
     }
 
 
-def calculate_stat_arb_signals(prices_df):
+def calculate_stat_arb_signals(indicators: pd.Series):
     """
     Statistical arbitrage signals based on price action analysis
     """
-    # Calculate price distribution statistics
-    returns = prices_df["close"].pct_change()
-
-    # Skewness and kurtosis
-    skew = returns.rolling(63).skew()
-    kurt = returns.rolling(63).kurt()
-
-    # Test for mean reversion using Hurst exponent
-    hurst = calculate_hurst_exponent(prices_df["close"])
+    # Mean reversion via the Hurst exponent, plus the skew of the return distribution
+    hurst = indicators["hurst_exponent"]
+    skew = indicators["skewness"]
 
     # Correlation analysis
     # (would include correlation with related securities in real implementation)
 
     # Generate signal based on statistical properties
-    if hurst < 0.4 and skew.iloc[-1] > 1:
+    if hurst < 0.4 and skew > 1:
         signal = "bullish"
         confidence = (0.5 - hurst) * 2
-    elif hurst < 0.4 and skew.iloc[-1] < -1:
+    elif hurst < 0.4 and skew < -1:
         signal = "bearish"
         confidence = (0.5 - hurst) * 2
     else:
@@ -341,8 +318,8 @@ def calculate_stat_arb_signals(prices_df):
         "confidence": confidence,
         "metrics": {
             "hurst_exponent": float(hurst),
-            "skewness": float(skew.iloc[-1]),
-            "kurtosis": float(kurt.iloc[-1]),
+            "skewness": float(skew),
+            "kurtosis": float(indicators["kurtosis"]),
         },
     }
 
@@ -396,22 +373,11 @@ def normalize_pandas(obj):
 
 
 def calculate_rsi(prices_df: pd.DataFrame, period: int = 14) -> pd.Series:
-    delta = prices_df["close"].diff()
-    gain = (delta.where(delta > 0, 0)).fillna(0)
-    loss = (-delta.where(delta < 0, 0)).fillna(0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    return rsi(prices_df["close"], period)
 
 
 def calculate_bollinger_bands(prices_df: pd.DataFrame, window: int = 20) -> tuple[pd.Series, pd.Series]:
-    sma = prices_df["close"].rolling(window).mean()
-    std_dev = prices_df["close"].rolling(window).std()
-    upper_band = sma + (std_dev * 2)
-    lower_band = sma - (std_dev * 2)
-    return upper_band, lower_band
+    return bollinger_bands(prices_df["close"], window)
 
 
 def calculate_ema(df: pd.DataFrame, window: int) -> pd.Series:
@@ -425,7 +391,7 @@ def calculate_ema(df: pd.DataFrame, window: int) -> pd.Series:
     Returns:
         pd.Series: EMA values
     """
-    return df["close"].ewm(span=window, adjust=False).mean()
+    return ema(df["close"], window)
 
 
 def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
@@ -433,32 +399,13 @@ def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     Calculate Average Directional Index (ADX)
 
     Args:
-        df: DataFrame with OHLC data
+        df: DataFrame with OHLC data, left unchanged
         period: Period for calculations
 
     Returns:
         DataFrame with ADX values
     """
-    # Calculate True Range
-    df["high_low"] = df["high"] - df["low"]
-    df["high_close"] = abs(df["high"] - df["close"].shift())
-    df["low_close"] = abs(df["low"] - df["close"].shift())
-    df["tr"] = df[["high_low", "high_close", "low_close"]].max(axis=1)
-
-    # Calculate Directional Movement
-    df["up_move"] = df["high"] - df["high"].shift()
-    df["down_move"] = df["low"].shift() - df["low"]
-
-    df["plus_dm"] = np.where((df["up_move"] > df["down_move"]) & (df["up_move"] > 0), df["up_move"], 0)
-    df["minus_dm"] = np.where((df["down_move"] > df["up_move"]) & (df["down_move"] > 0), df["down_move"], 0)
-
-    # Calculate ADX
-    df["+di"] = 100 * (df["plus_dm"].ewm(span=period).mean() / df["tr"].ewm(span=period).mean())
-    df["-di"] = 100 * (df["minus_dm"].ewm(span=period).mean() / df["tr"].ewm(span=period).mean())
-    df["dx"] = 100 * abs(df["+di"] - df["-di"]) / (df["+di"] + df["-di"])
-    df["adx"] = df["dx"].ewm(span=period).mean()
-
-    return df[["adx", "+di", "-di"]]
+    return pd.DataFrame(adx(df["high"], df["low"], df["close"], period), index=df.index)
 
 
 def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
@@ -472,38 +419,4 @@ def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
     Returns:
         pd.Series: ATR values
     """
-    high_low = df["high"] - df["low"]
-    high_close = abs(df["high"] - df["close"].shift())
-    low_close = abs(df["low"] - df["close"].shift())
-
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = ranges.max(axis=1)
-
-    return true_range.rolling(period).mean()
-
-
-def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 20) -> float:
-    """
-    Calculate Hurst Exponent to determine long-term memory of time series
-    H < 0.5: Mean reverting series
-    H = 0.5: Random walk
-    H > 0.5: Trending series
-
-    Args:
-        price_series: Array-like price data
-        max_lag: Maximum lag for R/S calculation
-
-    Returns:
-        float: Hurst exponent
-    """
-    lags = range(2, max_lag)
-    # Add small epsilon to avoid log(0)
-    tau = [max(1e-8, np.sqrt(np.std(np.subtract(price_series[lag:], price_series[:-lag])))) for lag in lags]
-
-    # Return the Hurst exponent from linear fit
-    try:
-        reg = np.polyfit(np.log(lags), np.log(tau), 1)
-        return reg[0]  # Hurst exponent is the slope
-    except (ValueError, RuntimeWarning):
-        # Return 0.5 (random walk) if calculation fails
-        return 0.5
+    return pd.Series(atr(df["high"], df["low"], df["close"], period), index=df.index)
@@ -1,11 +1,31 @@
 from langchain_core.messages import HumanMessage
 from graph.state import AgentState, show_agent_reasoning
+from utils.concurrency import get_max_workers, map_tickers
 from utils.progress import progress
 import json
 
 from tools.api import get_financial_metrics, get_market_cap, search_line_items
 
 
+# Line items this agent reads, declared here so runs can prefetch them in batches
+LINE_ITEM_QUERY = {
+    "line_items": [
+        "free_cash_flow",
+        "net_income",
+        "depreciation_and_amortization",
+        "capital_expenditure",
+        "working_capital",
+    ],
+    "period": "ttm",
+    "limit": 2,
+}
+
+
+def get_agent_inputs(ticker: str, end_date: str):
+    """The data valuation_agent analyzes for a ticker, so backtests can reuse its signal while this is unchanged"""
+    return [get_financial_metrics(ticker=ticker, end_date=end_date, period="ttm"), search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY), get_market_cap(ticker=ticker, end_date=end_date)]
+
+
 ##### Valuation Agent #####
 def valuation_agent(state: AgentState):
     """Performs detailed valuation analysis using multiple methodologies for multiple tickers."""
@@ -13,10 +33,7 @@ def valuation_agent(state: AgentState):
     end_date = data["end_date"]
     tickers = data["tickers"]
 
-    # Initialize valuation analysis for each ticker
-    valuation_analysis = {}
-
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict[str, any] | None:
         progress.update_status("valuation_agent", ticker, "Fetching financial data")
 
         # Fetch the financial metrics
@@ -29,30 +46,18 @@ def valuation_agent(state: AgentState):
         # Add safety check for financial metrics
         if not financial_metrics:
             progress.update_status("valuation_agent", ticker, "Failed: No financial metrics found")
-            continue
+            return None
         
         metrics = financial_metrics[0]
 
         progress.update_status("valuation_agent", ticker, "Gathering line items")
         # Fetch the specific line_items that we need for valuation purposes
-        financial_line_items = search_line_items(
-            ticker=ticker,
-            line_items=[
-                "free_cash_flow",
-                "net_income",
-                "depreciation_and_amortization",
-                "capital_expenditure",
-                "working_capital",
-            ],
-            end_date=end_date,
-            period="ttm",
-            limit=2,
-        )
+        financial_line_items = search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY)
 
         # Add safety check for financial line items
         if len(financial_line_items) < 2:
             progress.update_status("valuation_agent", ticker, "Failed: Insufficient financial line items")
-            continue
+            return None
 
         # Pull the current and previous financial line items
         current_financial_line_item = financial_line_items[0]
@@ -112,13 +117,16 @@ def valuation_agent(state: AgentState):
         }
 
         confidence = round(abs(valuation_gap), 2) * 100
-        valuation_analysis[ticker] = {
+        ticker_analysis = {
             "signal": signal,
             "confidence": confidence,
             "reasoning": reasoning,
         }
 
         progress.update_status("valuation_agent", ticker, "Done")
+        return ticker_analysis
+
+    valuation_analysis = map_tickers(analyze_ticker, tickers, get_max_workers(state))
 
     message = HumanMessage(
         content=json.dumps(valuation_analysis),
@@ -5,10 +5,31 @@ from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from tools.api import get_financial_metrics, get_market_cap, search_line_items
-from utils.llm import call_llm
+from utils.llm import call_llm_batch, compact_prompt_payload, decisive_signals, get_fast_mode_margin, get_llm_batch_size
+from utils.concurrency import get_max_workers, map_tickers
 from utils.progress import progress
 
 
+# Line items this agent reads, declared here so runs can prefetch them in batches
+LINE_ITEM_QUERY = {
+    "line_items": [
+        "capital_expenditure",
+        "depreciation_and_amortization",
+        "net_income",
+        "outstanding_shares",
+        "total_assets",
+        "total_liabilities",
+    ],
+    "period": "ttm",
+    "limit": 5,
+}
+
+
+def get_agent_inputs(ticker: str, end_date: str):
+    """The data warren_buffett_agent analyzes for a ticker, so backtests can reuse its signal while this is unchanged"""
+    return [get_financial_metrics(ticker, end_date, period="ttm", limit=5), search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY), get_market_cap(ticker, end_date)]
+
+
 class WarrenBuffettSignal(BaseModel):
     signal: Literal["bullish", "bearish", "neutral"]
     confidence: float
@@ -22,29 +43,13 @@ def warren_buffett_agent(state: AgentState):
     tickers = data["tickers"]
 
     # Collect all analysis for LLM reasoning
-    analysis_data = {}
-    buffett_analysis = {}
-
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict[str, any]:
         progress.update_status("warren_buffett_agent", ticker, "Fetching financial metrics")
         # Fetch required data
         metrics = get_financial_metrics(ticker, end_date, period="ttm", limit=5)
 
         progress.update_status("warren_buffett_agent", ticker, "Gathering financial line items")
-        financial_line_items = search_line_items(
-            ticker,
-            [
-                "capital_expenditure",
-                "depreciation_and_amortization",
-                "net_income",
-                "outstanding_shares",
-                "total_assets",
-                "total_liabilities",
-            ],
-            end_date,
-            period="ttm",
-            limit=5,
-        )
+        financial_line_items = search_line_items(ticker, end_date=end_date, **LINE_ITEM_QUERY)
 
         progress.update_status("warren_buffett_agent", ticker, "Getting market cap")
         # Get current market cap
@@ -84,7 +89,7 @@ def warren_buffett_agent(state: AgentState):
             signal = "neutral"
 
         # Combine all analysis results
-        analysis_data[ticker] = {
+        return {
             "signal": signal,
             "score": total_score,
             "max_score": max_possible_score,
@@ -95,22 +100,29 @@ def warren_buffett_agent(state: AgentState):
             "margin_of_safety": margin_of_safety,
         }
 
-        progress.update_status("warren_buffett_agent", ticker, "Generating Buffett analysis")
-        buffett_output = generate_buffett_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            model_name=state["metadata"]["model_name"],
-            model_provider=state["metadata"]["model_provider"],
-        )
+    analysis_data = map_tickers(analyze_ticker, tickers, get_max_workers(state))
 
-        # Store analysis in consistent format with other agents
-        buffett_analysis[ticker] = {
+    progress.update_status("warren_buffett_agent", None, "Generating Buffett analysis")
+    buffett_outputs = generate_buffett_outputs(
+        analysis_data=analysis_data,
+        model_name=state["metadata"]["model_name"],
+        model_provider=state["metadata"]["model_provider"],
+        batch_size=get_llm_batch_size(state),
+        max_workers=get_max_workers(state),
+        fast_margin=get_fast_mode_margin(state),
+    )
+
+    # Store analysis in consistent format with other agents
+    buffett_analysis = {
+        ticker: {
             "signal": buffett_output.signal,
             "confidence": buffett_output.confidence,
             "reasoning": buffett_output.reasoning,
         }
+        for ticker, buffett_output in buffett_outputs.items()
+    }
 
-        progress.update_status("warren_buffett_agent", ticker, "Done")
+    progress.update_status("warren_buffett_agent", None, "Done")
 
     # Create the message
     message = HumanMessage(content=json.dumps(buffett_analysis), name="warren_buffett_agent")
@@ -284,13 +296,35 @@ def calculate_intrinsic_value(financial_line_items: list) -> dict[str, any]:
     }
 
 
-def generate_buffett_output(
-    ticker: str,
+def generate_buffett_outputs(
     analysis_data: dict[str, any],
     model_name: str,
     model_provider: str,
-) -> WarrenBuffettSignal:
-    """Get investment decision from LLM with Buffett's principles"""
+    batch_size: int = 1,
+    max_workers: int = 1,
+    fast_margin: float | None = None,
+) -> dict[str, WarrenBuffettSignal]:
+    """Get investment decisions from LLM with Buffett's principles, batch_size tickers per call"""
+    # Create default factory for WarrenBuffettSignal
+    def create_default_warren_buffett_signal():
+        return WarrenBuffettSignal(signal="neutral", confidence=0.0, reasoning="Error in analysis, defaulting to neutral")
+
+    return call_llm_batch(
+        build_prompt=lambda tickers: build_buffett_prompt(tickers, analysis_data),
+        tickers=list(analysis_data),
+        model_name=model_name,
+        model_provider=model_provider,
+        pydantic_model=WarrenBuffettSignal,
+        agent_name="warren_buffett_agent",
+        default_factory=create_default_warren_buffett_signal,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        decisive=decisive_signals(analysis_data, fast_margin),
+    )
+
+
+def build_buffett_prompt(tickers: list[str], analysis_data: dict[str, any]):
+    """Build the Buffett prompt for the analysis data of one or more tickers"""
     template = ChatPromptTemplate.from_messages(
         [
             (
@@ -332,20 +366,7 @@ def generate_buffett_output(
     )
 
     # Generate the prompt
-    prompt = template.invoke({
-        "analysis_data": json.dumps(analysis_data, indent=2), 
-        "ticker": ticker
+    return template.invoke({
+        "analysis_data": compact_prompt_payload({ticker: analysis_data[ticker] for ticker in tickers}),
+        "ticker": ", ".join(tickers)
       })
-
-    # Create default factory for WarrenBuffettSignal
-    def create_default_warren_buffett_signal():
-        return WarrenBuffettSignal(signal="neutral", confidence=0.0, reasoning="Error in analysis, defaulting to neutral")
-
-    return call_llm(
-        prompt=prompt, 
-        model_name=model_name, 
-        model_provider=model_provider, 
-        pydantic_model=WarrenBuffettSignal, 
-        agent_name="warren_buffett_agent", 
-        default_factory=create_default_warren_buffett_signal,
-        )
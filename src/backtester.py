@@ -8,19 +8,29 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from colorama import Fore, Style, init
 import numpy as np
+import functools
 import itertools
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from agents.technicals import get_warmup_bars
+from llm.cache import set_llm_cache_enabled
 from llm.models import LLM_ORDER, get_model_info
 from utils.analysts import ANALYST_ORDER
 from main import run_hedge_fund
 from tools.api import (
     get_company_news,
-    get_price_data,
+    get_price_frame,
     get_prices,
     get_financial_metrics,
     get_insider_trades,
+    warmup_start_date,
 )
 from utils.display import print_backtest_results, format_backtest_row
+from utils.incremental import IncrementalAnalysts
+from utils.streaming_indicators import IndicatorStreams
+from utils.telemetry import telemetry
 from typing_extensions import Callable
 
 init(autoreset=True)
@@ -38,6 +48,8 @@ class Backtester:
         model_provider: str = "OpenAI",
         selected_analysts: list[str] = [],
         initial_margin_requirement: float = 0.0,
+        prefetch_concurrency: int = 8,
+        incremental: bool = True,
     ):
         """
         :param agent: The trading agent (Callable).
@@ -49,6 +61,8 @@ class Backtester:
         :param model_provider: Which LLM provider (OpenAI, etc).
         :param selected_analysts: List of analyst names or IDs to incorporate.
         :param initial_margin_requirement: The margin ratio (e.g. 0.5 = 50%).
+        :param prefetch_concurrency: Maximum number of concurrent requests while pre-fetching data.
+        :param incremental: Reuse the previous day's signal of analysts whose input data has not changed, and advance the technical indicators with only each day's new bars.
         """
         self.agent = agent
         self.tickers = tickers
@@ -58,6 +72,11 @@ class Backtester:
         self.model_name = model_name
         self.model_provider = model_provider
         self.selected_analysts = selected_analysts
+        self.prefetch_concurrency = prefetch_concurrency
+        # Analyst signals kept across days, passed to the agent as run_hedge_fund's incremental
+        self.incremental = IncrementalAnalysts() if incremental else None
+        # Technical indicator state kept across days, passed to the agent as run_hedge_fund's indicator_streams
+        self.indicator_streams = IndicatorStreams() if incremental else None
 
         # Store the margin ratio (e.g. 0.5 means 50% margin required).
         self.margin_ratio = initial_margin_requirement
@@ -274,23 +293,39 @@ class Backtester:
         """Pre-fetch all data needed for the backtest period."""
         print("\nPre-fetching data for the entire backtest period...")
 
-        # Convert end_date string to datetime, fetch up to 1 year before
+        # Convert end_date string to datetime, fetch up to 1 year before, or further back for the technicals' warm-up
         end_date_dt = datetime.strptime(self.end_date, "%Y-%m-%d")
         start_date_dt = end_date_dt - relativedelta(years=1)
-        start_date_str = start_date_dt.strftime("%Y-%m-%d")
+        first_lookback_start = (datetime.strptime(self.start_date, "%Y-%m-%d") - timedelta(days=30)).strftime("%Y-%m-%d")
+        start_date_str = min(start_date_dt.strftime("%Y-%m-%d"), warmup_start_date(first_lookback_start, get_warmup_bars()))
 
+        # One task per (ticker, endpoint); the shared rate limiter in tools.transport keeps us within the provider's quota
+        tasks = []
         for ticker in self.tickers:
             # Fetch price data for the entire period, plus 1 year
-            get_prices(ticker, start_date_str, self.end_date)
-
-            # Fetch financial metrics
-            get_financial_metrics(ticker, self.end_date, limit=10)
-
-            # Fetch insider trades
-            get_insider_trades(ticker, self.end_date, start_date=self.start_date, limit=1000)
-
-            # Fetch company news
-            get_company_news(ticker, self.end_date, start_date=self.start_date, limit=1000)
+            tasks.append(("prices", ticker, lambda t=ticker: get_prices(t, start_date_str, self.end_date)))
+            tasks.append(("financial_metrics", ticker, lambda t=ticker: get_financial_metrics(t, self.end_date, limit=10)))
+            tasks.append(("insider_trades", ticker, lambda t=ticker: get_insider_trades(t, self.end_date, start_date=self.start_date, limit=1000)))
+            tasks.append(("company_news", ticker, lambda t=ticker: get_company_news(t, self.end_date, start_date=self.start_date, limit=1000)))
+
+        def timed(fetch):
+            started = time.perf_counter()
+            fetch()
+            return time.perf_counter() - started
+
+        timings = defaultdict(list)
+        with ThreadPoolExecutor(max_workers=max(1, self.prefetch_concurrency)) as executor:
+            futures = {executor.submit(timed, fetch): (endpoint, ticker) for endpoint, ticker, fetch in tasks}
+            for future in as_completed(futures):
+                endpoint, ticker = futures[future]
+                try:
+                    timings[endpoint].append(future.result())
+                except Exception as e:
+                    # Agents will retry the fetch on demand, so don't abort the whole backtest
+                    print(f"{Fore.RED}Error pre-fetching {endpoint} for {ticker}: {e}{Style.RESET_ALL}")
+
+        for endpoint, durations in timings.items():
+            print(f"  {endpoint:<18} {len(durations):>4} calls  total {sum(durations):7.2f}s  avg {sum(durations) / len(durations):6.2f}s  max {max(durations):6.2f}s")
 
         print("Data pre-fetch complete.")
 
@@ -340,7 +375,7 @@ class Backtester:
             # Get current prices for all tickers
             try:
                 current_prices = {
-                    ticker: get_price_data(ticker, previous_date_str, current_date_str).iloc[-1]["close"]
+                    ticker: get_price_frame(ticker, previous_date_str, current_date_str)["close"].iloc[-1]
                     for ticker in self.tickers
                 }
             except Exception:
@@ -359,6 +394,8 @@ class Backtester:
                 model_name=self.model_name,
                 model_provider=self.model_provider,
                 selected_analysts=self.selected_analysts,
+                **({"incremental": self.incremental} if self.incremental is not None else {}),
+                **({"indicator_streams": self.indicator_streams} if self.indicator_streams is not None else {}),
             )
             decisions = output["decisions"]
             analyst_signals = output["analyst_signals"]
@@ -649,8 +686,38 @@ if __name__ == "__main__":
         default=0.0,
         help="Margin ratio for short positions, e.g. 0.5 for 50% (default: 0.0)",
     )
+    parser.add_argument(
+        "--prefetch-concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent API requests while pre-fetching data (default: 8)",
+    )
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Always call the LLM instead of reusing responses cached for identical prompts",
+    )
+    parser.add_argument(
+        "--telemetry",
+        type=str,
+        metavar="PATH",
+        help="Write per-call LLM token, latency and retry telemetry, summarized per agent and per day, to PATH (.json or .csv)",
+    )
+    parser.add_argument(
+        "--no-incremental",
+        action="store_true",
+        help="Rerun every analyst and recompute every technical indicator on every day instead of reusing what has not changed",
+    )
+    parser.add_argument(
+        "--fast-mode",
+        action="store_true",
+        default=None,
+        help="Skip the LLM for tickers whose persona score is decisively bullish or bearish (default: FAST_MODE)",
+    )
 
     args = parser.parse_args()
+    if args.no_llm_cache:
+        set_llm_cache_enabled(False)
 
     # Parse tickers from comma-separated string
     tickers = [ticker.strip() for ticker in args.tickers.split(",")] if args.tickers else []
@@ -708,7 +775,7 @@ if __name__ == "__main__":
 
     # Create and run the backtester
     backtester = Backtester(
-        agent=run_hedge_fund,
+        agent=functools.partial(run_hedge_fund, fast_mode=args.fast_mode),
         tickers=tickers,
         start_date=args.start_date,
         end_date=args.end_date,
@@ -717,7 +784,15 @@ if __name__ == "__main__":
         model_provider=model_provider,
         selected_analysts=selected_analysts,
         initial_margin_requirement=args.margin_requirement,
+        prefetch_concurrency=args.prefetch_concurrency,
+        incremental=not args.no_incremental,
     )
 
     performance_metrics = backtester.run_backtest()
     performance_df = backtester.analyze_performance()
+    if backtester.incremental is not None:
+        for analyst, counts in backtester.incremental.stats().items():
+            print(f"{analyst}: reused {counts['reused']} unchanged ticker signals, reran {counts['rerun']}")
+    if args.telemetry:
+        telemetry.export(args.telemetry)
+        print(f"LLM telemetry written to {args.telemetry}")
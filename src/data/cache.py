@@ -1,91 +1,327 @@
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from data.store import SQLiteStore
+
+
+# Default time-to-live (in seconds) of persisted entries per data type.
+# Filings are append-only upstream, so they can be kept longer than news and
+# insider trades, which keep arriving for recent dates.  Past price bars never
+# change, so prices are kept for good and the TTL only expires the bars of the
+# last PRICE_REVISION_DAYS before they were saved.
+DEFAULT_TTL = {
+    "prices": 24 * 60 * 60,
+    "financial_metrics": 7 * 24 * 60 * 60,
+    "line_items": 7 * 24 * 60 * 60,
+    "insider_trades": 12 * 60 * 60,
+    "company_news": 12 * 60 * 60,
+}
+
+# Typical number of days between consecutive report periods, and how much
+# earlier than that a new period may end (e.g. a 52/53-week fiscal year)
+LINE_ITEM_CADENCE_DAYS = {"annual": 365, "ttm": 91, "quarterly": 91}
+LINE_ITEM_CADENCE_SLACK_DAYS = 20
+
+# Days before a save whose bars may still be corrected upstream, refetched once the prices TTL has passed
+PRICE_REVISION_DAYS = 7
+
+# Lower bound for intervals that reach back to the start of a ticker's history
+_EARLIEST_DATE = "0001-01-01"
+
+# Column layout of cached price frames, matching Price.model_dump()
+PRICE_COLUMNS = ["open", "close", "high", "low", "volume", "time"]
+
+
 class Cache:
-    """In-memory cache for API responses."""
+    """In-memory cache for API responses, optionally backed by a persistent store."""
 
-    def __init__(self):
-        self._prices_cache: dict[str, list[dict[str, any]]] = {}
+    def __init__(self, store: SQLiteStore | None = None, ttl: dict[str, float] | None = None):
+        # Prices are kept per ticker as a time-sorted frame plus a parallel array of
+        # "YYYY-MM-DD" days, so date ranges can be sliced with a binary search
+        self._prices_cache: dict[str, pd.DataFrame] = {}
+        self._price_days: dict[str, np.ndarray] = {}
+        self._price_coverage: dict[str, list[tuple[str, str]]] = {}
         self._financial_metrics_cache: dict[str, list[dict[str, any]]] = {}
-        self._line_items_cache: dict[str, list[dict[str, any]]] = {}
+        self._line_items_cache: dict[str, dict[str, any]] = {}
         self._insider_trades_cache: dict[str, list[dict[str, any]]] = {}
         self._company_news_cache: dict[str, list[dict[str, any]]] = {}
+        self._store = store
+        self._ttl = {**DEFAULT_TTL, **(ttl or {})}
+        # Fetchers may run on several threads at once (e.g. the backtester prefetch)
+        self._lock = threading.RLock()
 
     def _merge_data(self, existing: list[dict] | None, new_data: list[dict], key_field: str) -> list[dict]:
         """Merge existing and new data, avoiding duplicates based on a key field."""
         if not existing:
             return new_data
-        
+
         # Create a set of existing keys for O(1) lookup
         existing_keys = {item[key_field] for item in existing}
-        
+
         # Only add items that don't exist yet
         merged = existing.copy()
         merged.extend([item for item in new_data if item[key_field] not in existing_keys])
         return merged
 
+    def _get(self, data_type: str, memory: dict[str, list[dict[str, any]]], ticker: str) -> list[dict[str, any]] | None:
+        """Read from memory first, warming it from the persistent store on a miss."""
+        with self._lock:
+            if ticker not in memory and self._store is not None:
+                persisted = self._store.load(data_type, ticker, max_age=self._ttl.get(data_type))
+                if persisted is not None:
+                    memory[ticker] = persisted
+            return memory.get(ticker)
+
+    def _set(self, data_type: str, memory: dict[str, list[dict[str, any]]], ticker: str, data: list[dict[str, any]], key_field: str):
+        """Merge new data into memory and write the result through to the persistent store."""
+        with self._lock:
+            memory[ticker] = self._merge_data(self._get(data_type, memory, ticker), data, key_field=key_field)
+            if self._store is not None:
+                self._store.save(data_type, ticker, memory[ticker])
+
+    def _load_prices(self, ticker: str):
+        """Warm prices and their coverage from the persistent store on a miss."""
+        if ticker in self._prices_cache or self._store is None:
+            return
+        with self._lock:
+            persisted = self._store.load("prices", ticker)
+            if persisted is None or ticker in self._prices_cache:
+                return
+            frame = _build_price_frame(persisted["rows"])
+            coverage = [tuple(interval) for interval in persisted["coverage"]]
+            saved_at = persisted.get("saved_at", 0.0)
+            max_age = self._ttl.get("prices")
+            if max_age is not None and time.time() - saved_at > max_age:
+                # Forget the recent bars so they are fetched again; older ones are final
+                cutoff = _shift_date(date.fromtimestamp(saved_at).isoformat(), -PRICE_REVISION_DAYS)
+                frame = frame[frame["time"].str.slice(0, 10) <= cutoff]
+                coverage = [(start, min(end, cutoff)) for start, end in coverage if start <= cutoff]
+            self._store_price_frame(ticker, frame)
+            self._price_coverage[ticker] = coverage
+
+    def _save_prices(self, ticker: str):
+        if self._store is not None:
+            rows = self._prices_cache[ticker][PRICE_COLUMNS].to_dict("records") if ticker in self._prices_cache else []
+            self._store.save("prices", ticker, {"rows": rows, "coverage": self._price_coverage.get(ticker, []), "saved_at": time.time()})
+
+    def _store_price_frame(self, ticker: str, frame: pd.DataFrame):
+        self._prices_cache[ticker] = frame
+        self._price_days[ticker] = frame["time"].str.slice(0, 10).to_numpy(dtype="U10")
+
     def get_prices(self, ticker: str) -> list[dict[str, any]] | None:
         """Get cached price data if available."""
-        return self._prices_cache.get(ticker)
+        self._load_prices(ticker)
+        if ticker not in self._prices_cache:
+            return None
+        return self._prices_cache[ticker][PRICE_COLUMNS].to_dict("records")
+
+    def get_price_range(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """Get the cached prices between two dates (inclusive) as a slice of the time-sorted frame."""
+        self._load_prices(ticker)
+        with self._lock:
+            if ticker not in self._prices_cache:
+                return _build_price_frame([])
+            frame, days = self._prices_cache[ticker], self._price_days[ticker]
+        start = np.searchsorted(days, start_date, side="left")
+        end = np.searchsorted(days, end_date, side="right")
+        return frame.iloc[start:end]
 
     def set_prices(self, ticker: str, data: list[dict[str, any]]):
         """Append new price data to cache."""
-        self._prices_cache[ticker] = self._merge_data(
-            self._prices_cache.get(ticker),
-            data,
-            key_field="time"
-        )
+        self.fill_prices(ticker, data)
+
+    def fill_prices(self, ticker: str, data: list[dict[str, any]], start_date: str | None = None, end_date: str | None = None):
+        """Append new price data and record [start_date, end_date] as covered, writing the store once."""
+        self._load_prices(ticker)
+        new_frame = _build_price_frame(data) if data else None
+        with self._lock:
+            if new_frame is not None:
+                if ticker in self._prices_cache:
+                    # Keep existing rows on duplicate timestamps, as _merge_data does
+                    merged = pd.concat([self._prices_cache[ticker], new_frame])
+                    new_frame = merged[~merged["time"].duplicated(keep="first")].sort_index(kind="stable")
+                self._store_price_frame(ticker, new_frame)
+            if start_date is not None and end_date is not None and start_date <= end_date:
+                self._price_coverage[ticker] = _merge_intervals(self._price_coverage.get(ticker, []) + [(start_date, end_date)])
+            self._save_prices(ticker)
+
+    def get_price_coverage(self, ticker: str) -> list[tuple[str, str]]:
+        """Get the sorted, non-overlapping [start, end] date intervals the price cache holds."""
+        self._load_prices(ticker)
+        return list(self._price_coverage.get(ticker, []))
+
+    def add_price_coverage(self, ticker: str, start_date: str, end_date: str):
+        """Record that every trading day in [start_date, end_date] has been fetched."""
+        if start_date > end_date:
+            return
+        self.fill_prices(ticker, [], start_date, end_date)
+
+    def missing_price_ranges(self, ticker: str, start_date: str, end_date: str) -> list[tuple[str, str]]:
+        """Get the sub-ranges of [start_date, end_date] that are not covered by the price cache."""
+        if start_date > end_date:
+            return []
+        gaps = []
+        cursor = start_date
+        for covered_start, covered_end in self.get_price_coverage(ticker):
+            if covered_end < cursor:
+                continue
+            if covered_start > end_date:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, _shift_date(covered_start, -1)))
+            cursor = _shift_date(covered_end, 1)
+            if cursor > end_date:
+                return gaps
+        gaps.append((cursor, end_date))
+        return gaps
 
     def get_financial_metrics(self, ticker: str) -> list[dict[str, any]]:
         """Get cached financial metrics if available."""
-        return self._financial_metrics_cache.get(ticker)
+        return self._get("financial_metrics", self._financial_metrics_cache, ticker)
 
     def set_financial_metrics(self, ticker: str, data: list[dict[str, any]]):
         """Append new financial metrics to cache."""
-        self._financial_metrics_cache[ticker] = self._merge_data(
-            self._financial_metrics_cache.get(ticker),
-            data,
-            key_field="report_period"
-        )
-
-    def get_line_items(self, ticker: str) -> list[dict[str, any]] | None:
-        """Get cached line items if available."""
-        return self._line_items_cache.get(ticker)
-
-    def set_line_items(self, ticker: str, data: list[dict[str, any]]):
-        """Append new line items to cache."""
-        self._line_items_cache[ticker] = self._merge_data(
-            self._line_items_cache.get(ticker),
-            data,
-            key_field="report_period"
-        )
+        self._set("financial_metrics", self._financial_metrics_cache, ticker, data, key_field="report_period")
+
+    def _line_item_entry(self, ticker: str, period: str) -> dict[str, any]:
+        """Get (or create) the line item entry of a ticker and period.
+
+        `rows` maps report_period to the merged line item dict, `fields` maps
+        report_period to the fields fetched for it, and `coverage` lists the
+        report_period intervals in which every existing period is known.
+        """
+        entry = self._get("line_items", self._line_items_cache, f"{ticker}:{period}")
+        if entry is None:
+            entry = self._line_items_cache[f"{ticker}:{period}"] = {"rows": {}, "fields": {}, "coverage": []}
+        return entry
+
+    def get_line_item_periods(self, ticker: str, period: str, end_date: str, limit: int) -> list[str] | None:
+        """Get the report periods a search up to end_date would return, or None if the cache cannot tell.
+
+        Any end_date that maps to the same known report periods is answered,
+        including dates past the last search as long as they fall before the
+        next report period could possibly end.
+        """
+        with self._lock:
+            entry = self._line_item_entry(ticker, period)
+            known = sorted(entry["rows"], reverse=True)
+            periods = [p for p in known if p <= end_date][:limit]
+            coverage = [tuple(interval) for interval in entry["coverage"]]
+
+        if known:
+            # No newer report period can exist before the latest one plus the reporting cadence
+            gaps = [(date.fromisoformat(a) - date.fromisoformat(b)).days for a, b in zip(known, known[1:])]
+            cadence = min(gaps + [LINE_ITEM_CADENCE_DAYS.get(period, 91)]) - LINE_ITEM_CADENCE_SLACK_DAYS
+            coverage = _merge_intervals(coverage + [(known[0], _shift_date(known[0], max(cadence, 0)))])
+
+        # Every period between the oldest one we would return (or the dawn of time) and end_date must be known
+        lower = periods[-1] if len(periods) == limit else _EARLIEST_DATE
+        if any(start <= lower and end_date <= end for start, end in coverage):
+            return periods
+        return None
+
+    def get_line_items(self, ticker: str, period: str, report_periods: list[str], line_items: list[str]) -> tuple[list[dict[str, any]], list[str]]:
+        """Get the cached line items of some report periods, plus the requested fields not cached for all of them."""
+        with self._lock:
+            entry = self._line_item_entry(ticker, period)
+            rows = [dict(entry["rows"][p]) for p in report_periods]
+            missing = [field for field in line_items if any(field not in entry["fields"][p] for p in report_periods)]
+        return rows, missing
+
+    def set_line_items(self, ticker: str, period: str, end_date: str, line_items: list[str], data: list[dict[str, any]], complete: bool = False):
+        """Merge the result of a line item search into the cache at field granularity.
+
+        `complete` says the search returned every report period up to end_date,
+        i.e. the response was not cut off by its limit.
+        """
+        with self._lock:
+            entry = self._line_item_entry(ticker, period)
+            for item in data:
+                report_period = item["report_period"]
+                entry["rows"].setdefault(report_period, {}).update(item)
+                entry["fields"][report_period] = sorted(set(entry["fields"].get(report_period, [])) | set(line_items))
+
+            # Results come newest first, so a cut-off response still holds every period between its oldest one
+            # and end_date, and one that was not cut off holds the whole history up to end_date
+            periods = sorted(item["report_period"] for item in data)
+            if complete or periods:
+                lower = _EARLIEST_DATE if complete else periods[0]
+                entry["coverage"] = [list(interval) for interval in _merge_intervals([tuple(i) for i in entry["coverage"]] + [(lower, end_date)])]
+
+            if self._store is not None:
+                self._store.save("line_items", f"{ticker}:{period}", entry)
 
     def get_insider_trades(self, ticker: str) -> list[dict[str, any]] | None:
         """Get cached insider trades if available."""
-        return self._insider_trades_cache.get(ticker)
+        return self._get("insider_trades", self._insider_trades_cache, ticker)
 
     def set_insider_trades(self, ticker: str, data: list[dict[str, any]]):
         """Append new insider trades to cache."""
-        self._insider_trades_cache[ticker] = self._merge_data(
-            self._insider_trades_cache.get(ticker),
-            data,
-            key_field="filing_date"  # Could also use transaction_date if preferred
-        )
+        self._set("insider_trades", self._insider_trades_cache, ticker, data, key_field="filing_date")  # Could also use transaction_date if preferred
 
     def get_company_news(self, ticker: str) -> list[dict[str, any]] | None:
         """Get cached company news if available."""
-        return self._company_news_cache.get(ticker)
+        return self._get("company_news", self._company_news_cache, ticker)
 
     def set_company_news(self, ticker: str, data: list[dict[str, any]]):
         """Append new company news to cache."""
-        self._company_news_cache[ticker] = self._merge_data(
-            self._company_news_cache.get(ticker),
-            data,
-            key_field="date"
-        )
+        self._set("company_news", self._company_news_cache, ticker, data, key_field="date")
+
+
+def _build_price_frame(rows: list[dict[str, any]]) -> pd.DataFrame:
+    """Build a typed, time-sorted price frame indexed by date from price dicts."""
+    df = pd.DataFrame(rows, columns=PRICE_COLUMNS)
+    df["Date"] = pd.to_datetime(df["time"])
+    df.set_index("Date", inplace=True)
+    for col in ["open", "close", "high", "low", "volume"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df.sort_index(inplace=True, kind="stable")
+    return df
+
+
+def _shift_date(day: str, days: int) -> str:
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+
+def _merge_intervals(intervals: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Merge overlapping or adjacent date intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= _shift_date(merged[-1][1], 1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _create_cache() -> Cache:
+    """Create the global cache, persisting to CACHE_DIR when it is set."""
+    cache_dir = os.environ.get("CACHE_DIR")
+    if not cache_dir:
+        return Cache()
+
+    # Per data type TTL overrides, e.g. CACHE_TTL_PRICES=3600
+    ttl = {}
+    for data_type in DEFAULT_TTL:
+        if value := os.environ.get(f"CACHE_TTL_{data_type.upper()}"):
+            ttl[data_type] = float(value)
+
+    store = SQLiteStore(os.path.join(os.path.expanduser(cache_dir), "api_cache.sqlite"))
+    return Cache(store=store, ttl=ttl)
 
 
-# Global cache instance
-_cache = Cache()
+# Global cache instance, created on first use so that .env has been loaded
+_cache: Cache | None = None
 
 
 def get_cache() -> Cache:
     """Get the global cache instance."""
+    global _cache
+    if _cache is None:
+        _cache = _create_cache()
     return _cache
@@ -0,0 +1,78 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Bump this whenever the shape of the cached payloads changes.  Stores written
+# with a different version are dropped on open instead of being misread.
+SCHEMA_VERSION = 3
+
+
+class SQLiteStore:
+    """Persistent key-value store for cached API responses, backed by SQLite.
+
+    Payloads are stored as JSON under a (data_type, key) pair together with the
+    time they were written, so callers can apply a per data type TTL on load.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is None or int(row[0]) != SCHEMA_VERSION:
+                # Unknown or outdated layout, start from a clean slate
+                self._conn.execute("DROP TABLE IF EXISTS entries")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    data_type TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (data_type, key)
+                )
+                """
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+
+    def load(self, data_type: str, key: str, max_age: float | None = None) -> any:
+        """Load a payload, or None if it is missing or older than max_age seconds."""
+        with self._lock:
+            row = self._conn.execute("SELECT payload, updated_at FROM entries WHERE data_type = ? AND key = ?", (data_type, key)).fetchone()
+        if row is None:
+            return None
+        payload, updated_at = row
+        if max_age is not None and time.time() - updated_at > max_age:
+            return None
+        return json.loads(payload)
+
+    def save(self, data_type: str, key: str, payload: any):
+        """Write a payload, replacing any previous value for the same key."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (data_type, key, payload, updated_at) VALUES (?, ?, ?, ?)",
+                (data_type, key, json.dumps(payload), time.time()),
+            )
+
+    def clear(self, data_type: str | None = None):
+        """Remove every entry, or only the entries of one data type."""
+        with self._lock, self._conn:
+            if data_type is None:
+                self._conn.execute("DELETE FROM entries")
+            else:
+                self._conn.execute("DELETE FROM entries WHERE data_type = ?", (data_type,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,146 @@
+"""Content-addressed cache of parsed LLM responses"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from pydantic import BaseModel
+
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+class LLMCache:
+    """LRU cache of parsed LLM responses keyed by a hash of the model, output schema and prompt.
+
+    Entries are kept in memory and, when a path is given, in SQLite so that
+    repeated runs over the same data skip the LLM entirely.  Both are bounded
+    to max_entries, evicting the least recently used response first.
+    """
+
+    def __init__(self, path: str | None = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_used = 0.0
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, payload TEXT NOT NULL, last_used REAL NOT NULL)")
+                self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def get(self, key: str) -> dict | None:
+        """Get a cached response payload, marking it as recently used."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                payload = self._memory[key]
+            elif self._conn is not None:
+                row = self._conn.execute("SELECT payload FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                payload = json.loads(row[0])
+                self._remember(key, payload)
+            else:
+                return None
+
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (self._tick(), key))
+            return payload
+
+    def set(self, key: str, payload: dict):
+        """Cache a response payload, evicting the least recently used ones beyond max_entries."""
+        with self._lock:
+            self._remember(key, payload)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO responses (key, payload, last_used) VALUES (?, ?, ?)", (key, json.dumps(payload), self._tick()))
+                    (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+                    if count > self.max_entries:
+                        self._conn.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (count - self.max_entries,))
+
+    def _tick(self) -> float:
+        # Strictly increasing, so recency is well defined even on coarse clocks
+        self._last_used = max(time.time(), self._last_used + 1e-6)
+        return self._last_used
+
+    def _remember(self, key: str, payload: dict):
+        self._memory[key] = payload
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _render_prompt(prompt: any) -> any:
+    """Turn a prompt into plain JSON data covering everything the model sees."""
+    if hasattr(prompt, "to_messages"):
+        prompt = prompt.to_messages()
+    if isinstance(prompt, str):
+        return prompt
+    return [[message.type, message.content] for message in prompt]
+
+
+def make_cache_key(model_name: str, model_provider: str, pydantic_model: type[BaseModel], prompt: any) -> str:
+    """Hash the model, output schema and rendered prompt of an LLM call."""
+    content = json.dumps(
+        [model_name, str(model_provider), pydantic_model.model_json_schema(), _render_prompt(prompt)],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _create_llm_cache() -> LLMCache | None:
+    """Create the global LLM cache, persisting to CACHE_DIR when it is set."""
+    if os.environ.get("LLM_CACHE", "on").lower() in ("0", "off", "false", "no"):
+        return None
+    max_entries = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    cache_dir = os.environ.get("CACHE_DIR")
+    path = os.path.join(os.path.expanduser(cache_dir), "llm_cache.sqlite") if cache_dir else None
+    return LLMCache(path, max_entries=max_entries)
+
+
+# Global LLM cache, created on first use so that .env has been loaded
+_llm_cache: LLMCache | None = None
+_enabled = True
+_init_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache | None:
+    """Get the global LLM cache, or None if caching LLM responses is turned off."""
+    global _llm_cache
+    if not _enabled:
+        return None
+    with _init_lock:
+        if _llm_cache is None:
+            _llm_cache = _create_llm_cache()
+        return _llm_cache
+
+
+def set_llm_cache_enabled(enabled: bool):
+    """Turn the LLM response cache on or off for this process (e.g. from a --no-llm-cache flag)."""
+    global _enabled
+    _enabled = enabled
@@ -1,4 +1,6 @@
+import hashlib
 import os
+import threading
 from langchain_anthropic import ChatAnthropic
 from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI
@@ -106,4 +108,55 @@ def get_model(model_name: str, model_provider: ModelProvider) -> ChatOpenAI | Ch
         if not api_key:
             print(f"API Key Error: Please make sure ANTHROPIC_API_KEY is set in your .env file.")
             raise ValueError("Anthropic API key not found.  Please make sure ANTHROPIC_API_KEY is set in your .env file.")
-        return ChatAnthropic(model=model_name, api_key=api_key)
\ No newline at end of file
+        return ChatAnthropic(model=model_name, api_key=api_key)
+
+# Environment variable holding each provider's API key
+PROVIDER_API_KEY_ENV = {
+    ModelProvider.GROQ: "GROQ_API_KEY",
+    ModelProvider.OPENAI: "OPENAI_API_KEY",
+    ModelProvider.ANTHROPIC: "ANTHROPIC_API_KEY",
+}
+
+# Chat clients and structured-output runnables shared by every call_llm
+_model_registry: dict[tuple, any] = {}
+_registry_lock = threading.Lock()
+
+
+def _api_key_fingerprint(model_provider: str) -> str:
+    env = PROVIDER_API_KEY_ENV.get(model_provider)
+    api_key = os.getenv(env, "") if env else ""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def get_cached_model(model_name: str, model_provider: ModelProvider, pydantic_model: type[BaseModel] | None = None, method: str = "json_mode"):
+    """Get a shared chat model, wrapped for structured output when pydantic_model is given.
+
+    Clients are memoized per (provider, model, schema) so agents and backtest
+    days reuse the same HTTP connections.  Entries are keyed on a fingerprint of
+    the provider's API key as well, so a changed key builds fresh clients and
+    drops the stale ones.
+    """
+    provider = getattr(model_provider, "value", model_provider)
+    fingerprint = _api_key_fingerprint(model_provider)
+    base_key = (provider, model_name, None, None, fingerprint)
+    key = (provider, model_name, pydantic_model, method, fingerprint) if pydantic_model else base_key
+
+    with _registry_lock:
+        if key in _model_registry:
+            return _model_registry[key]
+
+        # The provider's key changed since its clients were built
+        for stale in [k for k in _model_registry if k[0] == provider and k[4] != fingerprint]:
+            del _model_registry[stale]
+
+        if base_key not in _model_registry:
+            _model_registry[base_key] = get_model(model_name, model_provider)
+        if pydantic_model:
+            _model_registry[key] = _model_registry[base_key].with_structured_output(pydantic_model, method=method)
+        return _model_registry[key]
+
+
+def clear_model_registry():
+    """Drop every shared chat model, e.g. after changing API keys or proxies."""
+    with _registry_lock:
+        _model_registry.clear()
@@ -16,8 +16,13 @@ from agents.warren_buffett import warren_buffett_agent
 from graph.state import AgentState
 from agents.valuation import valuation_agent
 from utils.display import print_trading_output
-from utils.analysts import ANALYST_ORDER, get_analyst_nodes
+from utils.analysts import ANALYST_ORDER, get_analyst_inputs, get_analyst_nodes, get_line_item_queries
+from utils.incremental import IncrementalAnalysts
+from utils.streaming_indicators import IndicatorStreams
+from tools.api import prefetch_line_items
 from utils.progress import progress
+from utils.telemetry import telemetry
+from llm.cache import set_llm_cache_enabled
 from llm.models import LLM_ORDER, get_model_info
 
 import argparse
@@ -51,39 +56,61 @@ def run_hedge_fund(
     selected_analysts: list[str] = [],
     model_name: str = "gpt-4o",
     model_provider: str = "OpenAI",
+    max_workers: int | None = None,
+    llm_batch_size: int | None = None,
+    fast_mode: bool | None = None,
+    incremental: IncrementalAnalysts | None = None,
+    indicator_streams: IndicatorStreams | None = None,
 ):
     # Start progress tracking
     progress.start()
 
     try:
-        # Create a new workflow if analysts are customized
-        if selected_analysts:
-            workflow = create_workflow(selected_analysts)
+        # Create a new workflow if analysts are customized, or to reuse the signals of unchanged analysts
+        if selected_analysts or incremental is not None:
+            workflow = create_workflow(selected_analysts or None, incremental)
             agent = workflow.compile()
         else:
             agent = app
 
-        final_state = agent.invoke(
-            {
-                "messages": [
-                    HumanMessage(
-                        content="Make trading decisions based on the provided data.",
-                    )
-                ],
-                "data": {
-                    "tickers": tickers,
-                    "portfolio": portfolio,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "analyst_signals": {},
-                },
-                "metadata": {
-                    "show_reasoning": show_reasoning,
-                    "model_name": model_name,
-                    "model_provider": model_provider,
+        # Fetch every analyst's line items up front in a few batched requests
+        try:
+            prefetch_line_items(get_line_item_queries(selected_analysts or list(get_analyst_nodes()), tickers), end_date)
+        except Exception as e:
+            # Agents fall back to fetching their own line items
+            print(f"Error pre-fetching line items: {e}")
+
+        # LLM calls made by the agents are attributed to the day being analyzed
+        with telemetry.day(end_date):
+            final_state = agent.invoke(
+                {
+                    "messages": [
+                        HumanMessage(
+                            content="Make trading decisions based on the provided data.",
+                        )
+                    ],
+                    "data": {
+                        "tickers": tickers,
+                        "portfolio": portfolio,
+                        "start_date": start_date,
+                        "end_date": end_date,
+                        "analyst_signals": {},
+                    },
+                    "metadata": {
+                        "show_reasoning": show_reasoning,
+                        "model_name": model_name,
+                        "model_provider": model_provider,
+                        # Tickers each agent processes at once (falls back to AGENT_MAX_WORKERS)
+                        "max_workers": max_workers,
+                        # Tickers persona agents pack into one LLM call (falls back to LLM_BATCH_SIZE)
+                        "llm_batch_size": llm_batch_size,
+                        # Persona agents skip the LLM for decisive scores (falls back to FAST_MODE)
+                        "fast_mode": fast_mode,
+                        # Technical indicator state kept across backtest days (None recomputes the whole window)
+                        "indicator_streams": indicator_streams,
+                    },
                 },
-            },
-        )
+            )
 
         return {
             "decisions": parse_hedge_fund_response(final_state["messages"][-1].content),
@@ -99,13 +126,14 @@ def start(state: AgentState):
     return state
 
 
-def create_workflow(selected_analysts=None):
-    """Create the workflow with selected analysts."""
+def create_workflow(selected_analysts=None, incremental: IncrementalAnalysts | None = None):
+    """Create the workflow with selected analysts, wrapped by incremental to skip tickers with unchanged inputs."""
     workflow = StateGraph(AgentState)
     workflow.add_node("start_node", start)
 
     # Get analyst nodes from the configuration
     analyst_nodes = get_analyst_nodes()
+    analyst_inputs = get_analyst_inputs()
 
     # Default to all analysts if none selected
     if selected_analysts is None:
@@ -113,6 +141,8 @@ def create_workflow(selected_analysts=None):
     # Add selected analyst nodes
     for analyst_key in selected_analysts:
         node_name, node_func = analyst_nodes[analyst_key]
+        if incremental is not None:
+            node_func = incremental.wrap(analyst_key, node_func, analyst_inputs.get(analyst_key))
         workflow.add_node(node_name, node_func)
         workflow.add_edge("start_node", node_name)
 
@@ -154,11 +184,18 @@ if __name__ == "__main__":
     )
     parser.add_argument("--end-date", type=str, help="End date (YYYY-MM-DD). Defaults to today")
     parser.add_argument("--show-reasoning", action="store_true", help="Show reasoning from each agent")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the LLM instead of reusing cached responses")
+    parser.add_argument("--llm-batch-size", type=int, help="Tickers persona agents analyze per LLM call (default: LLM_BATCH_SIZE or 1)")
+    parser.add_argument("--max-workers", type=int, help="Tickers each agent processes concurrently (default: AGENT_MAX_WORKERS or 4)")
+    parser.add_argument("--telemetry", type=str, metavar="PATH", help="Write per-call LLM token, latency and retry telemetry to PATH (.json or .csv)")
+    parser.add_argument("--fast-mode", action="store_true", default=None, help="Skip the LLM for tickers whose persona score is decisively bullish or bearish (default: FAST_MODE)")
     parser.add_argument(
         "--show-agent-graph", action="store_true", help="Show the agent graph"
     )
 
     args = parser.parse_args()
+    if args.no_llm_cache:
+        set_llm_cache_enabled(False)
 
     # Parse tickers from comma-separated string
     tickers = [ticker.strip() for ticker in args.tickers.split(",")]
@@ -276,5 +313,11 @@ if __name__ == "__main__":
         selected_analysts=selected_analysts,
         model_name=model_choice,
         model_provider=model_provider,
+        max_workers=args.max_workers,
+        llm_batch_size=args.llm_batch_size,
+        fast_mode=args.fast_mode,
     )
     print_trading_output(result)
+    if args.telemetry:
+        telemetry.export(args.telemetry)
+        print(f"LLM telemetry written to {args.telemetry}")
@@ -0,0 +1,52 @@
+"""Benchmark the NumPy Hurst exponent against the previous pandas implementation.
+
+Run with: python src/tests/benchmark_hurst.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+from utils.indicators import calculate_hurst_exponent, rolling_hurst_exponent
+
+
+def legacy_hurst_exponent(price_series: pd.Series, max_lag: int = 20) -> float:
+    """The previous implementation: np.subtract on pandas slices aligns them by label, so every difference is 0."""
+    lags = range(2, max_lag)
+    tau = [max(1e-8, np.sqrt(np.std(np.subtract(price_series[lag:], price_series[:-lag])))) for lag in lags]
+    try:
+        return np.polyfit(np.log(lags), np.log(tau), 1)[0]
+    except (ValueError, RuntimeWarning):
+        return 0.5
+
+
+def legacy_rolling_hurst_exponent(price_series: pd.Series, window: int, max_lag: int = 20) -> pd.Series:
+    return price_series.rolling(window).apply(lambda prices: calculate_hurst_exponent(prices, max_lag), raw=True)
+
+
+def main(days: int = 252, repeat: int = 5):
+    rng = np.random.default_rng(0)
+    prices = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, days))), index=pd.bdate_range("2023-01-02", periods=days))
+
+    cases = {
+        "legacy hurst (pandas)": lambda: legacy_hurst_exponent(prices),
+        "hurst (numpy)": lambda: calculate_hurst_exponent(prices),
+        "rolling hurst, one fit per window": lambda: legacy_rolling_hurst_exponent(prices, 100),
+        "rolling hurst (numpy, single polyfit)": lambda: rolling_hurst_exponent(prices, 100),
+    }
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=10, repeat=repeat)) / 10
+        print(f"{name:<40} {seconds * 1000:8.3f} ms")
+
+    print(f"legacy value: {legacy_hurst_exponent(prices):.4f}  numpy value: {calculate_hurst_exponent(prices):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+from data.cache import Cache
+from data.store import SQLiteStore
+
+
+def test_warm_start_from_store(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = Cache(store=SQLiteStore(path))
+    cache.set_financial_metrics("AAPL", [{"report_period": "2024-03-31", "market_cap": 1.0}])
+
+    # A fresh cache on the same file sees the data without any fetch
+    warm = Cache(store=SQLiteStore(path))
+    assert warm.get_financial_metrics("AAPL") == [{"report_period": "2024-03-31", "market_cap": 1.0}]
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    Cache(store=SQLiteStore(path)).set_company_news("AAPL", [{"date": "2024-03-01", "title": "x"}])
+
+    expired = Cache(store=SQLiteStore(path), ttl={"company_news": -1})
+    assert expired.get_company_news("AAPL") is None
+
+
+def test_schema_version_mismatch_drops_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    Cache(store=SQLiteStore(path)).set_insider_trades("AAPL", [{"filing_date": "2024-03-01"}])
+
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("UPDATE meta SET value = '0' WHERE key = 'schema_version'")
+    conn.close()
+
+    assert Cache(store=SQLiteStore(path)).get_insider_trades("AAPL") is None
+
+
+def test_missing_price_ranges_only_returns_gaps():
+    cache = Cache()
+    cache.add_price_coverage("AAPL", "2024-01-01", "2024-01-31")
+    cache.add_price_coverage("AAPL", "2024-03-01", "2024-03-31")
+
+    assert cache.missing_price_ranges("AAPL", "2024-01-10", "2024-01-20") == []
+    assert cache.missing_price_ranges("AAPL", "2023-12-15", "2024-04-10") == [
+        ("2023-12-15", "2023-12-31"),
+        ("2024-02-01", "2024-02-29"),
+        ("2024-04-01", "2024-04-10"),
+    ]
+
+
+def test_adjacent_coverage_is_merged():
+    cache = Cache()
+    cache.add_price_coverage("AAPL", "2024-01-01", "2024-01-31")
+    cache.add_price_coverage("AAPL", "2024-02-01", "2024-02-10")
+
+    assert cache.get_price_coverage("AAPL") == [("2024-01-01", "2024-02-10")]
+
+
+def test_get_prices_fetches_only_uncovered_gaps(monkeypatch):
+    import tools.api as api
+    from data.models import Price
+
+    fetched = []
+
+    def fake_fetch(ticker, start_date, end_date):
+        fetched.append((start_date, end_date))
+        return [Price(open=1, close=1, high=1, low=1, volume=1, time=day) for day in ("2024-01-02", "2024-01-03", "2024-01-04") if start_date <= day <= end_date]
+
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api, "_fetch_prices", fake_fetch)
+
+    assert [p.time for p in api.get_prices("AAPL", "2024-01-02", "2024-01-03")] == ["2024-01-02", "2024-01-03"]
+    assert [p.time for p in api.get_prices("AAPL", "2024-01-02", "2024-01-04")] == ["2024-01-02", "2024-01-03", "2024-01-04"]
+    assert [p.time for p in api.get_prices("AAPL", "2024-01-03", "2024-01-04")] == ["2024-01-03", "2024-01-04"]
+    assert fetched == [("2024-01-02", "2024-01-03"), ("2024-01-04", "2024-01-04")]
+
+
+def test_price_range_is_sorted_and_sliced(tmp_path):
+    cache = Cache(store=SQLiteStore(str(tmp_path / "cache.sqlite")))
+    cache.set_prices("AAPL", [{"open": 1, "close": 3, "high": 1, "low": 1, "volume": 10, "time": "2024-01-04"}])
+    cache.set_prices("AAPL", [{"open": 1, "close": day, "high": 1, "low": 1, "volume": 10, "time": f"2024-01-0{day}"} for day in (2, 3, 4, 5)])
+
+    window = cache.get_price_range("AAPL", "2024-01-03", "2024-01-04")
+    assert window["time"].tolist() == ["2024-01-03", "2024-01-04"]
+    assert window["close"].tolist() == [3, 3]
+    assert cache.get_price_range("AAPL", "2024-02-01", "2024-02-02").empty
+
+    # The sorted frame round-trips through the persistent store
+    warm = Cache(store=SQLiteStore(str(tmp_path / "cache.sqlite")))
+    assert [p["time"] for p in warm.get_prices("AAPL")] == ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+
+
+def test_price_list_builds_prices_lazily(monkeypatch):
+    import tools.api as api
+
+    cache = Cache()
+    cache.set_prices("AAPL", [{"open": 1.0, "close": float(day), "high": 1.0, "low": 1.0, "volume": 10, "time": f"2024-01-0{day}"} for day in (2, 3, 4)])
+    cache.add_price_coverage("AAPL", "2024-01-01", "2024-01-31")
+    monkeypatch.setattr(api, "_cache", cache)
+
+    prices = api.get_prices("AAPL", "2024-01-03", "2024-01-04")
+    assert len(prices) == 2
+    assert prices[-1].close == 4.0 and prices[-1].volume == 10
+    assert [p.time for p in prices] == ["2024-01-03", "2024-01-04"]
+    assert api.prices_to_df(prices)["close"].tolist() == api.get_price_frame("AAPL", "2024-01-03", "2024-01-04")["close"].tolist()
+
+
+def test_warmup_history_is_fetched_once(monkeypatch):
+    import pandas as pd
+
+    import tools.api as api
+    from data.models import Price
+
+    fetched = []
+
+    def fake_fetch(ticker, start_date, end_date):
+        fetched.append((start_date, end_date))
+        return [Price(open=1, close=1, high=1, low=1, volume=1, time=day.strftime("%Y-%m-%d")) for day in pd.bdate_range(start_date, end_date)]
+
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api, "_fetch_prices", fake_fetch)
+
+    # Consecutive backtest days, each with a 30-day lookback
+    for end in ("2024-06-03", "2024-06-04", "2024-06-05"):
+        start = (pd.Timestamp(end) - pd.Timedelta(days=30)).strftime("%Y-%m-%d")
+        frame = api.get_price_frame("AAPL", start, end, warmup_bars=127)
+        assert len(frame[frame["time"] < start]) >= 127
+
+    # The warm-up is fetched with the first day, later days only fetch their own window's new edges
+    assert fetched[0] == (api.warmup_start_date("2024-05-04", 127), "2024-06-03")
+    assert all(start > "2024-05-04" for start, _ in fetched[1:])
+
+
+def test_only_recent_price_coverage_expires(tmp_path):
+    from datetime import date, timedelta
+
+    path = str(tmp_path / "cache.sqlite")
+    days = [(date.today() - timedelta(days=n)).isoformat() for n in (30, 20, 2)]
+    Cache(store=SQLiteStore(path)).fill_prices("AAPL", [{"open": 1, "close": 1, "high": 1, "low": 1, "volume": 10, "time": day} for day in days], days[0], days[-1])
+
+    # Within the TTL everything is served as saved
+    fresh = Cache(store=SQLiteStore(path))
+    assert fresh.missing_price_ranges("AAPL", days[0], days[-1]) == []
+
+    # Past it, old bars are kept and only the last few days are fetched again
+    expired = Cache(store=SQLiteStore(path), ttl={"prices": -1})
+    cutoff = (date.today() - timedelta(days=7)).isoformat()
+    assert [p["time"] for p in expired.get_prices("AAPL")] == days[:2]
+    assert expired.missing_price_ranges("AAPL", days[0], days[-1]) == [((date.today() - timedelta(days=6)).isoformat(), days[-1])]
+    assert expired.get_price_coverage("AAPL") == [(days[0], cutoff)]
+
+
+def test_price_gap_fill_writes_the_store_once(tmp_path, monkeypatch):
+    import tools.api as api
+    from data.models import Price
+
+    store = SQLiteStore(str(tmp_path / "cache.sqlite"))
+    saves = []
+    save = store.save
+    monkeypatch.setattr(store, "save", lambda *args: saves.append(args[0]) or save(*args))
+    monkeypatch.setattr(api, "_cache", Cache(store=store))
+    monkeypatch.setattr(api, "_fetch_prices", lambda ticker, start_date, end_date: [Price(open=1, close=1, high=1, low=1, volume=1, time="2024-01-02")])
+
+    api.get_price_frame("AAPL", "2024-01-02", "2024-01-05")
+
+    assert saves == ["prices"]
+    assert Cache(store=SQLiteStore(str(tmp_path / "cache.sqlite"))).get_price_coverage("AAPL") == [("2024-01-02", "2024-01-05")]
@@ -0,0 +1,38 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+from utils.concurrency import get_max_workers, map_tickers
+
+
+def test_map_tickers_runs_concurrently_and_keeps_ticker_order():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def analyze(ticker):
+        with lock:
+            active.append(ticker)
+            peak.append(len(active))
+        # Earlier tickers finish last
+        time.sleep(0.05 * (4 - len(ticker)))
+        with lock:
+            active.remove(ticker)
+        return None if ticker == "BB" else ticker.lower()
+
+    results = map_tickers(analyze, ["A", "BB", "CCC"], max_workers=3)
+    assert list(results) == ["A", "CCC"]
+    assert results["CCC"] == "ccc"
+    assert max(peak) > 1
+
+
+def test_max_workers_from_metadata_or_env(monkeypatch):
+    monkeypatch.setenv("AGENT_MAX_WORKERS", "2")
+    assert get_max_workers({"metadata": {"max_workers": 6}}) == 6
+    assert get_max_workers({"metadata": {"max_workers": None}}) == 2
+    assert get_max_workers() == 2
@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+from utils.incremental import IncrementalAgent, IncrementalAnalysts
+
+
+def _state(end_date, tickers=("AAPL", "MSFT")):
+    return {
+        "messages": [],
+        "data": {"tickers": list(tickers), "end_date": end_date, "analyst_signals": {"other_agent": {"AAPL": {"signal": "bearish"}}}},
+        "metadata": {"show_reasoning": False, "model_name": "gpt-4o", "model_provider": "OpenAI", "max_workers": 1},
+    }
+
+
+def test_only_tickers_with_changed_inputs_rerun():
+    # AAPL files new results on the 3rd, MSFT never does
+    def get_inputs(ticker, end_date):
+        return ["Q3", "Q4"] if ticker == "AAPL" and end_date >= "2024-01-03" else ["Q3"]
+
+    analyzed = []
+
+    def agent(state):
+        analyzed.append(list(state["data"]["tickers"]))
+        signals = {ticker: {"signal": "bullish", "day": state["data"]["end_date"]} for ticker in state["data"]["tickers"]}
+        state["data"]["analyst_signals"]["fundamentals_agent"] = signals
+        return {"messages": [], "data": state["data"]}
+
+    incremental = IncrementalAgent(agent, get_inputs)
+
+    incremental(_state("2024-01-02"))
+    state = _state("2024-01-03")
+    result = incremental(state)
+
+    assert analyzed == [["AAPL", "MSFT"], ["AAPL"]]
+    signals = state["data"]["analyst_signals"]["fundamentals_agent"]
+    assert signals == {"AAPL": {"signal": "bullish", "day": "2024-01-03"}, "MSFT": {"signal": "bullish", "day": "2024-01-02"}}
+    # Other agents' signals are left alone
+    assert state["data"]["analyst_signals"]["other_agent"] == {"AAPL": {"signal": "bearish"}}
+    assert result["messages"][0].name == "fundamentals_agent"
+    assert (incremental.reused, incremental.rerun) == (1, 3)
+
+    # Nothing changed: the agent is not called at all
+    incremental(_state("2024-01-04"))
+    assert len(analyzed) == 2
+
+
+def test_failing_inputs_and_missing_signals_rerun():
+    calls = []
+
+    def agent(state):
+        calls.append(list(state["data"]["tickers"]))
+        # No signal for MSFT, e.g. no financial metrics found
+        state["data"]["analyst_signals"]["valuation_agent"] = {"AAPL": {"signal": "neutral"}}
+        return {"messages": [], "data": state["data"]}
+
+    def get_inputs(ticker, end_date):
+        if ticker == "AAPL":
+            raise RuntimeError("API down")
+        return "unchanged"
+
+    incremental = IncrementalAgent(agent, get_inputs)
+    incremental(_state("2024-01-02"))
+    state = _state("2024-01-03")
+    incremental(state)
+
+    # AAPL has no fingerprint so always reruns; MSFT's missing signal is reused as missing
+    assert calls == [["AAPL", "MSFT"], ["AAPL"]]
+    assert state["data"]["analyst_signals"]["valuation_agent"] == {"AAPL": {"signal": "neutral"}}
+
+
+def test_analysts_without_inputs_are_not_wrapped():
+    analysts = IncrementalAnalysts()
+
+    def agent(state):
+        return state
+
+    assert analysts.wrap("technical_analyst", agent, None) is agent
+    wrapped = analysts.wrap("fundamentals_analyst", agent, lambda ticker, end_date: None)
+    assert analysts.wrap("fundamentals_analyst", agent, lambda ticker, end_date: None) is wrapped
+    assert analysts.stats() == {"fundamentals_analyst": {"reused": 0, "rerun": 0}}
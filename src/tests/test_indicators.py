@@ -0,0 +1,124 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+from agents.technicals import calculate_adx, calculate_atr
+from utils.indicators import _ewm_mean, adx, build_price_panel, calculate_hurst_exponent, compute_indicators, latest_indicators, rolling_hurst_exponent
+
+
+def _price_frames(lengths: dict[str, int], seed: int = 0) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=max(lengths.values()))
+    frames = {}
+    for ticker, n in lengths.items():
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        frames[ticker] = pd.DataFrame(
+            {
+                "open": close,
+                "high": close * (1 + rng.uniform(0, 0.02, n)),
+                "low": close * (1 - rng.uniform(0, 0.02, n)),
+                "close": close,
+                "volume": rng.integers(100_000, 1_000_000, n),
+            },
+            index=dates[-n:],
+        )
+    return frames
+
+
+def test_panel_matches_tickers_computed_alone():
+    # NEW listed later, so its history is shorter than the others'
+    frames = _price_frames({"AAPL": 260, "MSFT": 260, "NEW": 150})
+
+    together = latest_indicators(build_price_panel(frames))
+
+    assert list(together.index) == ["AAPL", "MSFT", "NEW"]
+    for ticker, frame in frames.items():
+        alone = latest_indicators(build_price_panel({ticker: frame})).loc[ticker]
+        pd.testing.assert_series_equal(together.loc[ticker], alone, check_names=False)
+
+
+def test_missing_bar_of_one_ticker_does_not_blank_its_windows():
+    frames = _price_frames({"AAPL": 300, "MSFT": 300})
+    # MSFT has no bar on one day AAPL traded
+    frames["MSFT"] = frames["MSFT"].drop(frames["MSFT"].index[250])
+
+    together = compute_indicators(build_price_panel(frames))
+    alone = compute_indicators(build_price_panel({"MSFT": frames["MSFT"]}))
+
+    for name in ("momentum_6m", "z_score", "volatility_regime", "adx", "atr"):
+        assert together[name]["MSFT"].notna().iloc[-1], name
+        pd.testing.assert_series_equal(together[name]["MSFT"].dropna(), alone[name]["MSFT"].dropna(), check_names=False)
+    assert np.isnan(together["close"]["MSFT"].iloc[250])
+
+
+def test_panel_adx_and_atr_match_per_ticker_functions():
+    frames = _price_frames({"AAPL": 120, "MSFT": 120})
+    indicators = compute_indicators(build_price_panel(frames))
+
+    for ticker, frame in frames.items():
+        ticker_adx = calculate_adx(frame, 14)
+        np.testing.assert_allclose(indicators["adx"][ticker], ticker_adx["adx"], rtol=1e-10)
+        np.testing.assert_allclose(indicators["+di"][ticker], ticker_adx["+di"], rtol=1e-10)
+        np.testing.assert_allclose(indicators["atr"][ticker], calculate_atr(frame), rtol=1e-10)
+
+
+def test_adx_and_atr_leave_the_price_frame_untouched():
+    frame = _price_frames({"AAPL": 60})["AAPL"]
+    original = frame.copy()
+
+    assert list(calculate_adx(frame).columns) == ["adx", "+di", "-di"]
+    calculate_atr(frame)
+
+    pd.testing.assert_frame_equal(frame, original)
+
+
+def test_ewm_matches_pandas_across_blocks_and_gaps():
+    values = pd.DataFrame(np.abs(np.random.default_rng(3).normal(size=(5000, 2))))
+    values.iloc[[0, 1, 2600, 2601], 0] = np.nan
+    # A gap long enough for the weights to decay to nothing
+    values.iloc[1000:4000, 1] = np.nan
+
+    for span in (1, 14, 200):
+        np.testing.assert_allclose(_ewm_mean(values.to_numpy(), span), values.ewm(span=span).mean(), rtol=1e-10)
+    # One ticker's 1-D buffer gives the same as its panel column
+    close = values[0].to_numpy()
+    np.testing.assert_array_equal(adx(close + 1, close, close)["adx"], adx(np.c_[close + 1], np.c_[close], np.c_[close])["adx"][:, 0])
+
+
+def test_ticker_without_bars_is_left_out():
+    frames = _price_frames({"AAPL": 80})
+    frames["EMPTY"] = frames["AAPL"].iloc[:0]
+
+    assert list(latest_indicators(build_price_panel(frames)).index) == ["AAPL"]
+
+
+def test_hurst_exponent_uses_positional_lag_differences():
+    close = _price_frames({"AAPL": 250})["AAPL"]["close"]
+    values = close.to_numpy()
+    lags = range(2, 20)
+    tau = [np.sqrt(np.std(values[lag:] - values[:-lag])) for lag in lags]
+
+    assert calculate_hurst_exponent(close) == pytest.approx(np.polyfit(np.log(lags), np.log(tau), 1)[0])
+    # Too short to difference at every lag
+    assert calculate_hurst_exponent(close.iloc[:10]) == 0.5
+
+
+def test_rolling_hurst_matches_each_window():
+    close = _price_frames({"AAPL": 150})["AAPL"]["close"]
+    close.iloc[130] = np.nan
+
+    rolling = rolling_hurst_exponent(close, window=100)
+
+    assert rolling.index.equals(close.index)
+    assert rolling.iloc[:99].isna().all()
+    for end in (100, 120, 130):
+        assert rolling.iloc[end - 1] == pytest.approx(calculate_hurst_exponent(close.iloc[end - 100 : end]))
+    # Windows holding the missing price have no exponent
+    assert rolling.iloc[130:].isna().all()
@@ -0,0 +1,135 @@
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+import tools.api as api
+from data.cache import Cache
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+def _line_item(ticker, report_period, **fields):
+    return {"ticker": ticker, "report_period": report_period, "period": "ttm", "currency": "USD", **fields}
+
+
+def test_prefetch_batches_queries_and_fans_out(monkeypatch):
+    bodies = []
+
+    def fake_request(method, url, json=None, **kwargs):
+        bodies.append(json)
+        results = []
+        for ticker in json["tickers"]:
+            for report_period in ("2023-12-31", "2024-03-31", "2024-06-30"):
+                results.append(_line_item(ticker, report_period, **{field: 1.0 for field in json["line_items"]}))
+        return _FakeResponse({"search_results": results})
+
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api.transport, "request", fake_request)
+
+    api.prefetch_line_items(
+        [
+            {"tickers": ["AAPL", "MSFT"], "line_items": ["net_income", "revenue"], "period": "ttm", "limit": 2},
+            {"tickers": ["AAPL", "MSFT"], "line_items": ["revenue", "free_cash_flow"], "period": "ttm", "limit": 1},
+        ],
+        "2024-06-30",
+    )
+    assert len(bodies) == 1
+    assert bodies[0]["tickers"] == ["AAPL", "MSFT"]
+    assert bodies[0]["line_items"] == ["net_income", "revenue", "free_cash_flow"]
+
+    # Callers are served from the cache, most recent period first
+    items = api.search_line_items("MSFT", ["free_cash_flow"], "2024-06-30", period="ttm", limit=2)
+    assert [item.report_period for item in items] == ["2024-06-30", "2024-03-31"]
+    assert all(item.ticker == "MSFT" for item in items)
+    assert len(bodies) == 1
+
+
+def _quarterly_search(bodies):
+    def fake_request(method, url, json=None, **kwargs):
+        bodies.append(json)
+        report_periods = [p for p in ("2024-06-30", "2024-03-31", "2023-12-31", "2023-09-30") if p <= json["end_date"]]
+        results = [_line_item(ticker, p, **{field: 1.0 for field in json["line_items"]}) for ticker in json["tickers"] for p in report_periods]
+        return _FakeResponse({"search_results": results})
+
+    return fake_request
+
+
+def test_only_missing_fields_are_fetched(monkeypatch):
+    bodies = []
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api.transport, "request", _quarterly_search(bodies))
+
+    api.search_line_items("AAPL", ["revenue", "net_income"], "2024-06-30", period="ttm", limit=2)
+    items = api.search_line_items("AAPL", ["net_income", "free_cash_flow"], "2024-06-30", period="ttm", limit=2)
+
+    assert [body["line_items"] for body in bodies] == [["revenue", "net_income"], ["free_cash_flow"]]
+    assert [item.report_period for item in items] == ["2024-06-30", "2024-03-31"]
+    assert all(item.net_income == 1.0 and item.free_cash_flow == 1.0 for item in items)
+
+
+def test_later_end_date_within_cadence_is_served_from_cache(monkeypatch):
+    bodies = []
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api.transport, "request", _quarterly_search(bodies))
+
+    api.search_line_items("AAPL", ["revenue"], "2024-06-30", period="ttm", limit=2)
+    # An earlier end date and a few weeks later resolve to known report periods
+    assert [item.report_period for item in api.search_line_items("AAPL", ["revenue"], "2024-05-15", period="ttm", limit=1)] == ["2024-03-31"]
+    assert [item.report_period for item in api.search_line_items("AAPL", ["revenue"], "2024-07-20", period="ttm", limit=2)] == ["2024-06-30", "2024-03-31"]
+    assert len(bodies) == 1
+
+    # Past the cadence a new quarter may have been reported, so we ask again
+    api.search_line_items("AAPL", ["revenue"], "2024-10-15", period="ttm", limit=2)
+    assert len(bodies) == 2
+
+
+def test_ticker_cut_off_by_an_overall_limit_is_refetched(monkeypatch):
+    bodies = []
+
+    def fake_request(method, url, json=None, **kwargs):
+        bodies.append(json)
+        # The limit applies to the whole response, and AAPL's rows come first
+        results = [_line_item(ticker, p, revenue=1.0) for ticker in json["tickers"] for p in ("2024-06-30", "2024-03-31", "2023-12-31", "2023-09-30")]
+        return _FakeResponse({"search_results": results[: json["limit"]]})
+
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api.transport, "request", fake_request)
+
+    results = api.search_line_items_batch(["AAPL", "MSFT", "NVDA"], ["revenue"], "2024-06-30", limit=3)
+    assert [len(results[ticker]) for ticker in ("AAPL", "MSFT", "NVDA")] == [3, 3, 1]
+
+    # NVDA's single period is a cut-off page, not its whole history
+    assert len(api.search_line_items("NVDA", ["revenue"], "2024-06-30", limit=3)) == 3
+    # AAPL's and MSFT's newest three periods were all returned
+    api.search_line_items("MSFT", ["revenue"], "2024-06-30", limit=3)
+    api.search_line_items("AAPL", ["revenue"], "2024-06-30", limit=3)
+    assert [body["tickers"] for body in bodies] == [["AAPL", "MSFT", "NVDA"], ["NVDA"]]
+
+
+def test_ticker_trimmed_to_the_limit_is_not_its_whole_history(monkeypatch):
+    bodies = []
+
+    def fake_request(method, url, json=None, **kwargs):
+        bodies.append(json)
+        # AAPL has three periods and MSFT none, which fits under the batch's overall limit
+        results = [_line_item("AAPL", p, revenue=1.0) for p in ("2024-06-30", "2024-03-31", "2023-12-31")]
+        return _FakeResponse({"search_results": results[: json["limit"]]})
+
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api.transport, "request", fake_request)
+
+    results = api.search_line_items_batch(["AAPL", "MSFT"], ["revenue"], "2024-06-30", limit=2)
+    assert [len(results[ticker]) for ticker in ("AAPL", "MSFT")] == [2, 0]
+
+    # AAPL's third period was trimmed off, so a deeper search has to fetch it
+    assert len(api.search_line_items("AAPL", ["revenue"], "2024-06-30", limit=3)) == 3
+    assert [body["tickers"] for body in bodies] == [["AAPL", "MSFT"], ["AAPL"]]
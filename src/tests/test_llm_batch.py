@@ -0,0 +1,125 @@
+import copy
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+import llm.cache
+import llm.models
+from agents.warren_buffett import WarrenBuffettSignal, generate_buffett_outputs
+from utils.llm import decisive_signals, get_fast_mode_margin, split_batches
+
+
+class _FakeLLM:
+    """Answers structured-output calls, optionally failing batched ones."""
+
+    def __init__(self, fail_batches=False):
+        self.fail_batches = fail_batches
+        self.prompts = []
+
+    def with_structured_output(self, model, method=None):
+        structured = copy.copy(self)
+        structured.model = model
+        return structured
+
+    def invoke(self, prompt, config=None):
+        self.prompts.append(prompt)
+        if self.model is WarrenBuffettSignal:
+            return WarrenBuffettSignal(signal="bullish", confidence=80.0, reasoning="single")
+        if self.fail_batches:
+            raise ValueError("unparseable")
+        tickers = prompt[-1].content.split(": ")[1].split(". ")[0].split(", ")
+        return self.model(signals={ticker: WarrenBuffettSignal(signal="bearish", confidence=60.0, reasoning=f"batch {ticker}") for ticker in tickers})
+
+
+def _analysis(tickers):
+    return {ticker: {"signal": "neutral", "score": 5, "max_score": 10} for ticker in tickers}
+
+
+def test_batched_outputs_pack_tickers_per_call(monkeypatch):
+    fake = _FakeLLM()
+    monkeypatch.setattr(llm.cache, "_enabled", False)
+    monkeypatch.setattr(llm.models, "_model_registry", {})
+    monkeypatch.setattr(llm.models, "get_model", lambda model_name, model_provider: fake)
+
+    outputs = generate_buffett_outputs(_analysis(["AAPL", "MSFT", "NVDA"]), "gpt-4o", "OpenAI", batch_size=2)
+
+    assert list(outputs) == ["AAPL", "MSFT", "NVDA"]
+    assert outputs["MSFT"].reasoning == "batch MSFT"
+    # AAPL and MSFT share a call, NVDA is left alone in its own
+    assert len(fake.prompts) == 2
+    assert outputs["NVDA"].reasoning == "single"
+
+
+def test_repeated_batches_reuse_one_structured_model(monkeypatch):
+    fake = _FakeLLM()
+    monkeypatch.setattr(llm.cache, "_enabled", False)
+    monkeypatch.setattr(llm.models, "_model_registry", {})
+    monkeypatch.setattr(llm.models, "get_model", lambda model_name, model_provider: fake)
+
+    # e.g. consecutive backtest days
+    for _ in range(3):
+        generate_buffett_outputs(_analysis(["AAPL", "MSFT"]), "gpt-4o", "OpenAI", batch_size=2)
+
+    # The base client plus one structured model for the batch schema
+    assert len(llm.models._model_registry) == 2
+
+
+def test_unparseable_batch_falls_back_to_per_ticker_calls(monkeypatch):
+    fake = _FakeLLM(fail_batches=True)
+    monkeypatch.setattr(llm.cache, "_enabled", False)
+    monkeypatch.setattr(llm.models, "_model_registry", {})
+    monkeypatch.setattr(llm.models, "get_model", lambda model_name, model_provider: fake)
+
+    outputs = generate_buffett_outputs(_analysis(["AAPL", "MSFT"]), "gpt-4o", "OpenAI", batch_size=2)
+
+    assert {ticker: output.reasoning for ticker, output in outputs.items()} == {"AAPL": "single", "MSFT": "single"}
+    assert len(fake.prompts) == 3
+
+
+def test_batches_split_on_token_budget(monkeypatch):
+    import utils.llm
+
+    # Count with the four-characters-per-token estimate
+    monkeypatch.setattr(utils.llm, "_get_encoding", lambda: None)
+    prompt_sizes = {"A": 40, "B": 40, "C": 40, "D": 400}
+
+    def build_prompt(tickers):
+        return "x" * sum(prompt_sizes[ticker] for ticker in tickers)
+
+    assert split_batches(list(prompt_sizes), build_prompt, batch_size=10, max_prompt_tokens=25) == [["A", "B"], ["C"], ["D"]]
+    assert split_batches(list(prompt_sizes), build_prompt, batch_size=1, max_prompt_tokens=1000) == [["A"], ["B"], ["C"], ["D"]]
+
+
+def test_fast_mode_only_sends_borderline_scores_to_the_llm(monkeypatch):
+    fake = _FakeLLM()
+    monkeypatch.setattr(llm.cache, "_enabled", False)
+    monkeypatch.setattr(llm.models, "_model_registry", {})
+    monkeypatch.setattr(llm.models, "get_model", lambda model_name, model_provider: fake)
+    analysis = _analysis(["AAPL", "MSFT", "NVDA"])
+    analysis["AAPL"].update(score=10, fundamental_analysis={"score": 7, "details": "Strong ROE"})
+    analysis["NVDA"]["score"] = 0
+
+    outputs = generate_buffett_outputs(analysis, "gpt-4o", "OpenAI", fast_margin=0.15)
+
+    assert list(outputs) == ["AAPL", "MSFT", "NVDA"]
+    assert (outputs["AAPL"].signal, outputs["AAPL"].confidence) == ("bullish", 100.0)
+    assert outputs["AAPL"].reasoning.endswith("Strong ROE")
+    assert (outputs["NVDA"].signal, outputs["NVDA"].confidence) == ("bearish", 100.0)
+    assert outputs["MSFT"].reasoning == "single"
+    assert len(fake.prompts) == 1
+
+
+def test_decisive_signals_respect_thresholds_and_margin(monkeypatch):
+    analysis = {"A": {"score": 8.5, "max_score": 10}, "B": {"score": 8.4, "max_score": 10}, "C": {"score": 1.5, "max_score": 10}}
+
+    assert set(decisive_signals(analysis, 0.15)) == {"A", "C"}
+    assert decisive_signals(analysis, 0.15)["C"]["confidence"] == 75.0
+    assert set(decisive_signals(analysis, 0.15, bullish_at=0.75, bearish_at=0.45, target_price_range="N/A")) == {"C"}
+    assert decisive_signals(analysis, None) == {}
+
+    monkeypatch.delenv("FAST_MODE", raising=False)
+    assert get_fast_mode_margin({"metadata": {}}) is None
+    assert get_fast_mode_margin({"metadata": {"fast_mode": True}}) == 0.15
@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+
+import llm.cache
+import llm.models
+from llm.cache import LLMCache, make_cache_key
+from utils.llm import call_llm
+
+
+class _Signal(BaseModel):
+    signal: str
+    confidence: float
+
+
+class _CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def with_structured_output(self, model, method=None):
+        return self
+
+    def invoke(self, prompt, config=None):
+        self.calls += 1
+        return _Signal(signal="bullish", confidence=70.0)
+
+
+def _prompt(data):
+    return ChatPromptTemplate.from_messages([("human", "Analyze {data}")]).invoke({"data": data})
+
+
+def test_identical_calls_hit_the_persistent_cache(tmp_path, monkeypatch):
+    fake = _CountingLLM()
+    monkeypatch.setattr(llm.models, "get_model", lambda model_name, model_provider: fake)
+    monkeypatch.setattr(llm.models, "_model_registry", {})
+    monkeypatch.setattr(llm.cache, "_llm_cache", LLMCache(str(tmp_path / "llm.sqlite")))
+
+    first = call_llm(_prompt("AAPL"), "gpt-4o", "OpenAI", _Signal)
+    # A fresh process over the same file answers from disk
+    monkeypatch.setattr(llm.cache, "_llm_cache", LLMCache(str(tmp_path / "llm.sqlite")))
+    second = call_llm(_prompt("AAPL"), "gpt-4o", "OpenAI", _Signal)
+    call_llm(_prompt("MSFT"), "gpt-4o", "OpenAI", _Signal)
+
+    assert second == first
+    assert fake.calls == 2
+
+
+def test_cache_can_be_turned_off(monkeypatch):
+    fake = _CountingLLM()
+    monkeypatch.setattr(llm.models, "get_model", lambda model_name, model_provider: fake)
+    monkeypatch.setattr(llm.models, "_model_registry", {})
+    monkeypatch.setattr(llm.cache, "_llm_cache", LLMCache())
+    monkeypatch.setattr(llm.cache, "_enabled", True)
+
+    llm.cache.set_llm_cache_enabled(False)
+    call_llm(_prompt("AAPL"), "gpt-4o", "OpenAI", _Signal)
+    call_llm(_prompt("AAPL"), "gpt-4o", "OpenAI", _Signal)
+    assert fake.calls == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})
+
+    reopened = LLMCache(str(tmp_path / "llm.sqlite"), max_entries=2)
+    assert reopened.get("b") is None
+    assert reopened.get("a") == {"v": 1} and reopened.get("c") == {"v": 3}
+
+
+def test_key_covers_model_schema_and_prompt():
+    key = make_cache_key("gpt-4o", "OpenAI", _Signal, _prompt("AAPL"))
+    assert key == make_cache_key("gpt-4o", "OpenAI", _Signal, _prompt("AAPL"))
+    assert key != make_cache_key("gpt-4o-mini", "OpenAI", _Signal, _prompt("AAPL"))
+    assert key != make_cache_key("gpt-4o", "OpenAI", _Signal, _prompt("MSFT"))
@@ -0,0 +1,137 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+import pytest
+from pydantic import BaseModel
+
+import llm.cache
+import llm.models
+import utils.llm
+from utils.llm import ProviderQuota, acall_llm, call_llm
+
+
+class _Signal(BaseModel):
+    signal: str
+
+
+class _RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__("rate limited")
+        self.status_code = 429
+        self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)}, "status_code": 429})()
+
+
+class _FlakyLLM:
+    """Fails with a 429 the first time, then answers; tracks how many calls overlap."""
+
+    def __init__(self, failures=1, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+
+    def with_structured_output(self, model, method=None):
+        return self
+
+    def invoke(self, prompt, config=None):
+        self.calls.append(time.monotonic())
+        if len(self.calls) <= self.failures:
+            raise _RateLimited(0.3)
+        return _Signal(signal="bullish")
+
+    async def ainvoke(self, prompt, config=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return self.invoke(prompt)
+
+
+def _use(monkeypatch, fake, quota):
+    monkeypatch.setattr(llm.cache, "_enabled", False)
+    monkeypatch.setattr(llm.models, "_model_registry", {})
+    monkeypatch.setattr(llm.models, "get_model", lambda model_name, model_provider: fake)
+    monkeypatch.setattr(utils.llm, "_quotas", {"OpenAI": quota})
+
+
+def test_retry_waits_for_retry_after(monkeypatch):
+    fake = _FlakyLLM(failures=1)
+    _use(monkeypatch, fake, ProviderQuota())
+
+    assert call_llm("prompt", "gpt-4o", "OpenAI", _Signal).signal == "bullish"
+    assert len(fake.calls) == 2
+    assert fake.calls[1] - fake.calls[0] >= 0.3
+
+
+def test_acall_llm_shares_the_provider_concurrency_limit(monkeypatch):
+    fake = _FlakyLLM(failures=0, delay=0.05)
+    _use(monkeypatch, fake, ProviderQuota(max_concurrency=2))
+
+    async def run():
+        return await asyncio.gather(*(acall_llm(f"prompt {i}", "gpt-4o", "OpenAI", _Signal) for i in range(6)))
+
+    assert [output.signal for output in asyncio.run(run())] == ["bullish"] * 6
+    assert fake.peak == 2
+
+
+def test_quota_enforces_requests_and_tokens_per_minute():
+    quota = ProviderQuota(rpm=2)
+    assert quota._try_acquire(0) == 0 and quota._try_acquire(0) == 0
+    assert quota._try_acquire(0) > 59
+
+    quota = ProviderQuota(tpm=100)
+    assert quota._try_acquire(60) == 0
+    assert quota._try_acquire(60) > 59
+    assert quota._try_acquire(40) == 0
+
+    # A 429 pauses every caller of the provider
+    quota = ProviderQuota()
+    quota.pause(5)
+    assert 4 < quota._try_acquire(0) <= 5
+
+
+def test_waiters_sleep_until_a_call_finishes():
+    import threading
+
+    quota = ProviderQuota(max_concurrency=1)
+    quota.acquire()
+    checks = []
+    try_acquire = quota._try_acquire
+    quota._try_acquire = lambda tokens: checks.append(tokens) or try_acquire(tokens)
+
+    thread = threading.Thread(target=quota.acquire)
+    thread.start()
+
+    async def wait_async():
+        task = asyncio.create_task(quota.aacquire())
+        await asyncio.sleep(0.2)
+        # Neither waiter polls while the slot is taken
+        assert len(checks) == 2 and not task.done()
+        # Each release hands the slot to one of them
+        quota.release()
+        await asyncio.sleep(0.05)
+        quota.release()
+        await asyncio.wait_for(task, timeout=1)
+
+    asyncio.run(wait_async())
+    thread.join(timeout=1)
+    assert not thread.is_alive()
+
+
+def test_cancelled_call_releases_its_slot(monkeypatch):
+    quota = ProviderQuota(max_concurrency=1)
+    _use(monkeypatch, _FlakyLLM(failures=0, delay=1.0), quota)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(acall_llm("prompt", "gpt-4o", "OpenAI", _Signal), timeout=0.05)
+
+    asyncio.run(run())
+    assert quota._in_flight == 0
@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+from pydantic import BaseModel
+
+import llm.models
+from llm.models import clear_model_registry, get_cached_model
+
+
+class _Signal(BaseModel):
+    signal: str
+
+
+class _FakeChat:
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def with_structured_output(self, model, method=None):
+        return (self, model, method)
+
+
+def test_models_are_shared_per_provider_model_and_schema(monkeypatch):
+    built = []
+
+    def fake_get_model(model_name, model_provider):
+        built.append(model_name)
+        return _FakeChat(llm.models.os.getenv("OPENAI_API_KEY"))
+
+    monkeypatch.setattr(llm.models, "get_model", fake_get_model)
+    monkeypatch.setattr(llm.models, "_model_registry", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "key-1")
+
+    structured = get_cached_model("gpt-4o", "OpenAI", _Signal)
+    assert get_cached_model("gpt-4o", "OpenAI", _Signal) is structured
+    # The structured runnable wraps the shared client
+    assert structured[0] is get_cached_model("gpt-4o", "OpenAI")
+    get_cached_model("gpt-4o-mini", "OpenAI")
+    assert built == ["gpt-4o", "gpt-4o-mini"]
+
+    # A new API key builds fresh clients and drops the stale ones
+    monkeypatch.setenv("OPENAI_API_KEY", "key-2")
+    assert get_cached_model("gpt-4o", "OpenAI").api_key == "key-2"
+    assert len(llm.models._model_registry) == 1
+
+    clear_model_registry()
+    get_cached_model("gpt-4o", "OpenAI")
+    assert built == ["gpt-4o", "gpt-4o-mini", "gpt-4o", "gpt-4o"]
@@ -0,0 +1,101 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+import pytest
+
+import tools.api as api
+from data.cache import Cache
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+def _metrics(ticker):
+    from data.models import FinancialMetrics
+
+    fields = {name: None for name in FinancialMetrics.model_fields}
+    return {**fields, "ticker": ticker, "report_period": "2024-03-31", "period": "ttm", "currency": "USD", "market_cap": 100.0}
+
+
+def test_concurrent_identical_fetches_share_one_request(monkeypatch):
+    urls = []
+    started = threading.Event()
+
+    def slow_request(method, url, **kwargs):
+        urls.append(url)
+        started.set()
+        time.sleep(0.2)
+        return _FakeResponse({"financial_metrics": [_metrics("AAPL")]})
+
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api.transport, "request", slow_request)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        # Positional and keyword spellings of the same call are coalesced too
+        leader = executor.submit(api.get_financial_metrics, "AAPL", "2024-06-30")
+        started.wait()
+        followers = [executor.submit(api.get_financial_metrics, "AAPL", end_date="2024-06-30") for _ in range(3)]
+        followers.append(executor.submit(api.get_market_cap, "AAPL", "2024-06-30"))
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(urls) == 1
+    assert [m.market_cap for m in results[0]] == [100.0]
+    assert results[-1] == 100.0
+    assert not api._in_flight
+
+
+def test_followers_see_the_leaders_exception(monkeypatch):
+    calls = []
+    started = threading.Event()
+
+    def failing_request(method, url, **kwargs):
+        calls.append(url)
+        started.set()
+        time.sleep(0.2)
+        raise api.transport.APIError(500, "boom")
+
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api.transport, "request", failing_request)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(api.get_insider_trades, "AAPL", "2024-06-30")
+        started.wait()
+        follower = executor.submit(api.get_insider_trades, "AAPL", "2024-06-30")
+        for future in (leader, follower):
+            with pytest.raises(api.transport.APIError):
+                future.result()
+
+    assert len(calls) == 1
+    assert not api._in_flight
+
+
+def test_async_fetchers_overlap(monkeypatch):
+    import asyncio
+
+    def slow_request(method, url, **kwargs):
+        time.sleep(0.2)
+        ticker = url.split("ticker=")[1].split("&")[0]
+        return _FakeResponse({"financial_metrics": [_metrics(ticker)]})
+
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api.transport, "request", slow_request)
+
+    async def fetch_all():
+        return await asyncio.gather(*(api.aget_financial_metrics(ticker, "2024-06-30") for ticker in ("AAPL", "MSFT", "NVDA")))
+
+    started = time.monotonic()
+    results = asyncio.run(fetch_all())
+    assert time.monotonic() - started < 0.5
+    assert [metrics[0].ticker for metrics in results] == ["AAPL", "MSFT", "NVDA"]
@@ -0,0 +1,101 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+from utils.indicators import build_price_panel, compute_indicators, latest_indicators
+from utils.streaming_indicators import IndicatorStreams, RollingStats, StreamingEMA, StreamingEWMA, TickerIndicators
+
+
+def _prices(n: int = 300, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    high = close * (1 + rng.uniform(0, 0.02, n))
+    low = close * (1 - rng.uniform(0, 0.02, n))
+    # A stretch of identical bars: no directional movement, so DX is undefined there
+    high[100:120], low[100:120], close[100:120] = high[100], low[100], close[100]
+    return pd.DataFrame({"open": close, "high": high, "low": low, "close": close, "volume": 1_000_000}, index=pd.bdate_range("2023-01-02", periods=n))
+
+
+def test_ticker_indicators_match_the_batch_engine():
+    prices = _prices()
+    batch = compute_indicators(build_price_panel({"AAPL": prices}))
+
+    indicators = TickerIndicators()
+    streamed = pd.DataFrame([indicators.update(*bar) for bar in zip(prices["high"], prices["low"], prices["close"], prices["volume"])], index=prices.index)
+
+    assert set(streamed.columns) == set(batch) | {"hurst_exponent"}
+    for name in batch:
+        np.testing.assert_allclose(streamed[name], batch[name]["AAPL"], rtol=1e-8, atol=1e-8, err_msg=name)
+    assert streamed["hurst_exponent"].iloc[-1] == pytest.approx(latest_indicators(build_price_panel({"AAPL": prices}))["hurst_exponent"]["AAPL"], rel=1e-8)
+
+
+def test_building_blocks_match_pandas_with_gaps():
+    values = pd.Series(np.random.default_rng(2).normal(size=200))
+    values[[0, 1, 50, 51, 52, 120]] = np.nan
+
+    ema, ewma, rolling = StreamingEMA(10), StreamingEWMA(10), RollingStats(15)
+    streamed = pd.DataFrame([(ema.update(x), ewma.update(x), rolling.update(x).mean, rolling.std) for x in values])
+
+    np.testing.assert_allclose(streamed[0], values.ewm(span=10, adjust=False).mean(), rtol=1e-10)
+    np.testing.assert_allclose(streamed[1], values.ewm(span=10).mean(), rtol=1e-10)
+    np.testing.assert_allclose(streamed[2], values.rolling(15).mean(), rtol=1e-8)
+    np.testing.assert_allclose(streamed[3], values.rolling(15).std(), rtol=1e-8)
+
+
+def test_streams_only_consume_new_bars_across_days():
+    prices = _prices(120)
+    streams = IndicatorStreams()
+
+    # Each backtest day sees an overlapping window ending on that day
+    for end in range(60, 121):
+        latest = streams.update("AAPL", prices.iloc[max(0, end - 30):end] if end > 60 else prices.iloc[:end])
+
+    full = TickerIndicators()
+    for bar in zip(prices["high"], prices["low"], prices["close"], prices["volume"]):
+        expected = full.update(*bar)
+    pd.testing.assert_series_equal(pd.Series(latest), pd.Series(expected))
+
+
+def _assert_close(streamed, batch, path=""):
+    if isinstance(batch, dict):
+        assert streamed.keys() == batch.keys(), path
+        for key in batch:
+            _assert_close(streamed[key], batch[key], f"{path}/{key}")
+    elif isinstance(batch, float):
+        assert streamed == pytest.approx(batch, rel=1e-6, abs=1e-9, nan_ok=True), path
+    else:
+        assert streamed == batch, path
+
+
+def test_backtest_days_match_the_batch_agent(monkeypatch):
+    import agents.technicals as technicals
+    from tools.api import warmup_start_date
+
+    prices = {"AAPL": _prices(400, seed=1), "MSFT": _prices(400, seed=2)}
+
+    def get_price_frame(ticker, start_date, end_date, warmup_bars=0):
+        frame = prices[ticker]
+        return frame[(frame.index >= warmup_start_date(start_date, warmup_bars)) & (frame.index <= end_date)]
+
+    monkeypatch.setattr(technicals, "get_price_frame", get_price_frame)
+
+    def run(start_date, end_date, streams=None):
+        state = {
+            "messages": [],
+            "data": {"tickers": list(prices), "start_date": start_date, "end_date": end_date, "analyst_signals": {}},
+            "metadata": {"show_reasoning": False, "max_workers": 1, "indicator_streams": streams},
+        }
+        return technicals.technical_analyst_agent(state)["data"]["analyst_signals"]["technical_analyst_agent"]
+
+    streams = IndicatorStreams()
+    for day in [day.strftime("%Y-%m-%d") for day in prices["AAPL"].index[-10:]]:
+        # Each day's window starts 30 days back, and the streams match the batch agent run over that window
+        lookback_start = (pd.Timestamp(day) - pd.Timedelta(days=30)).strftime("%Y-%m-%d")
+        _assert_close(run(lookback_start, day, streams), run(lookback_start, day))
@@ -0,0 +1,129 @@
+import csv
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from pydantic import BaseModel
+
+import llm.cache
+import llm.models
+import utils.llm
+from utils.llm import call_llm, compact_json, compact_prompt_payload, split_batches
+from utils.telemetry import LLMTelemetry
+
+
+class _Signal(BaseModel):
+    signal: str
+
+
+class _FakeLLM:
+    """Reports token usage through the callbacks it is invoked with, failing the first `failures` calls."""
+
+    def __init__(self, failures=0, report_usage=True):
+        self.failures = failures
+        self.report_usage = report_usage
+        self.calls = 0
+
+    def with_structured_output(self, model, method=None):
+        return self
+
+    def invoke(self, prompt, config=None):
+        self.calls += 1
+        if self.report_usage:
+            message = AIMessage(content="{}", usage_metadata={"input_tokens": 100, "output_tokens": 20, "total_tokens": 120})
+            for callback in (config or {}).get("callbacks", []):
+                callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+        if self.calls <= self.failures:
+            raise ValueError("unparseable")
+        return _Signal(signal="bullish")
+
+
+def _use(monkeypatch, fake, cache_enabled=False):
+    recorder = LLMTelemetry()
+    monkeypatch.setattr(llm.cache, "_enabled", cache_enabled)
+    monkeypatch.setattr(llm.models, "_model_registry", {})
+    monkeypatch.setattr(llm.models, "get_model", lambda model_name, model_provider: fake)
+    monkeypatch.setattr(utils.llm, "telemetry", recorder)
+    monkeypatch.setattr(utils.llm, "_retry_delay", lambda error, attempt, quota: 0)
+    return recorder
+
+
+def test_calls_record_reported_tokens_retries_and_day(monkeypatch):
+    recorder = _use(monkeypatch, _FakeLLM(failures=1))
+
+    with recorder.day("2024-01-02"):
+        call_llm("prompt", "gpt-4o", "OpenAI", _Signal, agent_name="warren_buffett_agent")
+    call_llm("prompt", "gpt-4o", "OpenAI", _Signal, agent_name="ben_graham_agent", max_retries=1)
+
+    first, second = recorder.records
+    assert (first.agent, first.day, first.status, first.retries) == ("warren_buffett_agent", "2024-01-02", "ok", 1)
+    # Both attempts were billed
+    assert (first.prompt_tokens, first.completion_tokens, first.estimated) == (200, 40, False)
+    assert (second.agent, second.day, second.status) == ("ben_graham_agent", None, "ok")
+
+    by_agent = {group["agent"]: group for group in recorder.summarize("agent")}
+    assert by_agent["warren_buffett_agent"]["total_tokens"] == 240
+    assert by_agent["warren_buffett_agent"]["retries"] == 1
+    assert recorder.to_dict()["totals"]["calls"] == 2
+
+
+def test_tokens_are_estimated_without_reported_usage(monkeypatch):
+    recorder = _use(monkeypatch, _FakeLLM(failures=3, report_usage=False))
+
+    call_llm("x" * 400, "gpt-4o", "OpenAI", _Signal, agent_name="munger", max_retries=2)
+
+    (record,) = recorder.records
+    assert (record.status, record.retries, record.estimated) == ("failed", 1, True)
+    assert record.prompt_tokens == 2 * utils.llm.estimate_tokens("x" * 400)
+
+
+def test_export_json_and_csv(tmp_path, monkeypatch):
+    recorder = _use(monkeypatch, _FakeLLM())
+    for day in ("2024-01-02", "2024-01-03"):
+        with recorder.day(day):
+            call_llm("prompt", "gpt-4o", "OpenAI", _Signal, agent_name="warren_buffett_agent")
+
+    recorder.export(str(tmp_path / "telemetry.json"))
+    exported = json.loads((tmp_path / "telemetry.json").read_text())
+    assert [group["day"] for group in exported["by_day"]] == ["2024-01-02", "2024-01-03"]
+    assert exported["by_model"][0]["model"] == "gpt-4o"
+    assert len(exported["calls"]) == 2
+
+    recorder.export(str(tmp_path / "telemetry.csv"))
+    with open(tmp_path / "telemetry.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["total_tokens"] for row in rows] == ["120", "120"]
+
+
+def test_compact_payload_rounds_sorts_and_reports_savings(monkeypatch):
+    recorder = _use(monkeypatch, _FakeLLM())
+    data = {"AAPL": {"score": 7.0, "margin_of_safety": 0.123456789, "market_cap": 2912345678901.5, "details": "Strong ROE", "growth": float("nan")}}
+
+    assert compact_json(data) == '{"AAPL":{"details":"Strong ROE","growth":null,"margin_of_safety":0.1235,"market_cap":2912000000000,"score":7}}'
+
+    call_llm(f"Analysis data: {compact_prompt_payload(data)}", "gpt-4o", "OpenAI", _Signal, agent_name="warren_buffett_agent")
+    (summary,) = recorder.summarize_payloads()
+    assert summary["agent"] == "warren_buffett_agent"
+    assert summary["tokens_after"] < summary["tokens_before"]
+    assert recorder.to_dict()["prompt_compaction"] == [summary]
+
+
+def test_only_sent_prompts_count_towards_compaction(monkeypatch):
+    recorder = _use(monkeypatch, _FakeLLM())
+    tickers = ["AAPL", "MSFT", "NVDA", "TSLA"]
+
+    def build_prompt(batch):
+        return f"Analysis data: {compact_prompt_payload({ticker: {'score': 7.123456, 'ticker': ticker} for ticker in batch})}"
+
+    # Sizing the batch builds trial prompts, which are never sent
+    (batch,) = split_batches(tickers, build_prompt, batch_size=4, max_prompt_tokens=12000)
+    assert recorder.summarize_payloads() == []
+
+    call_llm(build_prompt(batch), "gpt-4o", "OpenAI", _Signal, agent_name="ben_graham_agent")
+    assert [summary["payloads"] for summary in recorder.summarize_payloads()] == [1]
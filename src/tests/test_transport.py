@@ -0,0 +1,111 @@
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+src_path = str(Path(__file__).parent.parent)
+sys.path.append(src_path)
+
+from tools.transport import RateLimiter
+
+
+def test_rate_limiter_allows_burst_then_throttles():
+    limiter = RateLimiter(rate=20, capacity=5)
+
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - started < 0.05
+
+    for _ in range(4):
+        limiter.acquire()
+    # 4 more tokens at 20/s take roughly 0.2s to refill
+    assert time.monotonic() - started >= 0.15
+
+
+def test_session_is_shared_and_carries_api_key(monkeypatch):
+    from tools import transport
+
+    monkeypatch.setenv("FINANCIAL_DATASETS_API_KEY", "test-key")
+    transport.reset_session()
+    try:
+        session = transport.get_session()
+        assert transport.get_session() is session
+        assert session.headers["X-API-KEY"] == "test-key"
+    finally:
+        transport.reset_session()
+
+
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def _response(status_code, headers=None):
+    import requests
+
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = b"{}"
+    return response
+
+
+def test_request_retries_throttled_and_server_errors(monkeypatch):
+    from tools import transport
+
+    session = _FakeSession([_response(429, {"Retry-After": "0"}), _response(503), _response(200)])
+    monkeypatch.setattr(transport, "get_session", lambda: session)
+    monkeypatch.setattr(transport, "backoff_delay", lambda attempt: 0)
+
+    assert transport.request("GET", "https://retry.test/prices").status_code == 200
+    assert session.calls == 3
+
+
+def test_request_raises_api_error_and_opens_circuit(monkeypatch):
+    import pytest
+    from tools import transport
+
+    monkeypatch.setenv("HTTP_MAX_RETRIES", "0")
+    monkeypatch.setenv("HTTP_CIRCUIT_FAILURE_THRESHOLD", "2")
+    session = _FakeSession([_response(500), _response(500), _response(200)])
+    monkeypatch.setattr(transport, "get_session", lambda: session)
+
+    for _ in range(2):
+        with pytest.raises(transport.APIError):
+            transport.request("GET", "https://breaker.test/prices")
+    with pytest.raises(transport.CircuitOpenError):
+        transport.request("GET", "https://breaker.test/prices")
+    assert session.calls == 2
+
+
+def test_parse_retry_after():
+    from tools.transport import parse_retry_after
+
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_throttled_probe_reopens_circuit(monkeypatch):
+    import pytest
+    from tools import transport
+
+    monkeypatch.setenv("HTTP_MAX_RETRIES", "0")
+    monkeypatch.setenv("HTTP_CIRCUIT_FAILURE_THRESHOLD", "1")
+    monkeypatch.setenv("HTTP_CIRCUIT_RESET_SECONDS", "0")
+    session = _FakeSession([_response(500), _response(429), _response(200)])
+    monkeypatch.setattr(transport, "get_session", lambda: session)
+
+    with pytest.raises(transport.APIError):
+        transport.request("GET", "https://probe.test/prices")
+    with pytest.raises(transport.APIError):
+        transport.request("GET", "https://probe.test/prices")
+    # The throttled probe must not leave the breaker stuck half-open
+    assert transport.request("GET", "https://probe.test/prices").status_code == 200
+    assert session.calls == 3
@@ -1,15 +1,22 @@
 import os
 import pandas as pd
-import requests
 from serpapi import GoogleSearch
 from dotenv import load_dotenv
 from apify_client import ApifyClient
 import logging
 import json
-from datetime import datetime  # 添加这行
-
-
-from data.cache import get_cache
+import asyncio
+import functools
+import inspect
+import math
+import threading
+from collections.abc import Sequence
+from concurrent.futures import Future
+from datetime import datetime, timedelta  # 添加这行
+
+
+from data.cache import PRICE_COLUMNS, get_cache
+from tools import transport
 from data.models import (
     CompanyNews,
     CompanyNewsResponse,
@@ -27,41 +34,151 @@ from data.models import (
     RelatedHashtag,
 )
 
+# Load .env before the cache is created so CACHE_DIR and friends are honoured
+load_dotenv()
+
 # Global cache instance
 _cache = get_cache()
-load_dotenv()
+
+# Fetches currently running, keyed by function and normalised arguments
+_in_flight: dict[tuple, Future] = {}
+_in_flight_lock = threading.Lock()
+
+
+def _freeze(value):
+    """Make an argument usable as part of a dict key."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def single_flight(func):
+    """Coalesce concurrent calls with the same arguments into a single fetch.
+
+    The first caller runs the function; callers arriving while it is still
+    running wait for and share its result (or exception) instead of sending
+    the same request again.  Later calls run normally and hit the cache.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (func.__name__, *(_freeze(v) for v in bound.arguments.values()))
+
+        with _in_flight_lock:
+            future = _in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = _in_flight[key] = Future()
+
+        if not leader:
+            result = future.result()
+            # Hand each caller its own list so nobody mutates the shared result
+            return list(result) if isinstance(result, list) else result
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with _in_flight_lock:
+                del _in_flight[key]
+
+    return wrapper
+
+
+class PriceList(Sequence[Price]):
+    """Read-only sequence of Price objects backed by a cached price frame.
+
+    Price models are only built for the rows that are actually accessed, so
+    callers that just check for emptiness or read the last close stay cheap.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PriceList(self.frame.iloc[index])
+        row = self.frame.iloc[index]
+        return Price(**{col: row[col] for col in PRICE_COLUMNS})
+
+    def __iter__(self):
+        for price in self.frame[PRICE_COLUMNS].itertuples(index=False):
+            yield Price(**price._asdict())
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
 
 def get_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
-    """Fetch price data from cache or API."""
-    # Check cache first
-    if cached_data := _cache.get_prices(ticker):
-        # Filter cached data by date range and convert to Price objects
-        filtered_data = [Price(**price) for price in cached_data if start_date <= price["time"] <= end_date]
-        if filtered_data:
-            return filtered_data
+    """Fetch price data from cache or API, fetching only the date ranges the cache does not cover."""
+    return PriceList(get_price_frame(ticker, start_date, end_date))
+
+
+def get_price_frame(ticker: str, start_date: str, end_date: str, warmup_bars: int = 0) -> pd.DataFrame:
+    """Get prices between two dates as a date-indexed DataFrame.
+
+    warmup_bars extends the window back by at least that many trading days
+    before start_date, for indicators that need history before their first value.
+
+    The frame is a zero-copy slice of the cache, so treat it as read-only and
+    call .copy() before adding or modifying columns.
+    """
+    return _get_cached_price_range(ticker, warmup_start_date(start_date, warmup_bars), end_date)
+
 
-    # If not in cache or no data in range, fetch from API
-    headers = {}
-    if api_key := os.environ.get("FINANCIAL_DATASETS_API_KEY"):
-        headers["X-API-KEY"] = api_key
+def warmup_start_date(start_date: str, bars: int) -> str:
+    """Get a date at least `bars` trading days before start_date.
 
+    Trading days are counted as business days plus slack for exchange holidays
+    (about 10 a year).  The result only depends on start_date, so overlapping
+    windows reuse the history the price cache already covers.
+    """
+    if bars <= 0:
+        return start_date
+    return (pd.Timestamp(start_date) - pd.offsets.BDay(bars + math.ceil(bars / 25))).strftime("%Y-%m-%d")
+
+
+def _get_cached_price_range(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Fill any gaps in the cached coverage of a date range, then slice it from the cache."""
+    # Days after yesterday may still be missing bars upstream, so never mark them as covered
+    last_complete_day = (datetime.now().date() - timedelta(days=1)).isoformat()
+
+    for gap_start, gap_end in _cache.missing_price_ranges(ticker, start_date, end_date):
+        _fill_price_gap(ticker, gap_start, gap_end, last_complete_day)
+
+    return _cache.get_price_range(ticker, start_date, end_date)
+
+
+@single_flight
+def _fill_price_gap(ticker: str, start_date: str, end_date: str, last_complete_day: str):
+    """Fetch one uncovered date range into the cache."""
+    prices = _fetch_prices(ticker, start_date, end_date)
+    # Cache the results as dicts, together with the coverage, in a single write
+    _cache.fill_prices(ticker, [p.model_dump() for p in prices], start_date, min(end_date, last_complete_day))
+
+
+def _fetch_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
+    """Fetch price data for a date range from the API."""
     url = f"https://api.financialdatasets.ai/prices/?ticker={ticker}&interval=day&interval_multiplier=1&start_date={start_date}&end_date={end_date}"
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        raise Exception(f"Error fetching data: {response.status_code} - {response.text}")
+    response = transport.request("GET", url)
 
     # Parse response with Pydantic model
     price_response = PriceResponse(**response.json())
-    prices = price_response.prices
-
-    if not prices:
-        return []
-
-    # Cache the results as dicts
-    _cache.set_prices(ticker, [p.model_dump() for p in prices])
-    return prices
+    return price_response.prices
 
 
+@single_flight
 def get_financial_metrics(
     ticker: str,
     end_date: str,
@@ -78,14 +195,8 @@ def get_financial_metrics(
             return filtered_data[:limit]
 
     # If not in cache or insufficient data, fetch from API
-    headers = {}
-    if api_key := os.environ.get("FINANCIAL_DATASETS_API_KEY"):
-        headers["X-API-KEY"] = api_key
-
     url = f"https://api.financialdatasets.ai/financial-metrics/?ticker={ticker}&report_period_lte={end_date}&limit={limit}&period={period}"
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        raise Exception(f"Error fetching data: {response.status_code} - {response.text}")
+    response = transport.request("GET", url)
 
     # Parse response with Pydantic model
     metrics_response = FinancialMetricsResponse(**response.json())
@@ -100,6 +211,7 @@ def get_financial_metrics(
     return financial_metrics
 
 
+@single_flight
 def search_line_items(
     ticker: str,
     line_items: list[str],
@@ -107,34 +219,98 @@ def search_line_items(
     period: str = "ttm",
     limit: int = 10,
 ) -> list[LineItem]:
-    """Fetch line items from API."""
-    # If not in cache or insufficient data, fetch from API
-    headers = {}
-    if api_key := os.environ.get("FINANCIAL_DATASETS_API_KEY"):
-        headers["X-API-KEY"] = api_key
-
-    url = "https://api.financialdatasets.ai/financials/search/line-items"
+    """Fetch line items from cache or API, fetching only the fields the cache is missing."""
+    # Check cache first
+    if (report_periods := _cache.get_line_item_periods(ticker, period, end_date, limit)) is not None:
+        rows, missing = _cache.get_line_items(ticker, period, report_periods, line_items)
+        if missing:
+            search_line_items_batch([ticker], missing, end_date, period=period, limit=limit)
+            rows, _ = _cache.get_line_items(ticker, period, report_periods, line_items)
+        return [LineItem(**row) for row in rows]
 
-    body = {
-        "tickers": [ticker],
-        "line_items": line_items,
-        "end_date": end_date,
-        "period": period,
-        "limit": limit,
-    }
-    response = requests.post(url, headers=headers, json=body)
-    if response.status_code != 200:
-        raise Exception(f"Error fetching data: {response.status_code} - {response.text}")
-    data = response.json()
-    response_model = LineItemResponse(**data)
-    search_results = response_model.search_results
-    if not search_results:
-        return []
+    # If not in cache or insufficient data, fetch from API
+    results = search_line_items_batch([ticker], line_items, end_date, period=period, limit=limit)
+    return results[ticker]
 
-    # Cache the results
-    return search_results[:limit]
 
+def search_line_items_batch(
+    tickers: list[str],
+    line_items: list[str],
+    end_date: str,
+    period: str = "ttm",
+    limit: int = 10,
+    batch_size: int = 10,
+) -> dict[str, list[LineItem]]:
+    """Fetch the same line items for several tickers with as few requests as possible.
 
+    `limit` applies per ticker.  Results are cached per ticker and returned as
+    a mapping of ticker to line items, most recent report period first.
+    """
+    url = "https://api.financialdatasets.ai/financials/search/line-items"
+    results = {ticker: [] for ticker in tickers}
+
+    for i in range(0, len(tickers), batch_size):
+        chunk = tickers[i : i + batch_size]
+        body = {
+            "tickers": chunk,
+            "line_items": line_items,
+            "end_date": end_date,
+            "period": period,
+            # Enough rows for every ticker in the chunk whether the API applies the limit per ticker or overall
+            "limit": limit * len(chunk),
+        }
+        response = transport.request("POST", url, json=body)
+        response_model = LineItemResponse(**response.json())
+
+        # Fan the results back out per ticker
+        for item in response_model.search_results:
+            if item.ticker in results:
+                results[item.ticker].append(item)
+
+        # Only a response under the body's limit is known to hold every ticker's whole history; if the
+        # API applies the limit overall, a ticker with fewer than `limit` rows may just have been cut off
+        complete = len(response_model.search_results) < body["limit"]
+        for ticker in chunk:
+            results[ticker].sort(key=lambda x: x.report_period, reverse=True)
+            # Rows trimmed off to `limit` mean older periods exist, so the kept rows are not the whole history
+            trimmed = len(results[ticker]) > limit
+            results[ticker] = results[ticker][:limit]
+            # Cache the results
+            _cache.set_line_items(ticker, period, end_date, line_items, [item.model_dump() for item in results[ticker]], complete=complete and not trimmed)
+
+    return results
+
+
+def prefetch_line_items(queries: list[dict[str, any]], end_date: str):
+    """Fetch the line items several agents will need for a run in as few requests as possible.
+
+    Each query is a dict with `tickers`, `line_items`, `period` and `limit`.
+    Queries for the same period are merged into searches over the union of
+    their fields, skipping whatever the cache can already answer; later
+    search_line_items calls are then served from the cache.
+    """
+    merged: dict[str, dict[str, any]] = {}
+    for query in queries:
+        group = merged.setdefault(query["period"], {"tickers": [], "line_items": [], "limit": 0})
+        group["tickers"].extend(t for t in query["tickers"] if t not in group["tickers"])
+        group["line_items"].extend(f for f in query["line_items"] if f not in group["line_items"])
+        group["limit"] = max(group["limit"], query.get("limit", 10))
+
+    for period, group in merged.items():
+        # Group tickers by the fields they still need so each distinct need is one batched search
+        needs: dict[tuple[str, ...], list[str]] = {}
+        for ticker in group["tickers"]:
+            missing = group["line_items"]
+            if (report_periods := _cache.get_line_item_periods(ticker, period, end_date, group["limit"])) is not None:
+                _, missing = _cache.get_line_items(ticker, period, report_periods, group["line_items"])
+            if missing:
+                needs.setdefault(tuple(missing), []).append(ticker)
+
+        for line_items, tickers in needs.items():
+            search_line_items_batch(tickers, list(line_items), end_date, period=period, limit=group["limit"])
+
+
+@single_flight
 def get_insider_trades(
     ticker: str,
     end_date: str,
@@ -153,10 +329,6 @@ def get_insider_trades(
             return filtered_data
 
     # If not in cache or insufficient data, fetch from API
-    headers = {}
-    if api_key := os.environ.get("FINANCIAL_DATASETS_API_KEY"):
-        headers["X-API-KEY"] = api_key
-
     all_trades = []
     current_end_date = end_date
     
@@ -166,9 +338,7 @@ def get_insider_trades(
             url += f"&filing_date_gte={start_date}"
         url += f"&limit={limit}"
         
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            raise Exception(f"Error fetching data: {response.status_code} - {response.text}")
+        response = transport.request("GET", url)
         
         data = response.json()
         response_model = InsiderTradeResponse(**data)
@@ -198,6 +368,7 @@ def get_insider_trades(
     return all_trades
 
 
+@single_flight
 def get_company_news(
     ticker: str,
     end_date: str,
@@ -216,10 +387,6 @@ def get_company_news(
             return filtered_data
 
     # If not in cache or insufficient data, fetch from API
-    headers = {}
-    if api_key := os.environ.get("FINANCIAL_DATASETS_API_KEY"):
-        headers["X-API-KEY"] = api_key
-
     all_news = []
     current_end_date = end_date
     
@@ -229,9 +396,7 @@ def get_company_news(
             url += f"&start_date={start_date}"
         url += f"&limit={limit}"
         
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            raise Exception(f"Error fetching data: {response.status_code} - {response.text}")
+        response = transport.request("GET", url)
         
         data = response.json()
         response_model = CompanyNewsResponse(**data)
@@ -277,6 +442,9 @@ def get_market_cap(
 
 def prices_to_df(prices: list[Price]) -> pd.DataFrame:
     """Convert prices to a DataFrame."""
+    if isinstance(prices, PriceList):
+        # Already typed and sorted, just hand back a frame the caller owns
+        return prices.frame.copy()
     df = pd.DataFrame([p.model_dump() for p in prices])
     df["Date"] = pd.to_datetime(df["time"])
     df.set_index("Date", inplace=True)
@@ -287,10 +455,63 @@ def prices_to_df(prices: list[Price]) -> pd.DataFrame:
     return df
 
 
-# Update the get_price_data function to use the new functions
 def get_price_data(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
-    prices = get_prices(ticker, start_date, end_date)
-    return prices_to_df(prices)
+    """Get prices as a DataFrame the caller owns (see get_price_frame for the zero-copy variant)."""
+    return get_price_frame(ticker, start_date, end_date).copy()
+
+
+
+# Async counterparts of the fetchers above.  Each runs its sync twin on a worker
+# thread, so they share the pooled session, rate limiting, retries, in-flight
+# coalescing and cache; agents can asyncio.gather their per-ticker fetches.
+async def aget_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
+    """Async version of get_prices."""
+    return await asyncio.to_thread(get_prices, ticker, start_date, end_date)
+
+
+async def aget_price_frame(ticker: str, start_date: str, end_date: str, warmup_bars: int = 0) -> pd.DataFrame:
+    """Async version of get_price_frame."""
+    return await asyncio.to_thread(get_price_frame, ticker, start_date, end_date, warmup_bars)
+
+
+async def aget_price_data(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Async version of get_price_data."""
+    return await asyncio.to_thread(get_price_data, ticker, start_date, end_date)
+
+
+async def aget_financial_metrics(ticker: str, end_date: str, period: str = "ttm", limit: int = 10) -> list[FinancialMetrics]:
+    """Async version of get_financial_metrics."""
+    return await asyncio.to_thread(get_financial_metrics, ticker, end_date, period, limit)
+
+
+async def asearch_line_items(ticker: str, line_items: list[str], end_date: str, period: str = "ttm", limit: int = 10) -> list[LineItem]:
+    """Async version of search_line_items."""
+    return await asyncio.to_thread(search_line_items, ticker, line_items, end_date, period, limit)
+
+
+async def asearch_line_items_batch(tickers: list[str], line_items: list[str], end_date: str, period: str = "ttm", limit: int = 10, batch_size: int = 10) -> dict[str, list[LineItem]]:
+    """Async version of search_line_items_batch."""
+    return await asyncio.to_thread(search_line_items_batch, tickers, line_items, end_date, period, limit, batch_size)
+
+
+async def aprefetch_line_items(queries: list[dict[str, any]], end_date: str):
+    """Async version of prefetch_line_items."""
+    return await asyncio.to_thread(prefetch_line_items, queries, end_date)
+
+
+async def aget_insider_trades(ticker: str, end_date: str, start_date: str | None = None, limit: int = 1000) -> list[InsiderTrade]:
+    """Async version of get_insider_trades."""
+    return await asyncio.to_thread(get_insider_trades, ticker, end_date, start_date, limit)
+
+
+async def aget_company_news(ticker: str, end_date: str, start_date: str | None = None, limit: int = 1000) -> list[CompanyNews]:
+    """Async version of get_company_news."""
+    return await asyncio.to_thread(get_company_news, ticker, end_date, start_date, limit)
+
+
+async def aget_market_cap(ticker: str, end_date: str) -> float | None:
+    """Async version of get_market_cap."""
+    return await asyncio.to_thread(get_market_cap, ticker, end_date)
 
 
 # Get Google Trends data for a list of queries
@@ -0,0 +1,265 @@
+"""Shared HTTP transport for the financial data API"""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Responses worth retrying: throttling and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class APIError(Exception):
+    """Raised when the API returns an error response that retrying did not resolve."""
+
+    def __init__(self, status_code: int | None, text: str):
+        super().__init__(f"Error fetching data: {status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+class CircuitOpenError(APIError):
+    """Raised without sending a request while a host's circuit breaker is open."""
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` requests per second with bursts of up to `capacity`.
+
+    The rate adapts to the provider: it is halved whenever the host throttles us
+    and creeps back towards the configured rate after each successful request.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        if self.max_rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_throttled(self, retry_after: float | None = None):
+        """Back off after a 429: pause every caller on this host and halve the rate."""
+        if self.max_rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = 0
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def on_success(self):
+        """Recover the rate additively after a request goes through."""
+        if self.max_rate <= 0 or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    """Stops sending requests to a host after repeated failures, then probes it again after a cool-down."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            # Half-open: let a single probe through once the cool-down has passed
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def record_inconclusive(self):
+        """Note a request that says nothing about the host's health; a probe ending this way re-opens the breaker."""
+        with self._lock:
+            if self._probing:
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+_limiters: dict[str, RateLimiter] = {}
+_breakers: dict[str, CircuitBreaker] = {}
+_hosts_lock = threading.Lock()
+
+
+def get_rate_limiter(url: str) -> RateLimiter:
+    """Get the rate limiter shared by every request to the URL's host."""
+    host = urlparse(url).netloc
+    with _hosts_lock:
+        if host not in _limiters:
+            # 0 disables rate limiting
+            rate = float(os.environ.get("API_RATE_LIMIT_PER_SECOND", "10"))
+            burst = os.environ.get("API_RATE_LIMIT_BURST")
+            _limiters[host] = RateLimiter(rate, float(burst) if burst else None)
+        return _limiters[host]
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """Get the circuit breaker shared by every request to the URL's host."""
+    host = urlparse(url).netloc
+    with _hosts_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(
+                failure_threshold=int(os.environ.get("HTTP_CIRCUIT_FAILURE_THRESHOLD", "5")),
+                reset_timeout=float(os.environ.get("HTTP_CIRCUIT_RESET_SECONDS", "30")),
+            )
+        return _breakers[host]
+
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def _create_session() -> requests.Session:
+    """Create a pooled keep-alive session carrying the financial datasets API key."""
+    pool_size = int(os.environ.get("HTTP_POOL_SIZE", "16"))
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if api_key := os.environ.get("FINANCIAL_DATASETS_API_KEY"):
+        session.headers["X-API-KEY"] = api_key
+    return session
+
+
+def get_session() -> requests.Session:
+    """Get the session shared by every fetcher in tools.api."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _create_session()
+        return _session
+
+
+def reset_session():
+    """Close the shared session so the next request picks up new pool settings or API keys."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """Send an HTTP request on the shared session.
+
+    Waits for the host's rate limiter, retries throttled, 5xx and connection
+    failures with jittered exponential backoff (honouring Retry-After), and
+    raises APIError for responses that are still unsuccessful.
+    """
+    kwargs.setdefault("timeout", float(os.environ.get("HTTP_TIMEOUT", "30")))
+    max_retries = int(os.environ.get("HTTP_MAX_RETRIES", "4"))
+    limiter = get_rate_limiter(url)
+    breaker = get_circuit_breaker(url)
+
+    for attempt in range(max_retries + 1):
+        if not breaker.allow_request():
+            raise CircuitOpenError(None, f"circuit open for {urlparse(url).netloc}, not sending request")
+
+        limiter.acquire()
+        try:
+            response = get_session().request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            breaker.record_failure()
+            if attempt == max_retries:
+                raise APIError(None, str(e)) from e
+            time.sleep(backoff_delay(attempt))
+            continue
+        except Exception:
+            breaker.record_inconclusive()
+            raise
+
+        if response.status_code == 429:
+            # Throttling says nothing about the host's health, so only a probe re-opens the breaker
+            breaker.record_inconclusive()
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            limiter.on_throttled(retry_after)
+            if attempt == max_retries:
+                break
+            time.sleep(retry_after if retry_after is not None else backoff_delay(attempt))
+            continue
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            breaker.record_failure()
+            if attempt == max_retries:
+                break
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            time.sleep(retry_after if retry_after is not None else backoff_delay(attempt))
+            continue
+
+        breaker.record_success()
+        limiter.on_success()
+        break
+
+    if not response.ok:
+        raise APIError(response.status_code, response.text)
+    return response
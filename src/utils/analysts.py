@@ -1,40 +1,51 @@
 """Constants and utilities related to analysts configuration."""
 
-from agents.ben_graham import ben_graham_agent
-from agents.bill_ackman import bill_ackman_agent
-from agents.cathie_wood import cathie_wood_agent
-from agents.charlie_munger import charlie_munger_agent
-from agents.fundamentals import fundamentals_agent
-from agents.sentiment import sentiment_agent
+from agents.ben_graham import ben_graham_agent, get_agent_inputs as get_ben_graham_inputs, LINE_ITEM_QUERY as BEN_GRAHAM_LINE_ITEM_QUERY
+from agents.bill_ackman import bill_ackman_agent, get_agent_inputs as get_bill_ackman_inputs, LINE_ITEM_QUERY as BILL_ACKMAN_LINE_ITEM_QUERY
+from agents.cathie_wood import cathie_wood_agent, LINE_ITEM_QUERY as CATHIE_WOOD_LINE_ITEM_QUERY
+from agents.charlie_munger import charlie_munger_agent, get_agent_inputs as get_charlie_munger_inputs, LINE_ITEM_QUERY as CHARLIE_MUNGER_LINE_ITEM_QUERY
+from agents.fundamentals import fundamentals_agent, get_agent_inputs as get_fundamentals_inputs
+from agents.sentiment import sentiment_agent, get_agent_inputs as get_sentiment_inputs
 from agents.technicals import technical_analyst_agent
-from agents.valuation import valuation_agent
-from agents.warren_buffett import warren_buffett_agent
+from agents.valuation import valuation_agent, get_agent_inputs as get_valuation_inputs, LINE_ITEM_QUERY as VALUATION_LINE_ITEM_QUERY
+from agents.warren_buffett import warren_buffett_agent, get_agent_inputs as get_warren_buffett_inputs, LINE_ITEM_QUERY as WARREN_BUFFETT_LINE_ITEM_QUERY
 
 # Define analyst configuration - single source of truth
+# Analysts with "get_inputs" only see new data on filings, trades or news, so backtests can reuse
+# their signals across days; the others read prices and rerun every day
 ANALYST_CONFIG = {
     "ben_graham": {
         "display_name": "Ben Graham",
         "agent_func": ben_graham_agent,
+        "line_item_query": BEN_GRAHAM_LINE_ITEM_QUERY,
+        "get_inputs": get_ben_graham_inputs,
         "order": 0,
     },
     "bill_ackman": {
         "display_name": "Bill Ackman",
         "agent_func": bill_ackman_agent,
+        "line_item_query": BILL_ACKMAN_LINE_ITEM_QUERY,
+        "get_inputs": get_bill_ackman_inputs,
         "order": 1,
     },
     "cathie_wood": {
         "display_name": "Cathie Wood",
         "agent_func": cathie_wood_agent,
+        "line_item_query": CATHIE_WOOD_LINE_ITEM_QUERY,
         "order": 2,
     },
     "charlie_munger": {
         "display_name": "Charlie Munger",
         "agent_func": charlie_munger_agent,
+        "line_item_query": CHARLIE_MUNGER_LINE_ITEM_QUERY,
+        "get_inputs": get_charlie_munger_inputs,
         "order": 3,
     },
     "warren_buffett": {
         "display_name": "Warren Buffett",
         "agent_func": warren_buffett_agent,
+        "line_item_query": WARREN_BUFFETT_LINE_ITEM_QUERY,
+        "get_inputs": get_warren_buffett_inputs,
         "order": 4,
     },
     "technical_analyst": {
@@ -45,16 +56,20 @@ ANALYST_CONFIG = {
     "fundamentals_analyst": {
         "display_name": "Fundamentals Analyst",
         "agent_func": fundamentals_agent,
+        "get_inputs": get_fundamentals_inputs,
         "order": 5,
     },
     "sentiment_analyst": {
         "display_name": "Sentiment Analyst",
         "agent_func": sentiment_agent,
+        "get_inputs": get_sentiment_inputs,
         "order": 6,
     },
     "valuation_analyst": {
         "display_name": "Valuation Analyst",
         "agent_func": valuation_agent,
+        "line_item_query": VALUATION_LINE_ITEM_QUERY,
+        "get_inputs": get_valuation_inputs,
         "order": 7,
     },
 }
@@ -66,3 +81,13 @@ ANALYST_ORDER = [(config["display_name"], key) for key, config in sorted(ANALYST
 def get_analyst_nodes():
     """Get the mapping of analyst keys to their (node_name, agent_func) tuples."""
     return {key: (f"{key}_agent", config["agent_func"]) for key, config in ANALYST_CONFIG.items()}
+
+
+def get_line_item_queries(selected_analysts: list[str], tickers: list[str]) -> list[dict[str, any]]:
+    """Get the line item queries the selected analysts will make for the given tickers."""
+    return [{**ANALYST_CONFIG[key]["line_item_query"], "tickers": tickers} for key in selected_analysts if "line_item_query" in ANALYST_CONFIG.get(key, {})]
+
+
+def get_analyst_inputs() -> dict[str, any]:
+    """Get the functions returning the data each analyst analyzes for a ticker, for the analysts that declare one."""
+    return {key: config["get_inputs"] for key, config in ANALYST_CONFIG.items() if "get_inputs" in config}
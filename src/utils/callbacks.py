@@ -1,6 +1,8 @@
 from langchain.callbacks.base import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
 from typing import Any, Dict, List, Union
 import logging
+import threading
 
 class CustomCallbackHandler(BaseCallbackHandler):
     """Custom callback handler for logging LLM interactions"""
@@ -40,4 +42,35 @@ class CustomCallbackHandler(BaseCallbackHandler):
 
     def on_chain_end(self, outputs: Dict[str, Any], **kwargs: Any) -> None:
         """Log when chain ends running"""
-        self.logger.info(f"\n🔗 Chain End\nOutputs: {outputs}") 
\ No newline at end of file
+        self.logger.info(f"\n🔗 Chain End\nOutputs: {outputs}") 
+
+class TokenUsageCallbackHandler(BaseCallbackHandler):
+    """Collects the prompt and completion tokens providers report for the LLM runs it is attached to"""
+
+    def __init__(self):
+        super().__init__()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        """Add up the usage of a finished LLM run"""
+        prompt_tokens, completion_tokens = 0, 0
+        usage = (response.llm_output or {}).get("token_usage") or (response.llm_output or {}).get("usage")
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens") or usage.get("input_tokens") or 0
+            completion_tokens = usage.get("completion_tokens") or usage.get("output_tokens") or 0
+        else:
+            # Chat models report usage on each generated message instead
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if metadata:
+                        prompt_tokens += metadata.get("input_tokens", 0)
+                        completion_tokens += metadata.get("output_tokens", 0)
+        if prompt_tokens or completion_tokens:
+            with self._lock:
+                self.prompt_tokens += prompt_tokens
+                self.completion_tokens += completion_tokens
+                self.reported = True
@@ -0,0 +1,41 @@
+"""Helpers for processing tickers concurrently inside agent nodes"""
+
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def get_max_workers(state: Optional[dict] = None) -> int:
+    """Get how many tickers an agent may process at once.
+
+    Taken from the run's `max_workers` metadata, then the AGENT_MAX_WORKERS
+    environment variable, then DEFAULT_MAX_WORKERS.  1 processes tickers serially.
+    """
+    metadata = (state or {}).get("metadata") or {}
+    if metadata.get("max_workers"):
+        return max(1, int(metadata["max_workers"]))
+    return max(1, int(os.environ.get("AGENT_MAX_WORKERS", DEFAULT_MAX_WORKERS)))
+
+
+def map_tickers(func: Callable[[str], Optional[T]], tickers: list[str], max_workers: int = DEFAULT_MAX_WORKERS) -> dict[str, T]:
+    """Run func for every ticker with up to max_workers at a time.
+
+    Results come back keyed by ticker in the order the tickers were given, so
+    the output does not depend on which thread finishes first.  Tickers for
+    which func returns None are left out.  The first exception raised by func
+    is re-raised once every ticker has finished.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if max_workers <= 1 or len(tickers) <= 1:
+        results = {ticker: func(ticker) for ticker in tickers}
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers)), thread_name_prefix="ticker") as executor:
+            # Each ticker runs in a copy of the caller's context so context-local callbacks still apply
+            futures = {ticker: executor.submit(contextvars.copy_context().run, func, ticker) for ticker in tickers}
+            results = {ticker: future.result() for ticker, future in futures.items()}
+    return {ticker: result for ticker, result in results.items() if result is not None}
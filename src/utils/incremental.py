@@ -0,0 +1,116 @@
+"""Reuse analyst signals across backtest days when an agent's inputs have not changed"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Optional
+
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel
+
+from graph.state import AgentState
+from utils.concurrency import get_max_workers, map_tickers
+from utils.progress import progress
+
+
+def _to_jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {str(key): _to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    return value
+
+
+def fingerprint(value: Any) -> str:
+    """Hash data made of Pydantic models, dicts, lists and scalars."""
+    content = json.dumps(_to_jsonable(value), sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class IncrementalAgent:
+    """Wraps an analyst node so it only reruns for tickers whose inputs changed.
+
+    get_inputs(ticker, end_date) returns the data the agent analyzes for a
+    ticker (fetched through the cached tools.api functions).  Its fingerprint,
+    together with the model settings, is compared with the one from the last
+    run: matching tickers reuse the previous signal and the rest are passed to
+    the agent.  Agents whose inputs move every day (prices) should not be wrapped.
+    """
+
+    def __init__(self, agent_func: Callable[[AgentState], dict], get_inputs: Callable[[str, str], Any]):
+        self.agent_func = agent_func
+        self.get_inputs = get_inputs
+        # Key the agent stores its signals under in analyst_signals, learned from its first run
+        self.signal_key: Optional[str] = None
+        # ticker -> (fingerprint, signal or None if the agent gave no signal)
+        self._memo: dict[str, tuple[str, Optional[dict]]] = {}
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.rerun = 0
+
+    def _fingerprint(self, ticker: str, state: AgentState) -> Optional[str]:
+        metadata = state.get("metadata") or {}
+        try:
+            inputs = self.get_inputs(ticker, state["data"]["end_date"])
+        except Exception:
+            # Let the agent itself deal with the failing data source
+            return None
+        return fingerprint([metadata.get("model_name"), str(metadata.get("model_provider")), metadata.get("fast_mode"), inputs])
+
+    def __call__(self, state: AgentState) -> dict:
+        data = state["data"]
+        tickers = data["tickers"]
+        fingerprints = map_tickers(lambda ticker: self._fingerprint(ticker, state) or "", tickers, get_max_workers(state))
+
+        with self._lock:
+            reused = {ticker: self._memo[ticker][1] for ticker in tickers if fingerprints[ticker] and ticker in self._memo and self._memo[ticker][0] == fingerprints[ticker]}
+        stale = [ticker for ticker in tickers if ticker not in reused]
+
+        signals = {}
+        if stale or self.signal_key is None:
+            # Run the agent on the stale tickers only, collecting its signals apart from the other agents'
+            sub_state = {**state, "data": {**data, "tickers": stale, "analyst_signals": {}}}
+            self.agent_func(sub_state)
+            written = sub_state["data"]["analyst_signals"]
+            self.signal_key = self.signal_key or next(iter(written), None)
+            signals = written.get(self.signal_key, {}) if self.signal_key else {}
+            with self._lock:
+                for ticker in stale:
+                    if fingerprints[ticker]:
+                        self._memo[ticker] = (fingerprints[ticker], signals.get(ticker))
+        elif self.signal_key:
+            progress.update_status(self.signal_key, None, "Done (inputs unchanged)")
+
+        self.reused += len(reused)
+        self.rerun += len(stale)
+        analysis = {ticker: signals[ticker] if ticker in signals else reused.get(ticker) for ticker in tickers}
+        analysis = {ticker: signal for ticker, signal in analysis.items() if signal is not None}
+
+        if self.signal_key is None:
+            return {"messages": [], "data": data}
+        data["analyst_signals"][self.signal_key] = analysis
+        return {
+            "messages": [HumanMessage(content=json.dumps(analysis), name=self.signal_key)],
+            "data": data,
+        }
+
+
+class IncrementalAnalysts:
+    """IncrementalAgent wrappers for the analysts that declare their inputs, kept across the runs of a backtest."""
+
+    def __init__(self):
+        self._agents: dict[str, IncrementalAgent] = {}
+
+    def wrap(self, analyst_key: str, agent_func: Callable[[AgentState], dict], get_inputs: Optional[Callable[[str, str], Any]]) -> Callable[[AgentState], dict]:
+        """Get the node to run for an analyst: the agent itself when it declares no inputs."""
+        if get_inputs is None:
+            return agent_func
+        if analyst_key not in self._agents:
+            self._agents[analyst_key] = IncrementalAgent(agent_func, get_inputs)
+        return self._agents[analyst_key]
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """How many ticker analyses each wrapped analyst reused and reran."""
+        return {key: {"reused": agent.reused, "rerun": agent.rerun} for key, agent in self._agents.items()}
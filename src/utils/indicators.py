@@ -0,0 +1,296 @@
+"""Vectorized technical indicators over a (date x ticker) panel of prices
+
+Every function works column-wise, so it takes either one ticker's Series or a
+wide DataFrame with one column per ticker and computes all tickers at once.
+The true range, ATR and ADX are pure NumPy functions over 1-D or (date x
+ticker) arrays: they never touch their inputs and return only their outputs.
+compute_indicators lines each ticker's own bars up by position before any
+rolling or shifted value is taken, so a ticker's values never depend on the
+dates other tickers in the panel happen to trade on.
+"""
+
+import functools
+import math
+
+import numpy as np
+import pandas as pd
+
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+# Trailing closes the latest Hurst exponent is fitted over, about six months of bars
+HURST_WINDOW = 126
+
+
+def build_price_panel(frames: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """Turn per-ticker price frames into one wide (date x ticker) frame per OHLCV field."""
+    frames = {ticker: frame for ticker, frame in frames.items() if frame is not None and not frame.empty}
+    return {field: pd.DataFrame({ticker: frame[field] for ticker, frame in frames.items()}).sort_index().astype(float) for field in PRICE_FIELDS}
+
+
+def ema(close: pd.DataFrame | pd.Series, span: int) -> pd.DataFrame | pd.Series:
+    return close.ewm(span=span, adjust=False).mean()
+
+
+def rsi(close: pd.DataFrame | pd.Series, period: int = 14) -> pd.DataFrame | pd.Series:
+    """RSI from simple moving averages of gains and losses."""
+    delta = close.diff()
+    has_bar = close.notna()
+    gain = delta.where(delta > 0, 0).fillna(0).where(has_bar)
+    loss = (-delta.where(delta < 0, 0)).fillna(0).where(has_bar)
+    rs = gain.rolling(window=period).mean() / loss.rolling(window=period).mean()
+    return 100 - (100 / (1 + rs))
+
+
+def bollinger_bands(close: pd.DataFrame | pd.Series, window: int = 20, rolling_std=None) -> tuple:
+    """Upper and lower bands two standard deviations around the moving average."""
+    sma = close.rolling(window).mean()
+    std_dev = close.rolling(window).std() if rolling_std is None else rolling_std
+    return sma + (std_dev * 2), sma - (std_dev * 2)
+
+
+def _previous(values: np.ndarray) -> np.ndarray:
+    """Each row's previous row, NaN for the first."""
+    previous = np.empty_like(values)
+    previous[:1] = np.nan
+    previous[1:] = values[:-1]
+    return previous
+
+
+def _ewm_mean(values: np.ndarray, span: int) -> np.ndarray:
+    """ewm(span=span).mean() (adjust=True) down the rows, where missing values age older ones as in pandas.
+
+    The running weighted sums are cumulative sums of values scaled by growing
+    powers of 1 / decay, taken in blocks short enough that the scale cannot overflow.
+    """
+    decay = 1 - 2 / (span + 1)
+    observed = ~np.isnan(values)
+    weighted = np.where(observed, values, 0.0)
+    numerator, denominator = np.empty_like(weighted), np.empty_like(weighted)
+    carry_numerator, carry_denominator = np.zeros(values.shape[1:]), np.zeros(values.shape[1:])
+    block = max(1, int(300 / -math.log(decay))) if decay > 0 else 1
+    as_rows = (-1,) + (1,) * (values.ndim - 1)
+    steps = np.arange(min(block, len(values)), dtype=float).reshape(as_rows)
+    for start in range(0, len(values), block):
+        rows = slice(start, start + block)
+        count = min(block, len(values) - start)
+        grow, shrink = decay ** -steps[:count], decay ** steps[:count]
+        numerator[rows] = shrink * (decay * carry_numerator + np.cumsum(weighted[rows] * grow, axis=0))
+        denominator[rows] = shrink * (decay * carry_denominator + np.cumsum(observed[rows] * grow, axis=0))
+        carry_numerator, carry_denominator = numerator[rows][-1], denominator[rows][-1]
+    # Rows without an observation keep the previous mean, however far the weights have decayed
+    means = np.where(observed, numerator / np.where(observed, denominator, 1.0), np.nan)
+    last_observed = np.maximum.accumulate(np.where(observed, np.arange(len(values)).reshape(as_rows), 0), axis=0)
+    return np.take_along_axis(means, last_observed, axis=0)
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """rolling(window).mean() down the rows: NaN until, and wherever, the window holds a missing value."""
+    means = np.full_like(values, np.nan)
+    if len(values) >= window:
+        means[window - 1 :] = np.lib.stride_tricks.sliding_window_view(values, window, axis=0).mean(axis=-1)
+    return means
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """The largest of high - low and the gaps from the previous close, NaN where there is no bar."""
+    high, low, close = (np.asarray(prices, dtype=float) for prices in (high, low, close))
+    previous_close = _previous(close)
+    high_low = high - low
+    # Like DataFrame.max(axis=1), a missing previous close does not hide the high - low range
+    tr = np.fmax(np.fmax(high_low, np.abs(high - previous_close)), np.abs(low - previous_close))
+    return np.where(np.isnan(high_low), np.nan, tr)
+
+
+def atr(high, low, close, period: int = 14, tr=None) -> np.ndarray:
+    """Average true range: the simple moving average of the true range."""
+    tr = true_range(high, low, close) if tr is None else np.asarray(tr, dtype=float)
+    return _rolling_mean(tr, period)
+
+
+def adx(high, low, close, period: int = 14, tr=None) -> dict[str, np.ndarray]:
+    """Average directional index with the +DI and -DI lines it is built from."""
+    high, low = np.asarray(high, dtype=float), np.asarray(low, dtype=float)
+    tr = true_range(high, low, close) if tr is None else np.asarray(tr, dtype=float)
+    no_bar = np.isnan(high)
+    up_move = high - _previous(high)
+    down_move = _previous(low) - low
+    plus_dm = np.where(no_bar, np.nan, np.where((up_move > down_move) & (up_move > 0), up_move, 0.0))
+    minus_dm = np.where(no_bar, np.nan, np.where((down_move > up_move) & (down_move > 0), down_move, 0.0))
+
+    smoothed_tr = _ewm_mean(tr, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plus_di = 100 * (_ewm_mean(plus_dm, period) / smoothed_tr)
+        minus_di = 100 * (_ewm_mean(minus_dm, period) / smoothed_tr)
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return {"adx": _ewm_mean(dx, period), "+di": plus_di, "-di": minus_di}
+
+
+@functools.lru_cache(maxsize=None)
+def _hurst_lags(max_lag: int) -> tuple[np.ndarray, np.ndarray]:
+    """The lags of a Hurst fit and their logs, shared by every call with the same max_lag."""
+    lags = np.arange(2, max_lag)
+    return lags, np.log(lags)
+
+
+def calculate_hurst_exponent(price_series: pd.Series | np.ndarray, max_lag: int = 20) -> float:
+    """
+    Calculate Hurst Exponent to determine long-term memory of time series
+    H < 0.5: Mean reverting series
+    H = 0.5: Random walk
+    H > 0.5: Trending series
+
+    Args:
+        price_series: Array-like price data
+        max_lag: Maximum lag for R/S calculation
+
+    Returns:
+        float: Hurst exponent, 0.5 (random walk) when there are too few prices
+    """
+    values = np.asarray(price_series, dtype=float)
+    lags, log_lags = _hurst_lags(max_lag)
+    if len(lags) < 2 or len(values) <= lags[-1]:
+        return 0.5
+
+    # Row i is a strided view of values[i:i + max_lag] (NaN past the end), so column lag minus column 0 is values[i + lag] - values[i]
+    padded = np.concatenate([values, np.full(max_lag, np.nan)])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, max_lag)[: len(values)]
+    differences = windows[:, lags] - windows[:, :1]
+    # Add small epsilon to avoid log(0)
+    tau = np.maximum(1e-8, np.sqrt(np.nanstd(differences, axis=0)))
+    if not np.all(np.isfinite(tau)):
+        return 0.5
+
+    # Hurst exponent is the slope of the linear fit
+    return float(np.polyfit(log_lags, np.log(tau), 1)[0])
+
+
+def rolling_hurst_exponent(price_series: pd.Series | np.ndarray, window: int = 100, max_lag: int = 20) -> pd.Series | np.ndarray:
+    """Hurst exponent of every trailing window of prices, NaN until the first full window.
+
+    All windows are fitted together by a single polyfit.  Returns a Series
+    aligned with price_series when given one, otherwise an array.
+    """
+    values = np.asarray(price_series, dtype=float)
+    lags, log_lags = _hurst_lags(max_lag)
+    hurst = np.full(len(values), np.nan)
+    if len(lags) >= 2 and window > lags[-1] and len(values) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)
+        # One row per lag, one column per window
+        tau = np.empty((len(lags), len(windows)))
+        for row, lag in enumerate(lags):
+            tau[row] = np.std(windows[:, lag:] - windows[:, :-lag], axis=1)
+        tau = np.maximum(1e-8, np.sqrt(tau))
+        # Windows containing missing prices have no exponent
+        valid = np.all(np.isfinite(tau), axis=0)
+        slopes = np.polyfit(log_lags, np.log(np.where(valid, tau, 1.0)), 1)[0]
+        hurst[window - 1 :] = np.where(valid, slopes, np.nan)
+    if isinstance(price_series, pd.Series):
+        return pd.Series(hurst, index=price_series.index, name="hurst_exponent")
+    return hurst
+
+
+class _BarPositions:
+    """Maps a (date x ticker) panel onto a (bar x ticker) one holding only each ticker's own bars.
+
+    Bars are right-aligned, so every ticker's last bar lands on the last row,
+    and a date one ticker did not trade on leaves no gap in its windows.
+    """
+
+    def __init__(self, close: pd.DataFrame):
+        has_bar = close.notna().to_numpy()
+        counts = has_bar.sum(axis=0)
+        self.dates, self.columns = close.index, close.columns
+        self.length = int(counts.max()) if counts.size else 0
+        self.date_rows, self.cols = np.nonzero(has_bar)
+        # Each bar's rank within its ticker, counted from the ticker's first bar
+        rank = np.cumsum(has_bar, axis=0)[self.date_rows, self.cols] - 1
+        self.bar_rows = self.length - counts[self.cols] + rank
+
+    def to_bars(self, frame: pd.DataFrame) -> pd.DataFrame:
+        values = np.full((self.length, len(self.columns)), np.nan)
+        values[self.bar_rows, self.cols] = frame.to_numpy(dtype=float)[self.date_rows, self.cols]
+        return pd.DataFrame(values, columns=self.columns)
+
+    def to_dates(self, frame: pd.DataFrame) -> pd.DataFrame:
+        values = np.full((len(self.dates), len(self.columns)), np.nan)
+        values[self.date_rows, self.cols] = frame.to_numpy(dtype=float)[self.bar_rows, self.cols]
+        return pd.DataFrame(values, index=self.dates, columns=self.columns)
+
+
+def compute_indicators(panel: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """Compute every indicator the technical analyst uses, for all tickers of a price panel in one pass.
+
+    Returns, by indicator name, a (date x ticker) frame, NaN on dates a ticker
+    has no bar.  Windows run over each ticker's own bars, so a missing bar
+    is skipped rather than turning every window that spans it into NaN.
+    """
+    positions = _BarPositions(panel["close"])
+    bars = {field: positions.to_bars(panel[field]) for field in ("high", "low", "close", "volume")}
+    return {name: positions.to_dates(frame) for name, frame in _compute_bar_indicators(bars).items()}
+
+
+def _compute_bar_indicators(bars: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """The indicators of a (bar x ticker) panel.  Returns, the true range
+    and the rolling means and standard deviations are computed once and shared.
+    """
+    high, low, close, volume = bars["high"], bars["low"], bars["close"], bars["volume"]
+
+    # Shared intermediates
+    returns = close.pct_change(fill_method=None)
+    tr = true_range(high, low, close)
+    like_close = functools.partial(pd.DataFrame, index=close.index, columns=close.columns)
+    ma_50 = close.rolling(50).mean()
+    std_50 = close.rolling(50).std()
+    bb_upper, bb_lower = bollinger_bands(close, 20)
+    hist_vol = returns.rolling(21).std() * math.sqrt(252)
+    vol_ma = hist_vol.rolling(63).mean()
+    atr_14 = like_close(atr(high, low, close, 14, tr=tr))
+
+    indicators = {
+        "close": close,
+        # Trend
+        "ema_8": ema(close, 8),
+        "ema_21": ema(close, 21),
+        "ema_55": ema(close, 55),
+        **{name: like_close(values) for name, values in adx(high, low, close, 14, tr=tr).items()},
+        # Mean reversion
+        "z_score": (close - ma_50) / std_50,
+        "bb_upper": bb_upper,
+        "bb_lower": bb_lower,
+        "price_vs_bb": (close - bb_lower) / (bb_upper - bb_lower),
+        "rsi_14": rsi(close, 14),
+        "rsi_28": rsi(close, 28),
+        # Momentum
+        "momentum_1m": returns.rolling(21).sum(),
+        "momentum_3m": returns.rolling(63).sum(),
+        "momentum_6m": returns.rolling(126).sum(),
+        "volume_momentum": volume / volume.rolling(21).mean(),
+        # Volatility
+        "historical_volatility": hist_vol,
+        "volatility_regime": hist_vol / vol_ma,
+        "volatility_z_score": (hist_vol - vol_ma) / hist_vol.rolling(63).std(),
+        "atr": atr_14,
+        "atr_ratio": atr_14 / close,
+        # Statistical properties of returns
+        "skewness": returns.rolling(63).skew(),
+        "kurtosis": returns.rolling(63).kurt(),
+    }
+    return indicators
+
+
+def latest_indicators(panel: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Compute the indicators of a price panel and keep each ticker's values at its last bar.
+
+    Returns a (ticker x indicator) frame, including the Hurst exponent of each
+    ticker's last HURST_WINDOW closes.
+    """
+    indicators = compute_indicators(panel)
+    close = panel["close"]
+    has_bar = close.notna().to_numpy()
+    tickers = [ticker for ticker, any_bar in zip(close.columns, has_bar.any(axis=0)) if any_bar]
+    columns = [close.columns.get_loc(ticker) for ticker in tickers]
+    # Row of each ticker's last bar
+    last_rows = len(close) - 1 - has_bar[::-1, columns].argmax(axis=0)
+
+    latest = pd.DataFrame({name: frame.to_numpy()[last_rows, columns] for name, frame in indicators.items()}, index=pd.Index(tickers, name="ticker"))
+    latest["hurst_exponent"] = [calculate_hurst_exponent(close[ticker].dropna().iloc[-HURST_WINDOW:]) for ticker in tickers]
+    return latest
@@ -1,12 +1,238 @@
 """Helper functions for LLM"""
 
+import asyncio
+import functools
 import json
-from typing import TypeVar, Type, Optional, Any
-from pydantic import BaseModel
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, TypeVar, Type, Optional, Any
+from pydantic import BaseModel, create_model
+from langchain_core.messages import HumanMessage
+from tools.transport import backoff_delay, parse_retry_after
+from utils.callbacks import TokenUsageCallbackHandler
+from utils.concurrency import map_tickers
 from utils.progress import progress
+from utils.telemetry import telemetry
 
 T = TypeVar('T', bound=BaseModel)
 
+class ProviderQuota:
+    """Process-wide admission control for one LLM provider.
+
+    Caps the number of calls in flight and, when configured, the requests and
+    prompt tokens sent per minute, so every agent and ticker shares the
+    provider's quota instead of racing into 429s.  Usable from threads and
+    from asyncio tasks alike.
+    """
+
+    def __init__(self, max_concurrency: int = 8, rpm: int = 0, tpm: int = 0):
+        self.max_concurrency = max_concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self._in_flight = 0
+        # (sent_at, tokens) of the calls made in the last minute
+        self._window: deque[tuple[float, int]] = deque()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        # Threads waiting for a call in flight to finish sleep on this, asyncio tasks on a future each
+        self._released = threading.Condition(self._lock)
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Take a slot and record the call, or return how long to wait before trying again.
+
+        Returns math.inf when every slot is taken: only a release can free one.
+        Must be called with the lock held.
+        """
+        now = time.monotonic()
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= self.max_concurrency:
+            return math.inf
+        if self.rpm and len(self._window) >= self.rpm:
+            return 60 - (now - self._window[0][0])
+        if self.tpm and self._window:
+            used = sum(t for _, t in self._window)
+            if used + tokens > self.tpm:
+                # Wait for enough of the window to expire, even if a single call exceeds the budget
+                freed = 0
+                for sent_at, t in self._window:
+                    freed += t
+                    if used - freed + tokens <= self.tpm:
+                        break
+                return 60 - (now - sent_at)
+
+        self._in_flight += 1
+        self._window.append((now, tokens))
+        return 0.0
+
+    def acquire(self, tokens: int = 0):
+        """Block until a call of the given prompt size may be sent."""
+        with self._released:
+            while (wait := self._try_acquire(tokens)) > 0:
+                self._released.wait(None if wait == math.inf else wait)
+
+    async def aacquire(self, tokens: int = 0):
+        """Wait, without blocking the event loop, until a call may be sent."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                wait = self._try_acquire(tokens)
+                if wait == 0:
+                    return
+                if wait == math.inf:
+                    # Registered under the lock, so a release cannot slip in before we wait
+                    waiter = (loop, loop.create_future())
+                    self._async_waiters.append(waiter)
+            if wait != math.inf:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                await waiter[1]
+            finally:
+                with self._lock:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def release(self):
+        with self._released:
+            self._in_flight -= 1
+            # Every waiter rechecks, since one woken for a slot may still be held back by the RPM/TPM limits
+            self._released.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's event loop has already closed
+                pass
+
+    def pause(self, seconds: float):
+        """Hold back every call to the provider, e.g. for the Retry-After of a 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+_quotas: dict[str, ProviderQuota] = {}
+_quotas_lock = threading.Lock()
+
+
+def get_provider_quota(model_provider: str) -> ProviderQuota:
+    """Get the quota shared by every call to a provider.
+
+    Configured with LLM_MAX_CONCURRENCY, LLM_RPM and LLM_TPM, each of which can
+    be overridden per provider, e.g. LLM_RPM_OPENAI=500.  Unset or 0 RPM/TPM
+    means unlimited.
+    """
+    provider = str(getattr(model_provider, "value", model_provider))
+
+    def setting(name: str, default: str) -> int:
+        return int(os.environ.get(f"{name}_{provider.upper()}", os.environ.get(name, default)))
+
+    with _quotas_lock:
+        if provider not in _quotas:
+            _quotas[provider] = ProviderQuota(max_concurrency=setting("LLM_MAX_CONCURRENCY", "8"), rpm=setting("LLM_RPM", "0"), tpm=setting("LLM_TPM", "0"))
+        return _quotas[provider]
+
+
+def _retry_delay(error: Exception, attempt: int, quota: ProviderQuota) -> float:
+    """How long to wait before retrying a failed call, honouring the provider's Retry-After."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    status_code = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+
+    retry_after = None
+    if headers.get("retry-after-ms"):
+        retry_after = float(headers["retry-after-ms"]) / 1000
+    elif headers.get("retry-after"):
+        retry_after = parse_retry_after(headers["retry-after"])
+
+    if status_code == 429:
+        # Throttled: make every caller of this provider wait, not just this one
+        delay = retry_after if retry_after is not None else backoff_delay(attempt, base=1.0)
+        quota.pause(delay)
+        return delay
+    return retry_after if retry_after is not None else backoff_delay(attempt)
+
+
+def _prepare_call(model_name: str, model_provider: str, pydantic_model: Type[T]):
+    """Get the shared runnable for a call and whether its output needs Deepseek parsing."""
+    from llm.models import get_cached_model, get_model_info
+
+    model_info = get_model_info(model_name)
+    is_deepseek = bool(model_info and model_info.is_deepseek())
+    # For non-Deepseek models, we can use structured output
+    if is_deepseek:
+        return get_cached_model(model_name, model_provider), True
+    return get_cached_model(model_name, model_provider, pydantic_model, method="json_mode"), False
+
+
+def _parse_result(result: Any, pydantic_model: Type[T], is_deepseek: bool) -> Optional[T]:
+    # For Deepseek, we need to extract and parse the JSON manually
+    if is_deepseek:
+        parsed_result = extract_json_from_deepseek_response(result.content)
+        return pydantic_model(**parsed_result) if parsed_result else None
+    return result
+
+
+def _cache_lookup(model_name: str, model_provider: str, pydantic_model: Type[T], prompt: Any):
+    """Get the response cache and key for a call, plus the cached output if there is one."""
+    from llm.cache import get_llm_cache, make_cache_key
+
+    # Identical calls (e.g. unchanged fundamentals on consecutive backtest days) reuse the parsed response
+    cache = get_llm_cache()
+    cache_key = make_cache_key(model_name, model_provider, pydantic_model, prompt) if cache else None
+    cached = cache.get(cache_key) if cache else None
+    return cache, cache_key, pydantic_model(**cached) if cached is not None else None
+
+
+def _report_failure(error: Exception, attempt: int, max_retries: int, agent_name: Optional[str]):
+    if agent_name:
+        progress.update_status(agent_name, None, f"Error - retry {attempt + 1}/{max_retries}")
+    if attempt == max_retries - 1:
+        print(f"Error in LLM call after {max_retries} attempts: {error}")
+
+
+def _record_call(model_name: str, model_provider: str, agent_name: Optional[str], started: float, status: str, usage: Optional[TokenUsageCallbackHandler] = None, prompt_tokens: int = 0, attempts: int = 1, output: Optional[BaseModel] = None):
+    """Add a call to the LLM telemetry, estimating its tokens when the provider reported none."""
+    if usage is not None and usage.reported:
+        prompt_tokens, completion_tokens, estimated = usage.prompt_tokens, usage.completion_tokens, False
+    else:
+        # Every attempt sent the prompt again
+        prompt_tokens = prompt_tokens * attempts if status != "cached" else 0
+        completion_tokens = estimate_tokens(output.model_dump_json()) if output is not None and status != "cached" else 0
+        estimated = status != "cached"
+    telemetry.record(
+        agent=agent_name,
+        model=model_name,
+        provider=str(getattr(model_provider, "value", model_provider)),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        latency=round(time.perf_counter() - started, 3),
+        retries=attempts - 1,
+        status=status,
+        estimated=estimated,
+    )
+
+
+def _default_output(pydantic_model: Type[T], default_factory):
+    # Use default_factory if provided, otherwise create a basic default
+    if default_factory:
+        return default_factory()
+    return create_default_response(pydantic_model)
+
+
 def call_llm(
     prompt: Any,
     model_name: str,
@@ -18,7 +244,10 @@ def call_llm(
 ) -> T:
     """
     Makes an LLM call with retry logic, handling both Deepseek and non-Deepseek models.
-    
+
+    Calls wait for the provider's shared quota, and failed attempts back off
+    (honouring Retry-After) before retrying.
+
     Args:
         prompt: The prompt to send to the LLM
         model_name: Name of the model to use
@@ -27,51 +256,352 @@ def call_llm(
         agent_name: Optional name of the agent for progress updates
         max_retries: Maximum number of retries (default: 3)
         default_factory: Optional factory function to create default response on failure
-        
+
     Returns:
         An instance of the specified Pydantic model
     """
-    from llm.models import get_model, get_model_info
-    
-    model_info = get_model_info(model_name)
-    llm = get_model(model_name, model_provider)
-    
-    # For non-Deepseek models, we can use structured output
-    if not (model_info and model_info.is_deepseek()):
-        llm = llm.with_structured_output(
-            pydantic_model,
-            method="json_mode",
-        )
-    
+    started = time.perf_counter()
+    cache, cache_key, cached = _cache_lookup(model_name, model_provider, pydantic_model, prompt)
+    if cached is not None:
+        _record_call(model_name, model_provider, agent_name, started, "cached")
+        return cached
+
+    llm, is_deepseek = _prepare_call(model_name, model_provider, pydantic_model)
+    quota = get_provider_quota(model_provider)
+    tokens = _prompt_tokens(prompt)
+    usage = TokenUsageCallbackHandler()
+    _record_payloads(prompt, agent_name)
+
     # Call the LLM with retries
     for attempt in range(max_retries):
+        quota.acquire(tokens)
         try:
-            # Call the LLM
-            result = llm.invoke(prompt)
-            print(result.content)
-            
-            # For Deepseek, we need to extract and parse the JSON manually
-            if model_info and model_info.is_deepseek():
-                parsed_result = extract_json_from_deepseek_response(result.content)
-                if parsed_result:
-                    return pydantic_model(**parsed_result)
-            else:
-                return result
-                
+            # Released even when the call is cancelled or interrupted, so the slot is never leaked
+            try:
+                output = _parse_result(llm.invoke(prompt, config={"callbacks": [usage]}), pydantic_model, is_deepseek)
+            finally:
+                quota.release()
         except Exception as e:
-            if agent_name:
-                progress.update_status(agent_name, None, f"Error - retry {attempt + 1}/{max_retries}")
-            
+            _report_failure(e, attempt, max_retries, agent_name)
             if attempt == max_retries - 1:
-                print(f"Error in LLM call after {max_retries} attempts: {e}")
-                # Use default_factory if provided, otherwise create a basic default
-                if default_factory:
-                    return default_factory()
-                return create_default_response(pydantic_model)
+                _record_call(model_name, model_provider, agent_name, started, "failed", usage, tokens, attempt + 1)
+                return _default_output(pydantic_model, default_factory)
+            time.sleep(_retry_delay(e, attempt, quota))
+            continue
+
+        if output is not None:
+            if cache:
+                cache.set(cache_key, output.model_dump(mode="json"))
+            _record_call(model_name, model_provider, agent_name, started, "ok", usage, tokens, attempt + 1, output)
+            return output
 
     # This should never be reached due to the retry logic above
     return create_default_response(pydantic_model)
 
+
+async def acall_llm(
+    prompt: Any,
+    model_name: str,
+    model_provider: str,
+    pydantic_model: Type[T],
+    agent_name: Optional[str] = None,
+    max_retries: int = 3,
+    default_factory = None
+) -> T:
+    """
+    Async version of call_llm using ainvoke.
+
+    Waits for the provider's shared quota and for retry back-off without
+    blocking the event loop, so many agents and tickers can be awaited together.
+    """
+    started = time.perf_counter()
+    cache, cache_key, cached = _cache_lookup(model_name, model_provider, pydantic_model, prompt)
+    if cached is not None:
+        _record_call(model_name, model_provider, agent_name, started, "cached")
+        return cached
+
+    llm, is_deepseek = _prepare_call(model_name, model_provider, pydantic_model)
+    quota = get_provider_quota(model_provider)
+    tokens = _prompt_tokens(prompt)
+    usage = TokenUsageCallbackHandler()
+    _record_payloads(prompt, agent_name)
+
+    for attempt in range(max_retries):
+        await quota.aacquire(tokens)
+        try:
+            # Released even when the call is cancelled or interrupted, so the slot is never leaked
+            try:
+                output = _parse_result(await llm.ainvoke(prompt, config={"callbacks": [usage]}), pydantic_model, is_deepseek)
+            finally:
+                quota.release()
+        except Exception as e:
+            _report_failure(e, attempt, max_retries, agent_name)
+            if attempt == max_retries - 1:
+                _record_call(model_name, model_provider, agent_name, started, "failed", usage, tokens, attempt + 1)
+                return _default_output(pydantic_model, default_factory)
+            await asyncio.sleep(_retry_delay(e, attempt, quota))
+            continue
+
+        if output is not None:
+            if cache:
+                cache.set(cache_key, output.model_dump(mode="json"))
+            _record_call(model_name, model_provider, agent_name, started, "ok", usage, tokens, attempt + 1, output)
+            return output
+
+    return create_default_response(pydantic_model)
+
+
+def get_llm_batch_size(state: Optional[dict] = None) -> int:
+    """Get how many tickers persona agents pack into one LLM call.
+
+    Taken from the run's `llm_batch_size` metadata, then the LLM_BATCH_SIZE
+    environment variable.  Defaults to 1, one call per ticker.
+    """
+    metadata = (state or {}).get("metadata") or {}
+    if metadata.get("llm_batch_size"):
+        return max(1, int(metadata["llm_batch_size"]))
+    return max(1, int(os.environ.get("LLM_BATCH_SIZE", "1")))
+
+
+DEFAULT_FAST_MODE_MARGIN = 0.15
+
+
+def get_fast_mode_margin(state: Optional[dict] = None) -> Optional[float]:
+    """Get how far past a signal threshold a score must be to skip the LLM, or None when fast mode is off.
+
+    Fast mode is turned on by the run's `fast_mode` metadata or the FAST_MODE
+    environment variable.  The margin is a fraction of the maximum score, taken
+    from FAST_MODE_MARGIN or DEFAULT_FAST_MODE_MARGIN.
+    """
+    metadata = (state or {}).get("metadata") or {}
+    enabled = metadata.get("fast_mode")
+    if enabled is None:
+        enabled = os.environ.get("FAST_MODE", "off").lower() in ("1", "on", "true", "yes")
+    if not enabled:
+        return None
+    return max(0.0, float(os.environ.get("FAST_MODE_MARGIN", DEFAULT_FAST_MODE_MARGIN)))
+
+
+def decisive_signals(
+    analysis_data: dict[str, dict],
+    margin: Optional[float],
+    bullish_at: float = 0.7,
+    bearish_at: float = 0.3,
+    **fields,
+) -> dict[str, dict]:
+    """Templated outputs for the tickers whose score is clearly bullish or bearish.
+
+    A ticker is decisive when its score, as a fraction of its max_score, is at
+    least margin above bullish_at or margin below bearish_at.  Confidence grows
+    from 50 at the threshold to 100 at the end of the scale, and the reasoning
+    is built from the details of the rule-based analysis.  Extra fields are
+    added to every output.  Returns nothing when margin is None.
+    """
+    if margin is None:
+        return {}
+
+    outputs = {}
+    for ticker, analysis in analysis_data.items():
+        score, max_score = analysis.get("score"), analysis.get("max_score")
+        if score is None or not max_score:
+            continue
+        fraction = score / max_score
+        if fraction >= bullish_at + margin:
+            signal = "bullish"
+            strength = (fraction - bullish_at) / (1 - bullish_at) if bullish_at < 1 else 1.0
+        elif fraction <= bearish_at - margin:
+            signal = "bearish"
+            strength = (bearish_at - fraction) / bearish_at if bearish_at > 0 else 1.0
+        else:
+            continue
+
+        details = [part["details"] for part in analysis.values() if isinstance(part, dict) and part.get("details")]
+        reasoning = f"Score of {score:.1f}/{max_score:g} is decisively {signal}; signal taken from the rule-based analysis without LLM review."
+        if details:
+            reasoning += " " + "; ".join(details)
+        outputs[ticker] = {"signal": signal, "confidence": round(50 + 50 * min(1.0, strength), 1), "reasoning": reasoning, **fields}
+    return outputs
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding():
+    """Load the tiktoken encoding once, or None when tiktoken or its encoding files are unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text."""
+    if (encoding := _get_encoding()) is None:
+        # Roughly four characters per token for English and JSON
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _prompt_texts(prompt: Any) -> list[str]:
+    messages = prompt.to_messages() if hasattr(prompt, "to_messages") else prompt
+    if isinstance(messages, str):
+        return [messages]
+    return [str(message.content) for message in messages]
+
+
+def _prompt_tokens(prompt: Any) -> int:
+    return sum(estimate_tokens(text) for text in _prompt_texts(prompt))
+
+
+def _compact(value: Any, digits: int) -> Any:
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return None
+        value = float(f"{value:.{digits}g}")
+        return int(value) if value.is_integer() and abs(value) < 1e15 else value
+    if isinstance(value, dict):
+        return {str(key): _compact(item, digits) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_compact(item, digits) for item in value]
+    return value
+
+
+def compact_json(data: Any, digits: int = 4) -> str:
+    """Serialize prompt data compactly: no whitespace, sorted keys and floats rounded to `digits` significant digits."""
+    return json.dumps(_compact(data, digits), separators=(",", ":"), sort_keys=True, default=str)
+
+
+# Tokens of the indented JSON each recent compact payload replaced, looked up when a prompt holding one is sent
+_PAYLOAD_TOKENS_MAX_ENTRIES = 1024
+_payload_tokens: OrderedDict[str, int] = OrderedDict()
+_payload_tokens_lock = threading.Lock()
+
+
+def compact_prompt_payload(data: Any, digits: int = 4) -> str:
+    """compact_json for a prompt.
+
+    The tokens it saves over indented JSON are recorded in the telemetry by
+    call_llm once a prompt holding the payload is actually sent, so prompts
+    that are only built (e.g. to size batches) are not counted.
+    """
+    payload = compact_json(data, digits)
+    with _payload_tokens_lock:
+        if payload not in _payload_tokens:
+            _payload_tokens[payload] = estimate_tokens(json.dumps(data, indent=2, default=str))
+        _payload_tokens.move_to_end(payload)
+        while len(_payload_tokens) > _PAYLOAD_TOKENS_MAX_ENTRIES:
+            _payload_tokens.popitem(last=False)
+    return payload
+
+
+def _record_payloads(prompt: Any, agent_name: Optional[str]):
+    """Record the compaction savings of the compact payloads in a prompt about to be sent."""
+    if not agent_name:
+        return
+    text = "\n".join(_prompt_texts(prompt))
+    with _payload_tokens_lock:
+        sent = [(payload, tokens) for payload, tokens in _payload_tokens.items() if payload in text]
+    for payload, tokens_before in sent:
+        telemetry.record_payload(agent=agent_name, tokens_before=tokens_before, tokens_after=estimate_tokens(payload))
+
+
+def split_batches(tickers: list[str], build_prompt: Callable[[list[str]], Any], batch_size: int, max_prompt_tokens: int) -> list[list[str]]:
+    """Group tickers into batches of at most batch_size whose prompts fit in max_prompt_tokens.
+
+    A ticker whose prompt is too big on its own still gets a batch to itself.
+    """
+    batches = []
+    for ticker in tickers:
+        if batches and len(batches[-1]) < batch_size and _prompt_tokens(build_prompt(batches[-1] + [ticker])) <= max_prompt_tokens:
+            batches[-1].append(ticker)
+        else:
+            batches.append([ticker])
+    return batches
+
+
+@functools.lru_cache(maxsize=None)
+def _batch_model(pydantic_model: Type[T]) -> Type[BaseModel]:
+    """The output model of a batched call, created once per model so the cached structured-output runnable is reused."""
+    return create_model(f"{pydantic_model.__name__}Batch", signals=(dict[str, pydantic_model], ...))
+
+
+def call_llm_batch(
+    build_prompt: Callable[[list[str]], Any],
+    tickers: list[str],
+    model_name: str,
+    model_provider: str,
+    pydantic_model: Type[T],
+    agent_name: Optional[str] = None,
+    default_factory = None,
+    batch_size: int = 1,
+    max_prompt_tokens: Optional[int] = None,
+    max_workers: int = 1,
+    decisive: Optional[dict[str, dict]] = None,
+) -> dict[str, T]:
+    """
+    Makes one LLM call per batch of tickers, returning each ticker's structured output.
+
+    Args:
+        build_prompt: Builds the prompt holding the analysis data of a list of tickers
+        tickers: Tickers to get outputs for
+        batch_size: Most tickers packed into one call; 1 makes a plain call_llm per ticker
+        max_prompt_tokens: Token budget per prompt, batches are split to stay under it
+            (default: LLM_BATCH_MAX_TOKENS or 12000)
+        max_workers: Batches sent at once
+        decisive: Ready outputs (see decisive_signals) for tickers that skip the LLM
+
+    A batch whose response cannot be parsed or misses tickers falls back to
+    per-ticker calls for the tickers it did not answer.
+
+    Returns:
+        A dict of ticker to an instance of the specified Pydantic model
+    """
+    decisive = {ticker: pydantic_model(**fields) for ticker, fields in (decisive or {}).items() if ticker in tickers}
+    if decisive:
+        remaining = [ticker for ticker in tickers if ticker not in decisive]
+        outputs = call_llm_batch(build_prompt, remaining, model_name, model_provider, pydantic_model, agent_name, default_factory, batch_size, max_prompt_tokens, max_workers) if remaining else {}
+        return {ticker: decisive.get(ticker) or outputs[ticker] for ticker in tickers}
+
+    def call_single(ticker: str) -> T:
+        return call_llm(prompt=build_prompt([ticker]), model_name=model_name, model_provider=model_provider, pydantic_model=pydantic_model, agent_name=agent_name, default_factory=default_factory)
+
+    if batch_size <= 1 or len(tickers) <= 1:
+        return map_tickers(call_single, tickers, max_workers)
+
+    max_prompt_tokens = max_prompt_tokens or int(os.environ.get("LLM_BATCH_MAX_TOKENS", "12000"))
+    batches = split_batches(tickers, build_prompt, batch_size, max_prompt_tokens)
+    batch_model = _batch_model(pydantic_model)
+
+    def call_batch(batch: list[str]) -> dict[str, T]:
+        if len(batch) == 1:
+            return {batch[0]: call_single(batch[0])}
+
+        prompt = build_prompt(batch)
+        messages = prompt.to_messages() if hasattr(prompt, "to_messages") else list(prompt)
+        messages.append(
+            HumanMessage(
+                content=f"Analyze each of these tickers separately: {', '.join(batch)}. "
+                'Return a JSON object of the form {"signals": {"<ticker>": <signal>}} with one entry per ticker, '
+                "each signal in the JSON format described above."
+            )
+        )
+        # A single attempt: on failure the per-ticker calls below do the retrying
+        result = call_llm(prompt=messages, model_name=model_name, model_provider=model_provider, pydantic_model=batch_model, agent_name=agent_name, max_retries=1, default_factory=lambda: None)
+
+        outputs = {ticker: result.signals[ticker] for ticker in batch if result is not None and ticker in result.signals}
+        for ticker in batch:
+            if ticker not in outputs:
+                outputs[ticker] = call_single(ticker)
+        return outputs
+
+    # Batches are keyed by their first ticker so map_tickers can run them concurrently
+    batches_by_first = {batch[0]: batch for batch in batches}
+    outputs = {}
+    for batch_outputs in map_tickers(lambda first: call_batch(batches_by_first[first]), list(batches_by_first), max_workers).values():
+        outputs.update(batch_outputs)
+    return {ticker: outputs[ticker] for ticker in tickers}
+
+
 def create_default_response(model_class: Type[T]) -> T:
     """Creates a safe default response based on the model's fields."""
     default_values = {}
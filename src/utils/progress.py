@@ -5,6 +5,7 @@ from rich.style import Style
 from rich.text import Text
 from typing import Dict, Optional
 from datetime import datetime
+import threading
 
 console = Console()
 
@@ -17,6 +18,8 @@ class AgentProgress:
         self.table = Table(show_header=False, box=None, padding=(0, 1))
         self.live = Live(self.table, console=console, refresh_per_second=4)
         self.started = False
+        # Agents update their status from several threads at once
+        self._lock = threading.Lock()
 
     def start(self):
         """Start the progress display."""
@@ -32,20 +35,22 @@ class AgentProgress:
 
     def update_status(self, agent_name: str, ticker: Optional[str] = None, status: str = ""):
         """Update the status of an agent."""
-        if agent_name not in self.agent_status:
-            self.agent_status[agent_name] = {"status": "", "ticker": None}
+        with self._lock:
+            if agent_name not in self.agent_status:
+                self.agent_status[agent_name] = {"status": "", "ticker": None}
 
-        if ticker:
-            self.agent_status[agent_name]["ticker"] = ticker
-        if status:
-            self.agent_status[agent_name]["status"] = status
+            if ticker:
+                self.agent_status[agent_name]["ticker"] = ticker
+            if status:
+                self.agent_status[agent_name]["status"] = status
 
-        self._refresh_display()
+            self._refresh_display()
 
     def _refresh_display(self):
         """Refresh the progress display."""
-        self.table.columns.clear()
-        self.table.add_column(width=100)
+        # Build a fresh table and swap it in so the live render never sees a half-built one
+        table = Table(show_header=False, box=None, padding=(0, 1))
+        table.add_column(width=100)
 
         # Sort agents with Risk Management and Portfolio Management at the bottom
         def sort_key(item):
@@ -81,7 +86,10 @@ class AgentProgress:
                 status_text.append(f"[{ticker}] ", style=Style(color="cyan"))
             status_text.append(status, style=style)
 
-            self.table.add_row(status_text)
+            table.add_row(status_text)
+
+        self.table = table
+        self.live.update(table)
 
 
 # Create a global instance
@@ -0,0 +1,460 @@
+"""Incremental indicators that update in O(1) per new bar
+
+Each indicator reproduces its batch definition in utils.indicators (pandas
+ewm, rolling windows) bar by bar, so a ticker's state can be kept across
+backtest days and advanced with just the bars that arrived since.  Rolling
+indicators and the Hurst exponent keep only their trailing window; the
+exponential means cover every bar seen, and forget bars older than their span
+much like the batch ones, which start at the first bar of the fetched history.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.indicators import HURST_WINDOW, _hurst_lags
+
+NAN = float("nan")
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    """Float division with numpy semantics: x/0 is +-inf and 0/0 is NaN."""
+    if denominator == 0:
+        if numerator == 0 or math.isnan(numerator):
+            return NAN
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+class StreamingEMA:
+    """ewm(span=span, adjust=False).mean(), one value at a time."""
+
+    def __init__(self, span: int):
+        self.alpha = 2 / (span + 1)
+        self.value = NAN
+        # Bars since the last observation, so gaps decay the old value like pandas does
+        self._steps = 0
+
+    def update(self, x: float) -> float:
+        if math.isnan(self.value):
+            if not math.isnan(x):
+                self.value = x
+                self._steps = 0
+            return self.value
+        self._steps += 1
+        if not math.isnan(x):
+            decay = (1 - self.alpha) ** self._steps
+            self.value = (decay * self.value + self.alpha * x) / (decay + self.alpha)
+            self._steps = 0
+        return self.value
+
+
+class StreamingEWMA:
+    """ewm(span=span).mean() with the default adjust=True, kept as a running numerator and denominator."""
+
+    def __init__(self, span: int):
+        self.decay = 1 - 2 / (span + 1)
+        self._numerator = 0.0
+        self._denominator = 0.0
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        if math.isnan(x):
+            # Missing values still age the older observations
+            self._numerator *= self.decay
+            self._denominator *= self.decay
+        else:
+            self._numerator = x + self.decay * self._numerator
+            self._denominator = 1 + self.decay * self._denominator
+            self.value = self._numerator / self._denominator
+        return self.value
+
+
+class RollingStats:
+    """rolling(window) mean, sum and variance (ddof=1), updated with Welford's algorithm as bars enter and leave the window."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values: deque[float] = deque()
+        self._nans = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._count = 0
+        # Length of the run of identical values ending at the newest one
+        self._same_run = 0
+
+    def update(self, x: float):
+        self._same_run = self._same_run + 1 if self._values and x == self._values[-1] else 1
+        self._values.append(x)
+        if math.isnan(x):
+            self._nans += 1
+        else:
+            self._add(x)
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if math.isnan(old):
+                self._nans -= 1
+            else:
+                self._remove(old)
+        return self
+
+    def _add(self, x: float):
+        self._count += 1
+        delta = x - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x: float):
+        if self._count == 1:
+            self._count, self._mean, self._m2 = 0, 0.0, 0.0
+            return
+        delta = x - self._mean
+        self._count -= 1
+        self._mean -= delta / self._count
+        self._m2 = max(0.0, self._m2 - delta * (x - self._mean))
+
+    @property
+    def ready(self) -> bool:
+        # Like pandas, a window is only complete once it holds `window` non-missing values
+        return len(self._values) == self.window and self._nans == 0
+
+    @property
+    def _constant(self) -> bool:
+        # A window of identical values is exact, as in pandas, rather than carrying rounding residue
+        return self._same_run >= self.window
+
+    @property
+    def mean(self) -> float:
+        if not self.ready:
+            return NAN
+        return self._values[-1] if self._constant else self._mean
+
+    @property
+    def sum(self) -> float:
+        return self.mean * self._count if self.ready else NAN
+
+    @property
+    def var(self) -> float:
+        if not self.ready or self._count < 2:
+            return NAN
+        return 0.0 if self._constant else self._m2 / (self._count - 1)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+
+class RollingMoments:
+    """rolling(window) skew() and kurt(), from running power sums of the values in the window as pandas computes them."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values: deque[float] = deque()
+        self._nans = 0
+        self._sums = [0.0, 0.0, 0.0, 0.0]
+        self._same_run = 0
+
+    def update(self, x: float):
+        self._same_run = self._same_run + 1 if self._values and x == self._values[-1] else 1
+        self._values.append(x)
+        if math.isnan(x):
+            self._nans += 1
+        else:
+            self._add(x, 1)
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if math.isnan(old):
+                self._nans -= 1
+            else:
+                self._add(old, -1)
+        return self
+
+    def _add(self, x: float, sign: int):
+        power = 1.0
+        for i in range(4):
+            power *= x
+            self._sums[i] += sign * power
+
+    @property
+    def ready(self) -> bool:
+        return len(self._values) == self.window and self._nans == 0
+
+    def _central(self) -> tuple[float, float, float, float]:
+        """The mean and the second to fourth central moments (divided by n)."""
+        n = self.window
+        a = self._sums[0] / n
+        b = self._sums[1] / n - a * a
+        c = self._sums[2] / n - a * a * a - 3 * a * b
+        d = self._sums[3] / n - a * a * a * a - 6 * b * a * a - 4 * c * a
+        return a, b, c, d
+
+    @property
+    def skew(self) -> float:
+        if not self.ready or self.window < 3:
+            return NAN
+        if self._same_run >= self.window:
+            return 0.0
+        n = self.window
+        _, b, c, _ = self._central()
+        if b <= 1e-14:
+            return NAN
+        return math.sqrt(n * (n - 1)) * c / ((n - 2) * b**1.5)
+
+    @property
+    def kurt(self) -> float:
+        if not self.ready or self.window < 4:
+            return NAN
+        if self._same_run >= self.window:
+            return -3.0
+        n = self.window
+        _, b, _, d = self._central()
+        if b <= 1e-14:
+            return NAN
+        k = (n * n - 1) * d / (b * b) - 3 * (n - 1) ** 2
+        return k / ((n - 2) * (n - 3))
+
+
+class StreamingRSI:
+    """The RSI of utils.indicators.rsi: simple moving averages of gains and losses over `period` bars."""
+
+    def __init__(self, period: int = 14):
+        self._gains = RollingStats(period)
+        self._losses = RollingStats(period)
+        self._previous = NAN
+        self.value = NAN
+
+    def update(self, close: float) -> float:
+        delta = close - self._previous
+        self._previous = close
+        self._gains.update(delta if delta > 0 else 0.0)
+        self._losses.update(-delta if delta < 0 else 0.0)
+        rs = _divide(self._gains.mean, self._losses.mean)
+        self.value = 100 - _divide(100, 1 + rs) if not math.isnan(rs) else NAN
+        return self.value
+
+
+class _TrueRange:
+    def __init__(self):
+        self.previous_close = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        gaps = [abs(high - self.previous_close), abs(low - self.previous_close)]
+        self.previous_close = close
+        # Like np.fmax: a missing previous close does not hide the high - low range
+        return max([high - low] + [gap for gap in gaps if not math.isnan(gap)])
+
+
+class StreamingATR:
+    """utils.indicators.atr: the simple moving average of the true range."""
+
+    def __init__(self, period: int = 14):
+        self._true_range = _TrueRange()
+        self._stats = RollingStats(period)
+        self.value = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.value = self._stats.update(self._true_range.update(high, low, close)).mean
+        return self.value
+
+
+class StreamingADX:
+    """utils.indicators.adx: ADX with its +DI and -DI lines, smoothed by adjusted exponential means."""
+
+    def __init__(self, period: int = 14):
+        self._true_range = _TrueRange()
+        self._tr = StreamingEWMA(period)
+        self._plus_dm = StreamingEWMA(period)
+        self._minus_dm = StreamingEWMA(period)
+        self._dx = StreamingEWMA(period)
+        self._previous_high = NAN
+        self._previous_low = NAN
+        self.adx = self.plus_di = self.minus_di = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        up_move = high - self._previous_high
+        down_move = self._previous_low - low
+        self._previous_high, self._previous_low = high, low
+        plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+        minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+
+        smoothed_tr = self._tr.update(self._true_range.update(high, low, close))
+        self.plus_di = 100 * _divide(self._plus_dm.update(plus_dm), smoothed_tr)
+        self.minus_di = 100 * _divide(self._minus_dm.update(minus_dm), smoothed_tr)
+        dx = 100 * _divide(abs(self.plus_di - self.minus_di), self.plus_di + self.minus_di)
+        self.adx = self._dx.update(dx)
+        return self.adx
+
+
+class _RunningVariance:
+    """Count, mean and sum of squared deviations of a set of values, with Welford updates as values are added and removed."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x: float):
+        if self.count == 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        delta = x - self.mean
+        self.count -= 1
+        self.mean -= delta / self.count
+        self.m2 = max(0.0, self.m2 - delta * (x - self.mean))
+
+
+class StreamingHurst:
+    """utils.indicators.calculate_hurst_exponent over the trailing `window` closes, from running statistics of the differences at each lag."""
+
+    def __init__(self, window: int = HURST_WINDOW, max_lag: int = 20):
+        self.window = window
+        self._lags, self._log_lags = _hurst_lags(max_lag)
+        self._closes: deque[float] = deque()
+        # The differences at each lag between closes in the window
+        self._stats = [_RunningVariance() for _ in self._lags]
+
+    def update(self, close: float):
+        # Like the batch path, which runs on the closes with missing bars dropped
+        if math.isnan(close):
+            return self
+        for stats, lag in zip(self._stats, self._lags):
+            if len(self._closes) >= lag:
+                stats.add(close - self._closes[-lag])
+        self._closes.append(close)
+        if len(self._closes) > self.window:
+            # Drop the differences measured from the close leaving the window
+            oldest = self._closes.popleft()
+            for stats, lag in zip(self._stats, self._lags):
+                if len(self._closes) >= lag:
+                    stats.remove(self._closes[lag - 1] - oldest)
+        return self
+
+    @property
+    def value(self) -> float:
+        if len(self._lags) < 2 or len(self._closes) <= self._lags[-1]:
+            return 0.5
+        tau = np.maximum(1e-8, np.sqrt(np.sqrt([stats.m2 / stats.count for stats in self._stats])))
+        if not np.all(np.isfinite(tau)):
+            return 0.5
+        return float(np.polyfit(self._log_lags, np.log(tau), 1)[0])
+
+
+class TickerIndicators:
+    """Every indicator of utils.indicators.latest_indicators for one ticker, advanced one bar at a time."""
+
+    def __init__(self):
+        self.ema_8, self.ema_21, self.ema_55 = StreamingEMA(8), StreamingEMA(21), StreamingEMA(55)
+        self.rsi_14, self.rsi_28 = StreamingRSI(14), StreamingRSI(28)
+        self.close_20, self.close_50 = RollingStats(20), RollingStats(50)
+        self.atr = StreamingATR(14)
+        self.adx = StreamingADX(14)
+        self.returns_21, self.returns_63, self.returns_126 = RollingStats(21), RollingStats(63), RollingStats(126)
+        self.return_moments = RollingMoments(63)
+        self.volume_21 = RollingStats(21)
+        self.volatility_63 = RollingStats(63)
+        self.hurst = StreamingHurst()
+        self.close = self.volume = NAN
+
+    def advance(self, high: float, low: float, close: float, volume: float = NAN):
+        """Add one bar without building its values."""
+        # Like the batch engine, which only runs over a ticker's own bars
+        if math.isnan(close):
+            return
+        returns = _divide(close, self.close) - 1
+        self.close, self.volume = close, volume
+        self.ema_8.update(close)
+        self.ema_21.update(close)
+        self.ema_55.update(close)
+        self.rsi_14.update(close)
+        self.rsi_28.update(close)
+        self.close_20.update(close)
+        self.close_50.update(close)
+        self.atr.update(high, low, close)
+        self.adx.update(high, low, close)
+        for stats in (self.returns_21, self.returns_63, self.returns_126, self.return_moments):
+            stats.update(returns)
+        self.volume_21.update(volume)
+        self.volatility_63.update(self.historical_volatility)
+        self.hurst.update(close)
+
+    def update(self, high: float, low: float, close: float, volume: float = NAN) -> dict[str, float]:
+        """Add one bar and return the latest values."""
+        self.advance(high, low, close, volume)
+        return self.values()
+
+    @property
+    def historical_volatility(self) -> float:
+        return self.returns_21.std * math.sqrt(252)
+
+    def values(self) -> dict[str, float]:
+        bb_upper = self.close_20.mean + 2 * self.close_20.std
+        bb_lower = self.close_20.mean - 2 * self.close_20.std
+        hist_vol, vol_ma = self.historical_volatility, self.volatility_63.mean
+        return {
+            "close": self.close,
+            "ema_8": self.ema_8.value,
+            "ema_21": self.ema_21.value,
+            "ema_55": self.ema_55.value,
+            "adx": self.adx.adx,
+            "+di": self.adx.plus_di,
+            "-di": self.adx.minus_di,
+            "z_score": _divide(self.close - self.close_50.mean, self.close_50.std),
+            "bb_upper": bb_upper,
+            "bb_lower": bb_lower,
+            "price_vs_bb": _divide(self.close - bb_lower, bb_upper - bb_lower),
+            "rsi_14": self.rsi_14.value,
+            "rsi_28": self.rsi_28.value,
+            "momentum_1m": self.returns_21.sum,
+            "momentum_3m": self.returns_63.sum,
+            "momentum_6m": self.returns_126.sum,
+            "volume_momentum": _divide(self.volume, self.volume_21.mean),
+            "historical_volatility": hist_vol,
+            "volatility_regime": _divide(hist_vol, vol_ma),
+            "volatility_z_score": _divide(hist_vol - vol_ma, self.volatility_63.std),
+            "atr": self.atr.value,
+            "atr_ratio": _divide(self.atr.value, self.close),
+            "skewness": self.return_moments.skew,
+            "kurtosis": self.return_moments.kurt,
+            "hurst_exponent": self.hurst.value,
+        }
+
+
+class IndicatorStreams:
+    """TickerIndicators per ticker, kept across backtest days.
+
+    update() feeds only the bars dated after the last one seen for the ticker,
+    so each day costs O(new bars) instead of recomputing the whole lookback.
+    """
+
+    def __init__(self):
+        self._streams: dict[str, tuple[TickerIndicators, Optional[pd.Timestamp]]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, ticker: str, prices_df: pd.DataFrame) -> dict[str, float]:
+        """Advance a ticker's indicators with the new bars of a date-indexed OHLCV frame and return the latest values."""
+        with self._lock:
+            indicators, last_seen = self._streams.get(ticker, (TickerIndicators(), None))
+            new_bars = prices_df if last_seen is None else prices_df[prices_df.index > last_seen]
+            for high, low, close, volume in zip(*(new_bars[field].to_numpy(float) for field in ("high", "low", "close", "volume"))):
+                indicators.advance(high, low, close, volume)
+            if len(new_bars):
+                last_seen = new_bars.index[-1]
+            self._streams[ticker] = (indicators, last_seen)
+            return indicators.values()
+
+    def reset(self, ticker: Optional[str] = None):
+        with self._lock:
+            if ticker is None:
+                self._streams.clear()
+            else:
+                self._streams.pop(ticker, None)
@@ -0,0 +1,167 @@
+"""Per-call telemetry of LLM token usage, latency and retries"""
+
+import contextvars
+import csv
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Optional
+
+# The day being analyzed (the backtest day, or the end date of a single run)
+_current_day: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("telemetry_day", default=None)
+
+
+@dataclass
+class LLMCallRecord:
+    """One call_llm: what it cost and how long it took."""
+
+    run_id: str
+    day: Optional[str]
+    agent: Optional[str]
+    model: str
+    provider: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float
+    retries: int
+    status: str  # "ok", "cached" or "failed"
+    # True when the provider reported no usage and tokens were estimated from the text
+    estimated: bool = False
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class PromptPayloadRecord:
+    """Tokens of a prompt payload before and after compaction."""
+
+    run_id: str
+    day: Optional[str]
+    agent: str
+    tokens_before: int
+    tokens_after: int
+
+
+class LLMTelemetry:
+    """Collects an LLMCallRecord for every LLM call made in this process.
+
+    Records can be aggregated by any of their fields (agent, model, day, ...)
+    and exported as JSON, with per-agent, per-model and per-day summaries and
+    the tokens saved by prompt compaction, or as CSV with one row per call.
+    """
+
+    def __init__(self):
+        self.run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self._records: list[LLMCallRecord] = []
+        self._payloads: list[PromptPayloadRecord] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def day(self, day: Optional[str]):
+        """Attribute the calls made inside the block (and the threads it starts) to day."""
+        token = _current_day.set(day)
+        try:
+            yield
+        finally:
+            _current_day.reset(token)
+
+    def record(self, **kwargs) -> LLMCallRecord:
+        """Record one LLM call made on the current day."""
+        record = LLMCallRecord(run_id=self.run_id, day=_current_day.get(), **kwargs)
+        with self._lock:
+            self._records.append(record)
+        return record
+
+    def record_payload(self, agent: str, tokens_before: int, tokens_after: int) -> PromptPayloadRecord:
+        """Record how many tokens compacting a prompt payload saved."""
+        record = PromptPayloadRecord(run_id=self.run_id, day=_current_day.get(), agent=agent, tokens_before=tokens_before, tokens_after=tokens_after)
+        with self._lock:
+            self._payloads.append(record)
+        return record
+
+    def summarize_payloads(self) -> list[dict]:
+        """Prompt payload tokens before and after compaction, per agent."""
+        with self._lock:
+            payloads = list(self._payloads)
+        groups: dict[str, dict] = {}
+        for record in payloads:
+            group = groups.setdefault(record.agent, {"agent": record.agent, "payloads": 0, "tokens_before": 0, "tokens_after": 0})
+            group["payloads"] += 1
+            group["tokens_before"] += record.tokens_before
+            group["tokens_after"] += record.tokens_after
+        for group in groups.values():
+            group["saved_pct"] = round(100 * (1 - group["tokens_after"] / group["tokens_before"]), 1) if group["tokens_before"] else 0.0
+        return sorted(groups.values(), key=lambda group: -group["tokens_before"])
+
+    @property
+    def records(self) -> list[LLMCallRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def summarize(self, by: str | tuple[str, ...] = "agent") -> list[dict]:
+        """Aggregate the calls by one or more record fields, most tokens first."""
+        keys = (by,) if isinstance(by, str) else tuple(by)
+        groups: dict[tuple, dict] = {}
+        for record in self.records:
+            group_key = tuple(getattr(record, key) for key in keys)
+            group = groups.setdefault(
+                group_key,
+                {**dict(zip(keys, group_key)), "calls": 0, "cached": 0, "failed": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "latency": 0.0},
+            )
+            group["calls"] += 1
+            group["cached"] += record.status == "cached"
+            group["failed"] += record.status == "failed"
+            group["retries"] += record.retries
+            group["prompt_tokens"] += record.prompt_tokens
+            group["completion_tokens"] += record.completion_tokens
+            group["total_tokens"] += record.total_tokens
+            group["latency"] += record.latency
+
+        summary = sorted(groups.values(), key=lambda group: (-group["total_tokens"], -group["latency"]))
+        for group in summary:
+            group["latency"] = round(group["latency"], 3)
+            group["avg_latency"] = round(group["latency"] / group["calls"], 3)
+        return summary
+
+    def to_dict(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "totals": (self.summarize(()) or [{}])[0],
+            "by_agent": self.summarize("agent"),
+            "by_model": self.summarize(("provider", "model")),
+            "by_day": sorted(self.summarize("day"), key=lambda group: group["day"] or ""),
+            "prompt_compaction": self.summarize_payloads(),
+            "calls": [{**asdict(record), "total_tokens": record.total_tokens} for record in self.records],
+        }
+
+    def export(self, path: str):
+        """Write the telemetry to path, as CSV when it ends in .csv and as JSON otherwise."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path.lower().endswith(".csv"):
+            columns = [f.name for f in fields(LLMCallRecord)] + ["total_tokens"]
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=columns)
+                writer.writeheader()
+                for record in self.records:
+                    writer.writerow({**asdict(record), "total_tokens": record.total_tokens})
+        else:
+            with open(path, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
+            self._payloads.clear()
+
+
+# Create a global instance
+telemetry = LLMTelemetry()